@@ -0,0 +1,70 @@
+# Replay benchmark for the 2048 simulator, one row per board size (stdlib only)
+#
+# Plays random games with the simulator itself (random direction, a 2 or 4
+# spawned on a random empty cell after every effective move), then times
+# replaying them the way Game2048Verifier does.
+#
+#   python -m benchmark.game2048_bench --moves 5000 --games 20
+import argparse
+import json
+import random
+import time
+
+from utils.verifier.replay_2048 import BOARD_SIZES, _table, apply_move, replay
+
+
+def play_random_game(size: int, moves: int, rng: random.Random) -> tuple[list[int], str, list[list[int]]]:
+    cells = [0] * (size * size)
+    for cell in rng.sample(range(size * size), 2):
+        cells[cell] = 1
+    initial = list(cells)
+    played, spawns = [], []
+    stuck = 0
+    while len(played) < moves and stuck < 4:
+        move = rng.choice("LRUD")
+        played.append(move)
+        moved, _ = apply_move(cells, move, size)
+        if not moved:
+            stuck += 1
+            continue
+        stuck = 0
+        cell = rng.choice([index for index, value in enumerate(cells) if not value])
+        value = 4 if rng.random() < 0.1 else 2
+        cells[cell] = value.bit_length() - 1
+        spawns.append([cell, value])
+    return initial, "".join(played), spawns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="2048 replay benchmark")
+    parser.add_argument("--moves", type=int, default=5000)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    report = []
+    for size in BOARD_SIZES:
+        started = time.perf_counter()
+        _table(size)
+        table_ms = (time.perf_counter() - started) * 1000
+        games = [play_random_game(size, args.moves, rng) for _ in range(args.games)]
+        total_moves = sum(len(moves) for _, moves, _ in games)
+
+        started = time.perf_counter()
+        for initial, moves, spawns in games:
+            assert replay(initial, moves, spawns, size) is not None, "replay rejected a legal game"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        report.append({
+            "size": size,
+            "games": len(games),
+            "moves": total_moves,
+            "table_build_ms": round(table_ms, 1),
+            "replay_ms_per_game": round(elapsed_ms / len(games), 3),
+            "moves_per_ms": round(total_moves / elapsed_ms, 1) if elapsed_ms else 0.0,
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
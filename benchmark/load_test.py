@@ -0,0 +1,154 @@
+# HTTP load generator for the record API (stdlib only)
+#
+# Opens `--concurrency` keep-alive connections and drives one scenario through
+# each of them, then prints throughput and latency percentiles as JSON.
+#
+#   ASYNC_IO=true  uvicorn router.controller:app --port 8888 --workers 1
+#   python -m benchmark.load_test --scenario ranking --concurrency 500 --requests 20000
+#
+# Run it once with ASYNC_IO=true and once with ASYNC_IO=false to compare the
+# asyncio path against the threadpool path.
+import argparse
+import asyncio
+import json
+import math
+import time
+from urllib.parse import urlsplit
+
+SCENARIOS = ("ranking", "history", "session", "user")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies_ms: list[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p90_ms": round(percentile(values, 90), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+class HttpConnection:
+    """Minimal HTTP/1.1 keep-alive client; enough for Content-Length JSON responses."""
+
+    def __init__(self, host: str, port: int, headers: dict[str, str]):
+        self.host = host
+        self.port = port
+        self.headers = headers
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def open(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def request(self, method: str, path: str, body: dict | None = None) -> tuple[int, bytes]:
+        if self.writer is None:
+            await self.open()
+        payload = json.dumps(body).encode() if body is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in self.headers.items()]
+        if body is not None:
+            lines += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        content_length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value.strip())
+        data = await self.reader.readexactly(content_length) if content_length else b""
+        return status, data
+
+
+def build_request(scenario: str, worker_id: int, args) -> tuple[str, str, dict | None]:
+    user_uuid = f"bench-{worker_id:05d}"
+    if scenario == "ranking":
+        return "GET", f"/record/ranking/{args.game}/{args.level}?limit={args.limit}", None
+    if scenario == "history":
+        return "GET", f"/record/history/{args.game}/{args.level}/{user_uuid}?limit={args.limit}", None
+    if scenario == "session":
+        return "POST", "/record/session", {"game_name": args.game, "level": args.level, "user_uuid": user_uuid}
+    return "GET", "/record/user", None
+
+
+async def worker(worker_id: int, conn: HttpConnection, counter: list[int], args, latencies: list[float], errors: list[int]) -> None:
+    while counter[0] > 0:
+        counter[0] -= 1
+        method, path, body = build_request(args.scenario, worker_id, args)
+        started = time.perf_counter()
+        try:
+            status, _ = await conn.request(method, path, body)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            errors[0] += 1
+            await conn.close()
+            conn.writer = None
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status >= 400:
+            errors[0] += 1
+
+
+async def run(args) -> dict:
+    url = urlsplit(args.base_url)
+    headers = {}
+    if args.api_key:
+        headers["X-Record-Key"] = args.api_key
+    connections = [HttpConnection(url.hostname, url.port or 80, headers) for _ in range(args.concurrency)]
+    await asyncio.gather(*(conn.open() for conn in connections))
+
+    latencies: list[float] = []
+    errors = [0]
+    counter = [args.requests]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i, conn, counter, args, latencies, errors) for i, conn in enumerate(connections)))
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*(conn.close() for conn in connections))
+
+    report = summarize(latencies, errors[0], elapsed)
+    report.update({"scenario": args.scenario, "concurrency": args.concurrency})
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record API load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8888")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="ranking")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--game", default="sudoku")
+    parser.add_argument("--level", default="easy")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--api-key", default="")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
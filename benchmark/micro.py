@@ -0,0 +1,82 @@
+# In-process micro-benchmarks: each game's verifier and ranking member decoding (stdlib only)
+#
+#   python -m benchmark.micro --iterations 2000
+import argparse
+import json
+import random
+import time
+
+from benchmark.payloads import make_submission
+from model.game_record import GameRecord
+from repository.kv_proc import KvProc
+from service.logic import GAME_WHITELIST, GameService
+from utils.verifier.registry import get_verifier
+
+VERIFICATION_FIELDS = ("score", "answers", "wrong_answers", "hint_events", "action_log")
+
+
+def _time_per_call(func, iterations: int) -> float:
+    # Microseconds per call, best of three rounds to damp scheduler noise
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - started)
+    return round(best / iterations * 1e6, 2)
+
+
+def bench_verifiers(iterations: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    report = {}
+    for game_name, levels in sorted(GAME_WHITELIST.items()):
+        verifier = get_verifier(game_name)
+        for level in sorted(levels):
+            body = make_submission(game_name, level, "bench-micro", 3, rng)
+            payload = {field: body[field] for field in VERIFICATION_FIELDS}
+            assert verifier.verify(payload), f"generated {game_name}/{level} payload is rejected"
+            report[f"{game_name}/{level}"] = _time_per_call(lambda: verifier.verify(payload), iterations)
+    return report
+
+
+def bench_precheck(iterations: int, seed: int) -> float:
+    body = make_submission("sudoku", "easy", "bench-micro", 3, random.Random(seed))
+    record = GameRecord(game_name="sudoku", level="easy", user_uuid="bench-micro", clear_time=3)
+    payload = {field: body[field] for field in VERIFICATION_FIELDS}
+    return _time_per_call(lambda: GameService._precheck_record(record, payload), iterations)
+
+
+def bench_decode_member(iterations: int) -> dict:
+    record = GameRecord(
+        game_name="sudoku", level="easy", user_uuid="bench-user-0001", nickname="bench", clear_time=120,
+        mistake_count=1, hint_count=2, is_verified=True, user_ip="127.0.0.1", score=0,
+    )
+    json_member = KvProc._encode_member(record)
+    legacy_member = "bench-user-0001:bench:120:1:2:True:127.0.0.1"
+    assert KvProc._decode_member(json_member, "sudoku", "easy") is not None
+    assert KvProc._decode_member(legacy_member, "sudoku", "easy") is not None
+    return {
+        "json": _time_per_call(lambda: KvProc._decode_member(json_member, "sudoku", "easy"), iterations),
+        "legacy": _time_per_call(lambda: KvProc._decode_member(legacy_member, "sudoku", "easy"), iterations),
+    }
+
+
+def run(iterations: int, seed: int) -> dict:
+    return {
+        "unit": "us_per_call",
+        "verifier": bench_verifiers(iterations, seed),
+        "precheck": bench_precheck(iterations, seed),
+        "decode_member": bench_decode_member(iterations),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verifier and member decoding micro-benchmarks")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
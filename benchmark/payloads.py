@@ -0,0 +1,93 @@
+# Realistic POST /record bodies for every game in GAME_WHITELIST (stdlib only)
+#
+# Each body passes the game's verifier and the action-log prechecks: the log
+# starts at "start", carries a few moves and ends with "submit" clear_time
+# seconds later, and mistake/hint counts match their entry lists. Boards are
+# random relabelings or shifts of known solutions, so ranking boards fill with
+# distinct users and varied clear times.
+import random
+
+from benchmark.game2048_bench import play_random_game
+from utils.verifier.replay_2048 import replay
+
+SUDOKU_SOLUTION = "534678912672195348198342567859761423426853791713924856961537284287419635345286179"
+
+
+def _relabeled_sudoku(rng: random.Random) -> list[int]:
+    digits = list(range(1, 10))
+    rng.shuffle(digits)
+    return [digits[int(ch) - 1] for ch in SUDOKU_SOLUTION]
+
+
+def _latin_square(size: int, rng: random.Random) -> list[int]:
+    # Cyclic latin square with shuffled symbols: every row and column holds 1..size once
+    symbols = list(range(1, size + 1))
+    rng.shuffle(symbols)
+    shift = rng.randrange(size)
+    return [symbols[(row + col + shift) % size] for row in range(size) for col in range(size)]
+
+
+def _level_size(level: str, default: int) -> int:
+    _, _, size = level.partition("-")
+    return int(size) if size.isdigit() else default
+
+
+def _answers(game_name: str, level: str, rng: random.Random) -> tuple[list[dict], int, list[dict]]:
+    # Returns (answers, score, extra move actions)
+    if game_name == "sudoku":
+        return [{"board": "".join(map(str, _relabeled_sudoku(rng)))}], 0, []
+    if game_name == "killer-sudoku":
+        return [{"board": _relabeled_sudoku(rng)}], 0, []
+    if game_name == "jigsaw-sudoku":
+        return [{"board": _latin_square(_level_size(level, 9), rng)}], 0, []
+    if game_name == "nonogram":
+        size = _level_size(level, 10)
+        return [{"row": row, "col": col, "filled": rng.random() < 0.5} for row in range(size) for col in range(size)], 0, []
+    if game_name == "hidato":
+        size = _level_size(level, 5)
+        # Boustrophedon path through the grid
+        cells = [(row, col if row % 2 == 0 else size - 1 - col) for row in range(size) for col in range(size)]
+        return [{"row": row, "col": col, "value": value} for value, (row, col) in enumerate(cells, start=1)], 0, []
+    if game_name == "shikaku":
+        return [{"rect": {"x": x, "y": 0, "w": 1, "h": 5}} for x in range(5)], 0, []
+    if game_name == "2048":
+        size = _level_size(level, 4)
+        initial, moves, spawns = play_random_game(size, rng.randint(50, 300), rng)
+        score, max_tile, cells = replay(initial, moves, spawns, size)
+        board = [[(1 << value) if value else 0 for value in cells[row * size:(row + 1) * size]] for row in range(size)]
+        entry = {
+            "board": board,
+            "score": score,
+            "max_tile": max_tile,
+            "replay": {"initial": [(1 << value) if value else 0 for value in initial], "moves": moves, "spawns": spawns},
+        }
+        directions = {"L": "left", "R": "right", "U": "up", "D": "down"}
+        actions = [{"action": "move", "payload": {"direction": directions[move]}} for move in moves]
+        return [entry], score, actions
+    if game_name == "woodoku":
+        return [], rng.randint(100, 5000), []
+    # Games verified by the base verifier only (solitaire, shanghai, mahjong)
+    return [], 0, []
+
+
+def make_submission(game_name: str, level: str, user_uuid: str, clear_time: int, rng: random.Random) -> dict:
+    answers, score, moves = _answers(game_name, level, rng)
+    started = 1_730_000_000_000 + rng.randrange(10_000_000)
+    action_log = [{"ts": started, "action": "start"}]
+    for index, action in enumerate(moves or [{"action": "move"}], start=1):
+        action_log.append({"ts": started + index, **action})
+    action_log.append({"ts": started + clear_time * 1000, "action": "submit", "payload": {"result": "success"}})
+    return {
+        "game_name": game_name,
+        "level": level,
+        "user_uuid": user_uuid,
+        "nickname": user_uuid[-8:],
+        "clear_time": clear_time,
+        "score": score,
+        "mistake_count": 0,
+        "hint_count": 0,
+        "answers": answers,
+        "wrong_answers": [],
+        "hint_events": [],
+        "action_log": action_log,
+    }
@@ -0,0 +1,17 @@
+-- Schema for the benchmark MySQL container (mounted by benchmark/docker-compose.yml)
+CREATE TABLE IF NOT EXISTS game_records (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    game_name VARCHAR(50) NOT NULL,
+    level VARCHAR(20) NOT NULL,
+    user_uuid VARCHAR(100) NOT NULL,
+    nickname VARCHAR(50) DEFAULT 'Guest',
+    clear_time INT NOT NULL,
+    score INT DEFAULT 0,
+    mistake_count INT DEFAULT 0,
+    hint_count INT DEFAULT 0,
+    is_verified BOOLEAN DEFAULT FALSE,
+    user_ip VARCHAR(45),
+    insert_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_ranking (game_name, level, is_verified, clear_time),
+    INDEX idx_history (user_uuid, game_name, level, insert_ts)
+);
@@ -0,0 +1,76 @@
+# Serve the record API on in-process stand-ins: fakeredis (with Lua) for Redis, SQLite for MySQL
+#
+# For running benchmark.suite without containers; absolute numbers differ from
+# MySQL/Redis, so compare stand-in reports only with other stand-in reports.
+# Needs the packages below on top of requirements.txt:
+#
+#   pip install "fakeredis[lua]" aiosqlite
+#   python -m benchmark.standin_server --port 8899
+import argparse
+import os
+
+import uvicorn
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import repository.async_kv_proc as async_kv_proc
+import repository.async_rdb_proc as async_rdb_proc
+import repository.kv_proc as kv_proc
+import repository.rdb_proc as rdb_proc
+
+try:
+    import fakeredis
+except ImportError:  # reported in main() with the install hint
+    fakeredis = None
+
+SCHEMA = (
+    """CREATE TABLE game_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_name VARCHAR(50) NOT NULL,
+        level VARCHAR(20) NOT NULL,
+        user_uuid VARCHAR(100) NOT NULL,
+        nickname VARCHAR(50) DEFAULT 'Guest',
+        clear_time INT NOT NULL,
+        score INT DEFAULT 0,
+        mistake_count INT DEFAULT 0,
+        hint_count INT DEFAULT 0,
+        is_verified BOOLEAN DEFAULT FALSE,
+        user_ip VARCHAR(45),
+        insert_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    "CREATE INDEX idx_ranking ON game_records (game_name, level, is_verified, clear_time)",
+    "CREATE INDEX idx_history ON game_records (user_uuid, game_name, level, insert_ts)",
+)
+
+
+def install_stand_ins(db_path: str) -> None:
+    # Set the process-wide pools before the app lifespan runs; its init_* calls keep them
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    server = fakeredis.FakeServer()
+    kv_proc._pool = fakeredis.FakeRedis(server=server, decode_responses=True).connection_pool
+    async_kv_proc._async_pool = fakeredis.FakeAsyncRedis(server=server, decode_responses=True).connection_pool
+    # SQLite serializes writers; wait for the lock instead of failing under concurrent inserts
+    rdb_proc._engine = create_engine(f"sqlite:///{db_path}", connect_args={"timeout": 30})
+    with rdb_proc._engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+    async_rdb_proc._async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", connect_args={"timeout": 30})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record API on fakeredis + SQLite")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--db", default="standin-bench.db")
+    args = parser.parse_args()
+    if fakeredis is None:
+        parser.error('the stand-in server needs: pip install "fakeredis[lua]" aiosqlite')
+
+    install_stand_ins(args.db)
+    from router.controller import app  # after the stand-ins are in place
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
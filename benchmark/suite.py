@@ -0,0 +1,291 @@
+# Reproducible benchmark suite for the record API, written as one JSON report to diff across versions
+#
+#   docker compose -f benchmark/docker-compose.yml up -d --wait   # MySQL 8 + Redis 7 with the schema
+#   python -m benchmark.suite --spawn --output bench-new.json
+#   python -m benchmark.suite --stand-in --output bench-new.json   # fakeredis + SQLite, no containers
+#   python -m benchmark.suite --base-url http://127.0.0.1:8888      # a server that is already running
+#   python -m benchmark.suite --compare bench-old.json bench-new.json
+#
+# Phases, each driven through `--concurrency` keep-alive connections:
+#   session   POST /record/session for every generated user
+#   record    POST /record, `--records-per-board` users on every game/level of GAME_WHITELIST
+#   ranking   GET /record/ranking on sudoku boards topped up to each of `--board-sizes`
+#   history   GET /record/history for users that have records
+#   nickname  PATCH /record/user/{uuid}
+#   micro     benchmark.micro in this process (verifiers, _decode_member)
+#
+# Users are named after a per-run prefix, so repeated runs against the same
+# database never collide, but board sizes only match `--board-sizes` on a fresh
+# database. Ranking reads go through the server's ranking cache; spawn with
+# `--no-ranking-cache` to measure the Redis path instead.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from benchmark import micro
+from benchmark.load_test import HttpConnection, summarize
+from benchmark.payloads import make_submission
+from service.logic import GAME_WHITELIST
+
+RANKING_GAME = "sudoku"
+RANKING_LEVELS = ("easy", "medium", "hard", "expert")
+RANKING_LIMITS = (10, 50)
+COMPARED_FIELDS = ("throughput_rps", "p50_ms", "p99_ms")
+
+
+def _boards() -> list[tuple[str, str]]:
+    return [(game_name, level) for game_name, levels in sorted(GAME_WHITELIST.items()) for level in sorted(levels)]
+
+
+def _record_accepted(status: int, body: bytes) -> bool:
+    if status == 202:
+        return True  # queued by the ingest stream; verified later
+    return status == 200 and json.loads(body).get("status") == "success"
+
+
+async def drive(base_url: str, headers: dict, concurrency: int, requests: list[tuple], check=None) -> dict:
+    """Send (label, method, path, body) requests over keep-alive connections.
+
+    Returns summarize() for all requests under "all" and for each label. A
+    response counts as an error on status >= 400, or when `check(status, body)`
+    is given and returns False.
+    """
+    url = urlsplit(base_url)
+    connections = [HttpConnection(url.hostname, url.port or 80, headers) for _ in range(min(concurrency, len(requests)))]
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    pending = iter(requests)
+
+    async def worker(conn: HttpConnection) -> None:
+        for label, method, path, body in pending:
+            started = time.perf_counter()
+            try:
+                status, data = await conn.request(method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError, OSError):
+                errors[label] = errors.get(label, 0) + 1
+                await conn.close()
+                conn.writer = None
+                continue
+            latencies.setdefault(label, []).append((time.perf_counter() - started) * 1000)
+            if status >= 400 or (check is not None and not check(status, data)):
+                errors[label] = errors.get(label, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(conn) for conn in connections))
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*(conn.close() for conn in connections))
+
+    report = {"all": summarize([v for values in latencies.values() for v in values], sum(errors.values()), elapsed)}
+    labels = sorted(set(latencies) | set(errors))
+    if labels != ["all"]:
+        for label in labels:
+            # Per-label throughput is its share of the shared run, not a standalone rate
+            report[label] = summarize(latencies.get(label, []), errors.get(label, 0), elapsed)
+    return report
+
+
+def _session(game_name: str, level: str, user_uuid: str) -> tuple:
+    return (f"{game_name}/{level}", "POST", "/record/session", {"game_name": game_name, "level": level, "user_uuid": user_uuid})
+
+
+async def run_http(args) -> dict:
+    rng = random.Random(args.seed)
+    prefix = f"bench-{rng.getrandbits(32):08x}-{int(time.time()) % 100000:05d}"
+    headers = {"X-Record-Key": args.api_key} if args.api_key else {}
+
+    # Every user of the run: the records phase fills every board, the ranking phase tops up sudoku boards
+    sizes = sorted(args.board_sizes)
+    players = {board: [f"{prefix}-{i:06d}" for i in range(args.records_per_board)] for board in _boards()}
+    ranking_boards = {}
+    for size, level in zip(sizes, RANKING_LEVELS):
+        board = (RANKING_GAME, level)
+        extra = max(0, size - args.records_per_board)
+        players[board] += [f"{prefix}-r{i:06d}" for i in range(extra)]
+        ranking_boards[size] = level
+    submissions = {
+        board: [make_submission(board[0], board[1], user, rng.randint(1, args.clear_time), rng) for user in users]
+        for board, users in players.items()
+    }
+
+    report = {}
+    sessions = [_session(game_name, level, user) for (game_name, level), users in players.items() for user in users]
+    rng.shuffle(sessions)
+    report["session"] = (await drive(args.base_url, headers, args.concurrency, sessions))["all"]
+    # The server only accepts a record once clear_time seconds have passed since the session started
+    time.sleep(args.clear_time + 1)
+
+    records = []
+    seeding = []
+    for board, bodies in submissions.items():
+        label = f"{board[0]}/{board[1]}"
+        for index, body in enumerate(bodies):
+            request = (label, "POST", "/record", body)
+            (records if index < args.records_per_board else seeding).append(request)
+    rng.shuffle(records)
+    report["record"] = await drive(args.base_url, headers, args.concurrency, records, _record_accepted)
+    await drive(args.base_url, headers, args.concurrency, seeding, _record_accepted)
+    if args.ingest_wait:
+        time.sleep(args.ingest_wait)  # let the write-behind writer or ingest workers drain before reading
+
+    ranking = [
+        (f"size-{size}/limit-{limit}", "GET", f"/record/ranking/{RANKING_GAME}/{level}?limit={limit}", None)
+        for size, level in ranking_boards.items()
+        for limit in RANKING_LIMITS
+        for _ in range(args.reads)
+    ]
+    rng.shuffle(ranking)
+    report["ranking"] = await drive(args.base_url, headers, args.concurrency, ranking)
+
+    history_users = [(board, user) for board, users in players.items() for user in users[: args.records_per_board]]
+    history = [
+        ("all", "GET", f"/record/history/{game_name}/{level}/{user}?limit=10", None)
+        for (game_name, level), user in rng.choices(history_users, k=args.reads)
+    ]
+    report["history"] = (await drive(args.base_url, headers, args.concurrency, history))["all"]
+
+    nickname_users = sorted({user for _, user in history_users})
+    nicknames = [
+        ("all", "PATCH", f"/record/user/{user}", {"nickname": f"nick-{index:06d}"})
+        for index, user in enumerate(rng.choices(nickname_users, k=args.reads))
+    ]
+    report["nickname"] = (await drive(args.base_url, headers, args.concurrency, nicknames))["all"]
+    return report
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+async def _wait_ready(base_url: str, timeout: float) -> None:
+    url = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while True:
+        conn = HttpConnection(url.hostname, url.port or 80, {})
+        try:
+            status, _ = await conn.request("GET", "/record/user")
+            if status == 200:
+                return
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            await conn.close()
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"server at {base_url} did not start within {timeout:.0f}s")
+        await asyncio.sleep(0.2)
+
+
+def _spawn_server(args) -> subprocess.Popen:
+    port = str(urlsplit(args.base_url).port or 80)
+    env = dict(os.environ)
+    # Every benchmark client shares one IP and a handful of users; keep the limiter out of the numbers
+    env.setdefault("RATE_LIMIT", "false")
+    if args.no_ranking_cache:
+        env["RANKING_CACHE_TTL"] = "0"
+    if args.stand_in:
+        command = [sys.executable, "-m", "benchmark.standin_server", "--port", port]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "router.controller:app", "--port", port, "--log-level", "warning"]
+    return subprocess.Popen(command, env=env)
+
+
+def run(args) -> dict:
+    server = _spawn_server(args) if args.spawn or args.stand_in else None
+    try:
+        if server is not None:
+            asyncio.run(_wait_ready(args.base_url, 30))
+        http = asyncio.run(run_http(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+    config = {
+        name: getattr(args, name)
+        for name in ("concurrency", "records_per_board", "board_sizes", "reads", "clear_time", "seed", "iterations")
+    }
+    config.update(stand_in=args.stand_in, ranking_cache=not args.no_ranking_cache)
+    return {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "async_io": os.getenv("ASYNC_IO", "true").lower() == "true",
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "config": config,
+        },
+        "http": http,
+        "micro": micro.run(args.iterations, args.seed),
+    }
+
+
+def _flatten(node, prefix: str = "") -> dict[str, float]:
+    values = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            values.update(_flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        values[prefix] = node
+    return values
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    """Lines of `metric old new change%` for the throughput/latency metrics present in both reports."""
+    before = _flatten({"http": old.get("http", {}), "micro": old.get("micro", {})})
+    after = _flatten({"http": new.get("http", {}), "micro": new.get("micro", {})})
+    lines = []
+    for key in sorted(before.keys() & after.keys()):
+        if key.startswith("http.") and not key.endswith(COMPARED_FIELDS):
+            continue
+        change = (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+        lines.append(f"{key:<60} {before[key]:>12} {after[key]:>12} {change:>+8.1f}%")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record API benchmark suite")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8888")
+    parser.add_argument("--spawn", action="store_true", help="start uvicorn router.controller:app for the run")
+    parser.add_argument("--stand-in", action="store_true", help="start the fakeredis + SQLite stand-in server")
+    parser.add_argument("--no-ranking-cache", action="store_true", help="spawn with RANKING_CACHE_TTL=0")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--records-per-board", type=int, default=20)
+    parser.add_argument("--board-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--reads", type=int, default=2000, help="requests per read scenario")
+    parser.add_argument("--clear-time", type=int, default=3, help="longest clear_time submitted, in seconds")
+    parser.add_argument("--ingest-wait", type=float, default=0.0, help="seconds to wait after the record phase")
+    parser.add_argument("--iterations", type=int, default=2000, help="micro-benchmark iterations")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--api-key", default=os.getenv("RECORD_API_KEY", ""))
+    parser.add_argument("--output", default="")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, encoding="utf-8") as file:
+                reports.append(json.load(file))
+        print("\n".join(compare(*reports)))
+        return
+    if len(args.board_sizes) > len(RANKING_LEVELS):
+        parser.error(f"--board-sizes takes at most {len(RANKING_LEVELS)} sizes (one {RANKING_GAME} level each)")
+
+    report = run(args)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Micro-benchmark for sudoku board validation (stdlib; NumPy is used when installed)
+#
+# Compares the previous set/slice implementation of SudokuVerifier._validate_board
+# with the engine in utils/verifier/board.py, per board (check_board) and in
+# batch mode (check_boards, NumPy bitmasks when available).
+#
+#   python -m benchmark.verifier_bench --boards 20000
+import argparse
+import json
+import random
+import time
+
+from utils.verifier import board as board_engine
+from utils.verifier.board import check_board, check_boards, parse_board, sudoku_layout
+
+BASE_SOLUTION = "534678912672195348198342567859761423426853791713924856961537284287419635345286179"
+
+
+def legacy_validate_board(board) -> bool:
+    # SudokuVerifier._validate_board before utils/verifier/board.py, kept for comparison
+    if isinstance(board, str):
+        if len(board) != 81:
+            return False
+        if not all(ch.isdigit() and ch != "0" for ch in board):
+            return False
+        values = [int(ch) for ch in board]
+    elif isinstance(board, list):
+        if len(board) != 81:
+            return False
+        if not all(isinstance(val, int) and 1 <= val <= 9 for val in board):
+            return False
+        values = board
+    else:
+        return False
+    for row in range(9):
+        start = row * 9
+        if len(set(values[start:start + 9])) != 9:
+            return False
+    for col in range(9):
+        if len(set(values[col::9])) != 9:
+            return False
+    for box_row in range(0, 9, 3):
+        for box_col in range(0, 9, 3):
+            block = []
+            for r in range(3):
+                offset = (box_row + r) * 9 + box_col
+                block.extend(values[offset:offset + 3])
+            if len(set(block)) != 9:
+                return False
+    return True
+
+
+def make_boards(count: int, invalid_ratio: float, seed: int) -> list[str]:
+    # Valid boards are digit relabelings of a known solution; invalid ones swap two cells of a row
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        digits = list("123456789")
+        rng.shuffle(digits)
+        mapping = {str(i + 1): digits[i] for i in range(9)}
+        cells = [mapping[ch] for ch in BASE_SOLUTION]
+        if rng.random() < invalid_ratio:
+            row = rng.randrange(9) * 9
+            cells[row] = cells[row + 1]
+        boards.append("".join(cells))
+    return boards
+
+
+def timed(func) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sudoku board validation micro-benchmark")
+    parser.add_argument("--boards", type=int, default=20000)
+    parser.add_argument("--invalid-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    boards = make_boards(args.boards, args.invalid_ratio, args.seed)
+    layout = sudoku_layout(9)
+
+    legacy_s, legacy = timed(lambda: [legacy_validate_board(board) for board in boards])
+    scalar_s, scalar = timed(lambda: [
+        values is not None and check_board(values, layout)
+        for values in (parse_board(board, 9) for board in boards)
+    ])
+    # Generated boards are always well-formed, so parsing never drops one here
+    batch_s, batch = timed(lambda: check_boards([parse_board(board, 9) for board in boards], layout))
+    assert legacy == scalar == batch, "implementations disagree"
+
+    report = {
+        "boards": len(boards),
+        "numpy": board_engine.np is not None,
+        "legacy_us_per_board": round(legacy_s / len(boards) * 1e6, 2),
+        "scalar_us_per_board": round(scalar_s / len(boards) * 1e6, 2),
+        "batch_us_per_board": round(batch_s / len(boards) * 1e6, 2),
+        "scalar_speedup": round(legacy_s / scalar_s, 2),
+        "batch_speedup": round(legacy_s / batch_s, 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
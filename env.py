@@ -9,7 +9,79 @@ class Env:
     DB_USER: str = os.getenv("DB_USER", "root")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "1q2w3e4r!")
     DB_NAME: str = os.getenv("DB_NAME", "PUZZLE")
+    # shared engine connection pool
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
 
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
+    # shared redis connection pool
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2.0"))
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "2.0"))
+    REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+    # in-process nickname cache used to hydrate ranking responses
+    NICKNAME_CACHE_SIZE: int = int(os.getenv("NICKNAME_CACHE_SIZE", "10000"))
+    NICKNAME_CACHE_TTL: float = float(os.getenv("NICKNAME_CACHE_TTL", "5"))
+    # ranking response cache: in-process TTL, optional shared copy in redis
+    RANKING_CACHE_TTL: float = float(os.getenv("RANKING_CACHE_TTL", "1"))
+    RANKING_CACHE_REDIS: bool = os.getenv("RANKING_CACHE_REDIS", "false").lower() == "true"
+    RANKING_CACHE_REDIS_TTL: int = int(os.getenv("RANKING_CACHE_REDIS_TTL", "30"))
+    # cold-start fill of an empty ranking board from MySQL
+    RANKING_FILL_CHUNK: int = int(os.getenv("RANKING_FILL_CHUNK", "5000"))
+    RANKING_FILL_LOCK_TTL: int = int(os.getenv("RANKING_FILL_LOCK_TTL", "60"))
+    RANKING_FILL_WAIT: float = float(os.getenv("RANKING_FILL_WAIT", "2"))
+    # daily/weekly/monthly leaderboards (GET /record/ranking ?window=), kept from live submissions only
+    RANKING_WINDOWS: bool = os.getenv("RANKING_WINDOWS", "true").lower() == "true"
+    RANKING_WINDOW_SIZE: int = int(os.getenv("RANKING_WINDOW_SIZE", "1000"))
+    RANKING_WINDOW_AGGREGATE_TTL: int = int(os.getenv("RANKING_WINDOW_AGGREGATE_TTL", "10"))
+    # minutes east of UTC where window days start (540 for KST)
+    RANKING_WINDOW_UTC_OFFSET: int = int(os.getenv("RANKING_WINDOW_UTC_OFFSET", "0"))
+    # per-board quantile sketch of verified submissions, returned as POST /record "percentile"
+    BOARD_SKETCHES: bool = os.getenv("BOARD_SKETCHES", "true").lower() == "true"
+    BOARD_SKETCH_FLUSH_INTERVAL: float = float(os.getenv("BOARD_SKETCH_FLUSH_INTERVAL", "5"))
+    # requests with a larger body are answered with 413 before they are read; 0 disables the limit
+    MAX_BODY_BYTES: int = int(os.getenv("MAX_BODY_BYTES", "262144"))
+    # reject POST /record without a ready game session before its lists are parsed and verified
+    RECORD_SESSION_PRECHECK: bool = os.getenv("RECORD_SESSION_PRECHECK", "true").lower() == "true"
+    # per-user / per-IP token buckets on POST /record and POST /record/session (service/rate_limiter.py)
+    RATE_LIMIT: bool = os.getenv("RATE_LIMIT", "true").lower() == "true"
+    RATE_LIMIT_RULES: str = os.getenv(
+        "RATE_LIMIT_RULES", "record.user=10/60,record.ip=120/60,session.user=20/60,session.ip=240/60"
+    )
+    RATE_LIMIT_LOCAL_SIZE: int = int(os.getenv("RATE_LIMIT_LOCAL_SIZE", "10000"))
+    # write-behind batching of POST /record inserts into multi-row INSERTs
+    RECORD_WRITE_BEHIND: bool = os.getenv("RECORD_WRITE_BEHIND", "false").lower() == "true"
+    RECORD_WRITE_BATCH_SIZE: int = int(os.getenv("RECORD_WRITE_BATCH_SIZE", "200"))
+    RECORD_WRITE_FLUSH_MS: float = float(os.getenv("RECORD_WRITE_FLUSH_MS", "5"))
+    RECORD_WRITE_QUEUE_SIZE: int = int(os.getenv("RECORD_WRITE_QUEUE_SIZE", "5000"))
+    RECORD_WRITE_ENQUEUE_TIMEOUT: float = float(os.getenv("RECORD_WRITE_ENQUEUE_TIMEOUT", "1"))
+    RECORD_WRITE_RESULT_TIMEOUT: float = float(os.getenv("RECORD_WRITE_RESULT_TIMEOUT", "30"))
+    # queue POST /record on a redis stream and verify/store it in service.ingest_worker
+    RECORD_INGEST_STREAM: bool = os.getenv("RECORD_INGEST_STREAM", "false").lower() == "true"
+    RECORD_INGEST_MAX_BACKLOG: int = int(os.getenv("RECORD_INGEST_MAX_BACKLOG", "100000"))
+    RECORD_INGEST_STATUS_TTL: int = int(os.getenv("RECORD_INGEST_STATUS_TTL", "3600"))
+    RECORD_INGEST_BATCH: int = int(os.getenv("RECORD_INGEST_BATCH", "100"))
+    RECORD_INGEST_BLOCK_MS: int = int(os.getenv("RECORD_INGEST_BLOCK_MS", "1000"))
+    RECORD_INGEST_CLAIM_IDLE_MS: int = int(os.getenv("RECORD_INGEST_CLAIM_IDLE_MS", "30000"))
+    # processes for CPU-heavy verifiers (utils/verifier/pool.py); 0 verifies every game inline
+    VERIFY_POOL_WORKERS: int = int(os.getenv("VERIFY_POOL_WORKERS", "0"))
+    # reject 2048 records that do not carry a replay (answers[].replay) instead of only checking their shape
+    VERIFY_2048_REPLAY_REQUIRED: bool = os.getenv("VERIFY_2048_REPLAY_REQUIRED", "false").lower() == "true"
+    # fraction of rejected verifications copied (with their payload) to the verify:rejections stream
+    VERIFY_REJECT_SAMPLE_RATE: float = float(os.getenv("VERIFY_REJECT_SAMPLE_RATE", "0"))
+    VERIFY_REJECT_STREAM_MAXLEN: int = int(os.getenv("VERIFY_REJECT_STREAM_MAXLEN", "10000"))
+    # include the rejection reason in POST /record and /record/status responses (debugging builds)
+    VERIFY_DEBUG_REASONS: bool = os.getenv("VERIFY_DEBUG_REASONS", "false").lower() == "true"
+    # puzzle catalog file (migrations/build_puzzle_catalog.py); records naming a catalogued puzzle_id must match its solution
+    PUZZLE_CATALOG_PATH: str = os.getenv("PUZZLE_CATALOG_PATH", "")
+    # also reject records of catalogued games whose puzzle_id is missing or unknown to the catalog
+    PUZZLE_CATALOG_REQUIRED: bool = os.getenv("PUZZLE_CATALOG_REQUIRED", "false").lower() == "true"
+    # GET /record/metrics requires ?key= when set
+    METRICS_KEY: str = os.getenv("METRICS_KEY", "")
+    # serve requests on the asyncio path (aiomysql / redis.asyncio); false keeps the threadpool + sync drivers path
+    ASYNC_IO: bool = os.getenv("ASYNC_IO", "true").lower() == "true"
     RECORD_API_KEY: str = os.getenv("RECORD_API_KEY", "")
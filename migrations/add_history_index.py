@@ -0,0 +1,40 @@
+# Add the user-history index to game_records.
+#
+# GET /record/history filters by (user_uuid, game_name, level) and pages by
+# insert_ts DESC; without this index every call scans the board's rows and
+# filesorts. The index also serves the UPDATE ... WHERE user_uuid behind
+# PATCH /record/user. InnoDB builds it online (ALGORITHM=INPLACE, LOCK=NONE),
+# and the script is a no-op when the index already exists.
+#
+#   python -m migrations.add_history_index
+from sqlalchemy import text
+
+from repository.rdb_proc import RDBProc
+
+INDEX_NAME = "idx_history"
+
+INDEX_EXISTS_QUERY = text("""
+    SELECT COUNT(*) AS cnt FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'game_records' AND index_name = :index_name
+""")
+
+ADD_INDEX_QUERY = text(f"""
+    ALTER TABLE game_records
+    ADD INDEX {INDEX_NAME} (user_uuid, game_name, level, insert_ts),
+    ALGORITHM=INPLACE, LOCK=NONE
+""")
+
+
+def main() -> None:
+    with RDBProc() as rdb_proc:
+        rows = rdb_proc.select_query(INDEX_EXISTS_QUERY, {"index_name": INDEX_NAME})
+        if rows and rows[0]["cnt"]:
+            print(f"{INDEX_NAME} already exists")
+            return
+        with rdb_proc._begin() as conn:
+            conn.execute(ADD_INDEX_QUERY)
+        print(f"{INDEX_NAME} created")
+
+
+if __name__ == "__main__":
+    main()
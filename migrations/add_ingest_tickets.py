@@ -0,0 +1,31 @@
+# Create the ingest_tickets table used by service.ingest_worker.
+#
+# The worker stores each ticket in the same transaction as its record, so a
+# submission redelivered after a crash between the INSERT and its published
+# result is recognised instead of inserted twice. The script is a no-op when the
+# table already exists.
+#
+#   python -m migrations.add_ingest_tickets
+from sqlalchemy import text
+
+from repository.rdb_proc import RDBProc
+
+CREATE_TABLE_QUERY = text("""
+    CREATE TABLE IF NOT EXISTS ingest_tickets (
+        ticket CHAR(32) PRIMARY KEY,
+        record_id BIGINT NOT NULL,
+        insert_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_insert_ts (insert_ts)
+    )
+""")
+
+
+def main() -> None:
+    with RDBProc() as rdb_proc:
+        with rdb_proc._begin() as conn:
+            conn.execute(CREATE_TABLE_QUERY)
+    print("ingest_tickets ready")
+
+
+if __name__ == "__main__":
+    main()
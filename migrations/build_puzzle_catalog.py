@@ -0,0 +1,71 @@
+# Build the puzzle catalog file read by utils/verifier/catalog.py.
+#
+# Each puzzle's solution is given in the same shape the client submits as
+# `answers` (a list of entries, or a single board entry), reduced with the
+# game verifier's solution_key and stored as a digest. Cells must be addressed
+# the way the client addresses them (row/col, index, ...), since solution keys
+# compare cell keys as sent. The file is replaced atomically; API processes and
+# verification workers pick it up on restart.
+#
+# Sources:
+#   JSON lines: {"game_name": "sudoku", "puzzle_id": "daily-0001", "solution": [...]}
+#   MySQL:      puzzle_catalog (game_name, puzzle_id, solution JSON)
+#
+#   python -m migrations.build_puzzle_catalog --source puzzles.jsonl
+#   python -m migrations.build_puzzle_catalog --from-db
+import argparse
+import json
+
+from env import Env
+from repository.rdb_proc import RDBProc
+from utils.verifier.catalog import build_catalog
+from utils.verifier.registry import get_verifier
+
+
+def _read_jsonl(path: str):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                row = json.loads(line)
+                yield row["game_name"], row["puzzle_id"], row["solution"]
+
+
+def _read_db():
+    with RDBProc() as rdb_proc:
+        yield from rdb_proc.iter_puzzle_solutions()
+
+
+def solution_keys(rows, skipped: list):
+    for game_name, puzzle_id, solution in rows:
+        if isinstance(solution, str):
+            solution = json.loads(solution)
+        if isinstance(solution, dict):
+            solution = [solution]
+        key_of = getattr(get_verifier(game_name), "solution_key", None)
+        key = key_of(solution) if key_of is not None and isinstance(solution, list) else None
+        if key is None:
+            skipped.append((game_name, puzzle_id))
+            continue
+        yield game_name, puzzle_id, key
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the puzzle catalog file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--source", help="JSON lines file of puzzles")
+    source.add_argument("--from-db", action="store_true", help="read the puzzle_catalog table")
+    parser.add_argument("--output", default=Env.PUZZLE_CATALOG_PATH, help="defaults to PUZZLE_CATALOG_PATH")
+    args = parser.parse_args()
+    if not args.output:
+        parser.error("--output or PUZZLE_CATALOG_PATH is required")
+
+    skipped: list[tuple[str, str]] = []
+    rows = _read_db() if args.from_db else _read_jsonl(args.source)
+    count = build_catalog(args.output, solution_keys(rows, skipped))
+    for game_name, puzzle_id in skipped:
+        print(f"skipped {game_name}/{puzzle_id}: no canonical solution")
+    print(f"done: {count} puzzle(s) written to {args.output}, {len(skipped)} skipped")
+
+
+if __name__ == "__main__":
+    main()
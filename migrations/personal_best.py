@@ -0,0 +1,37 @@
+# Convert ranking boards to the one-entry-per-user (personal best) layout.
+#
+# Old boards hold one member per verified submission, with the record encoded
+# in the member itself (JSON or the colon-joined legacy format). This folds each
+# of those members into member = user_uuid (best composite score wins) plus the
+# ranking_entry:{game}:{level} side hash, then removes the old member. Members
+# that already have an entry, or that do not decode to another user's record,
+# are left untouched (user_uuid may itself contain ":" or start with "{"). It uses
+# the same Lua script as live writes, so it is safe while the API is serving
+# and safe to re-run.
+#
+#   python -m migrations.personal_best            # every ranking:* key
+#   python -m migrations.personal_best sudoku     # only ranking:sudoku:*
+import argparse
+
+from repository.kv_proc import KvProc
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert ranking boards to personal-best members")
+    parser.add_argument("game_name", nargs="?", default="*")
+    args = parser.parse_args()
+
+    with KvProc() as kv_proc:
+        total = 0
+        for key in kv_proc.redis.scan_iter(match=f"ranking:{args.game_name}:*", count=100):
+            parts = key.split(":", 2)
+            if len(parts) != 3 or ":" in parts[2]:
+                continue  # not a board, or a daily/weekly/monthly window board (ranking:{game}:{level}:d:...)
+            migrated = kv_proc.migrate_to_personal_best(parts[1], parts[2])
+            total += migrated
+            print(f"{key}: {migrated} member(s) migrated")
+        print(f"done: {total} member(s) migrated")
+
+
+if __name__ == "__main__":
+    main()
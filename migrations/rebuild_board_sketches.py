@@ -0,0 +1,40 @@
+# Rebuild the per-board submission sketches (sketch:{game}:{level}) from game_records.
+#
+# Streams every verified record of a board in id order, in keyset pages of
+# RANKING_FILL_CHUNK rows, into a fresh sketch and then replaces the shared copy
+# in Redis. Memory stays at one page plus one sketch however large the table is.
+# Counts that API instances merge into a board while it is being rebuilt are
+# overwritten, so run it off-peak; re-running is safe.
+#
+#   python -m migrations.rebuild_board_sketches            # every board in GAME_WHITELIST
+#   python -m migrations.rebuild_board_sketches sudoku     # only sudoku boards
+import argparse
+
+from env import Env
+from repository.kv_proc import KvProc
+from repository.rdb_proc import RDBProc
+from service.logic import GAME_WHITELIST
+from utils.quantile_sketch import QuantileSketch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild board submission sketches from MySQL")
+    parser.add_argument("game_name", nargs="?", default="")
+    args = parser.parse_args()
+    if args.game_name and args.game_name not in GAME_WHITELIST:
+        parser.error(f"unknown game: {args.game_name}")
+
+    games = [args.game_name] if args.game_name else sorted(GAME_WHITELIST)
+    with RDBProc() as rdb_proc, KvProc() as kv_proc:
+        for game_name in games:
+            for level in sorted(GAME_WHITELIST[game_name]):
+                sketch = QuantileSketch()
+                for chunk in rdb_proc.iter_verified_records(game_name, level, Env.RANKING_FILL_CHUNK):
+                    for record in chunk:
+                        sketch.add(KvProc._ranking_score(record))
+                kv_proc.set_board_sketch(game_name, level, sketch)
+                print(f"sketch:{game_name}:{level}: {sketch.count} record(s), {len(sketch.buckets)} bucket(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# Rescore existing ranking sorted sets with the composite ranking score.
+#
+# Recomputes each user's score from the entry stored in ranking_entry:{game}:{level}
+# and rewrites it in place (ZADD XX), so it is safe to run while the API is
+# serving and safe to re-run. Use it whenever the composite score layout changes.
+# Boards still in the one-member-per-submission layout are converted (and scored)
+# by migrations.personal_best instead.
+#
+#   python -m migrations.rescore_rankings            # every ranking:* key
+#   python -m migrations.rescore_rankings sudoku     # only ranking:sudoku:*
+import argparse
+
+from repository.kv_proc import KvProc
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rescore ranking sorted sets")
+    parser.add_argument("game_name", nargs="?", default="*")
+    args = parser.parse_args()
+
+    with KvProc() as kv_proc:
+        total = 0
+        for key in kv_proc.redis.scan_iter(match=f"ranking:{args.game_name}:*", count=100):
+            parts = key.split(":", 2)
+            if len(parts) != 3 or ":" in parts[2]:
+                continue  # not a board, or a daily/weekly/monthly window board (ranking:{game}:{level}:d:...)
+            updated = kv_proc.rescore_ranking(parts[1], parts[2])
+            total += updated
+            print(f"{key}: {updated} member(s) rescored")
+        print(f"done: {total} member(s) rescored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# Move nicknames out of ranking entries into user:{uuid} hashes and build the
+# user:{uuid}:boards index that makes nickname updates O(1).
+#
+# Boards still holding per-submission members (the JSON or colon-joined formats
+# read by KvProc._decode_member) are first folded into personal-best entries;
+# then every entry seeds its user's nickname (HSETNX, so names set since via
+# PATCH /record/user win) and adds the board to the user's index. Safe while the
+# API is serving and safe to re-run.
+#
+#   python -m migrations.user_index            # every ranking:* key
+#   python -m migrations.user_index sudoku     # only ranking:sudoku:*
+import argparse
+
+from repository.kv_proc import KvProc
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build user nickname hashes and board indexes")
+    parser.add_argument("game_name", nargs="?", default="*")
+    args = parser.parse_args()
+
+    with KvProc() as kv_proc:
+        total = 0
+        for key in kv_proc.redis.scan_iter(match=f"ranking:{args.game_name}:*", count=100):
+            parts = key.split(":", 2)
+            if len(parts) != 3 or ":" in parts[2]:
+                continue  # not a board, or a daily/weekly/monthly window board (ranking:{game}:{level}:d:...)
+            migrated = kv_proc.migrate_to_personal_best(parts[1], parts[2])
+            indexed = kv_proc.index_users(parts[1], parts[2])
+            total += indexed
+            print(f"{key}: {migrated} legacy member(s) folded, {indexed} user(s) indexed")
+        print(f"done: {total} user(s) indexed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
 from dataclasses import dataclass
 from typing import Optional
 
+# Games ranked by score (DESC) instead of clear_time/mistake/hint (ASC)
+SCORE_BASED_GAMES = {"woodoku", "2048"}
+# Largest score the INT score column holds
+MAX_SCORE = 2**31 - 1
+# Longest list (answers, action_log, ...) a submission may carry; also bounds a 2048 replay's moves
+MAX_LIST_LEN = 1000
+
 @dataclass
 class GameRecord:
     id: Optional[int] = None
@@ -31,5 +38,6 @@ class GameRecord:
 #     is_verified BOOLEAN DEFAULT FALSE,
 #     user_ip VARCHAR(45),
 #     insert_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-#     INDEX idx_ranking (game_name, level, is_verified, clear_time) -- 랭킹 조회 최적화 (mistake, hint 의 경우, 정렬 조건에 추가)
+#     INDEX idx_ranking (game_name, level, is_verified, clear_time), -- 랭킹 조회 최적화 (mistake, hint 의 경우, 정렬 조건에 추가)
+#     INDEX idx_history (user_uuid, game_name, level, insert_ts) -- 사용자 기록 조회 / 닉네임 변경
 # );
@@ -0,0 +1,288 @@
+# game_record redis proc (asyncio / redis.asyncio)
+import time
+
+import redis
+import redis.asyncio as aioredis
+from redis.commands.core import AsyncScript
+
+from env import Env
+from model.game_record import GameRecord
+from repository.kv_proc import (
+    RANKING_FILLED_TTL,
+    REJECTION_STREAM,
+    SESSION_TTL,
+    SKETCH_MERGE_ATTEMPTS,
+    KvProc,
+    _nickname_cache,
+)
+from repository.lua_scripts import (
+    CONSUME_SESSION,
+    ENQUEUE_SUBMISSION,
+    RANK_AROUND_USER,
+    RELEASE_LOCK,
+    TAKE_RATE_TOKENS,
+    UPDATE_PERSONAL_BEST,
+    WINDOW_RANKING,
+)
+from utils.metrics import STORE_SECONDS, timed
+from utils.quantile_sketch import QuantileSketch
+
+# Process-wide async connection pool, created in the FastAPI lifespan when ASYNC_IO is enabled.
+_async_pool: aioredis.ConnectionPool | None = None
+
+
+def init_async_pool() -> aioredis.ConnectionPool:
+    global _async_pool
+    if _async_pool is None:
+        config = Env()
+        _async_pool = aioredis.ConnectionPool(
+            host=config.REDIS_HOST,
+            port=config.REDIS_PORT,
+            db=0,
+            decode_responses=True,
+            max_connections=config.REDIS_MAX_CONNECTIONS,
+            socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=config.REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+    return _async_pool
+
+
+def get_async_pool() -> aioredis.ConnectionPool:
+    if _async_pool is None:
+        return init_async_pool()
+    return _async_pool
+
+
+async def close_async_pool() -> None:
+    global _async_pool
+    if _async_pool is not None:
+        pool, _async_pool = _async_pool, None
+        await pool.disconnect()
+
+
+def get_async_pool_status() -> dict:
+    pool = _async_pool
+    if pool is None:
+        return {"initialized": False}
+    return {
+        "initialized": True,
+        "max_connections": pool.max_connections,
+        "created": len(pool._available_connections) + len(pool._in_use_connections),
+        "available": len(pool._available_connections),
+        "in_use": len(pool._in_use_connections),
+    }
+
+
+# Hashed once per process like KvProc's scripts; this client never connects
+_SCRIPT_HASHER = aioredis.Redis(decode_responses=True)
+
+
+class AsyncKvProc:
+    """Async counterpart of KvProc; key layout and member encoding are shared with it."""
+
+    _update_personal_best = AsyncScript(_SCRIPT_HASHER, UPDATE_PERSONAL_BEST)
+    _release_lock = AsyncScript(_SCRIPT_HASHER, RELEASE_LOCK)
+    _enqueue_submission = AsyncScript(_SCRIPT_HASHER, ENQUEUE_SUBMISSION)
+    _consume_session = AsyncScript(_SCRIPT_HASHER, CONSUME_SESSION)
+    _window_ranking = AsyncScript(_SCRIPT_HASHER, WINDOW_RANKING)
+    _rank_around_user = AsyncScript(_SCRIPT_HASHER, RANK_AROUND_USER)
+    _take_rate_tokens = AsyncScript(_SCRIPT_HASHER, TAKE_RATE_TOKENS)
+
+    def __init__(self, pool: aioredis.ConnectionPool | None = None) -> None:
+        self.redis = aioredis.Redis(connection_pool=pool or get_async_pool())
+
+    async def __aenter__(self) -> "AsyncKvProc":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        # The pool is process-wide (see close_async_pool); nothing to release per proc.
+        return None
+
+    async def ping(self) -> bool:
+        return bool(await self.redis.ping())
+
+    @timed(STORE_SECONDS, "redis", "insert_game_record")
+    async def insert_game_record(self, record: GameRecord, now: int | None = None) -> int:
+        if not record.is_verified:
+            return 0
+        keys, args = KvProc._personal_best_params(record, now)
+        return int(await self._update_personal_best(keys=keys, args=args, client=self.redis))
+
+    @timed(STORE_SECONDS, "redis", "consume_game_session")
+    async def consume_game_session(self, record: GameRecord, now: int) -> tuple[str, int] | None:
+        key = KvProc._session_key(record.game_name, record.level, record.user_uuid)
+        reply = await self._consume_session(keys=[key], args=[now, record.clear_time], client=self.redis)
+        return (reply[0], int(reply[1])) if reply else None
+
+    async def restore_game_session(self, record: GameRecord, session: tuple[str, int]) -> None:
+        start, ttl_ms = session
+        key = KvProc._session_key(record.game_name, record.level, record.user_uuid)
+        await self.redis.set(key, start, px=ttl_ms if ttl_ms > 0 else SESSION_TTL * 1000, nx=True)
+
+    @timed(STORE_SECONDS, "redis", "insert_game_records")
+    async def insert_game_records(self, records: list[GameRecord], now: int | None = None) -> None:
+        if not records:
+            return
+        pipeline = self.redis.pipeline(transaction=False)
+        for record in records:
+            if not record.is_verified:
+                continue
+            keys, args = KvProc._personal_best_params(record, now)
+            await self._update_personal_best(keys=keys, args=args, client=pipeline)
+        await pipeline.execute()
+
+    @timed(STORE_SECONDS, "redis", "get_ranking")
+    async def get_ranking(self, game_name: str, level: str, limit: int = 10) -> list[GameRecord]:
+        user_uuids = await self.redis.zrange(KvProc._ranking_key(game_name, level), 0, limit - 1)
+        if not user_uuids:
+            return []
+        nicknames = _nickname_cache.get_many(user_uuids)
+        missing = [user_uuid for user_uuid in user_uuids if user_uuid not in nicknames]
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hmget(KvProc._entry_key(game_name, level), user_uuids)
+        for user_uuid in missing:
+            pipe.hget(KvProc._user_key(user_uuid), "nickname")
+        entries, *fetched = await pipe.execute()
+        return KvProc._hydrate_ranking(entries, nicknames, missing, fetched, game_name, level)
+
+    @timed(STORE_SECONDS, "redis", "get_window_ranking")
+    async def get_window_ranking(self, game_name: str, level: str, window: str, limit: int, now: int) -> list[GameRecord]:
+        keys = KvProc._window_ranking_keys(game_name, level, window, now)
+        reply = await self._window_ranking(
+            keys=keys, args=[limit, Env.RANKING_WINDOW_SIZE, Env.RANKING_WINDOW_AGGREGATE_TTL], client=self.redis
+        )
+        user_uuids, entries = reply[0::2], reply[1::2]
+        if not user_uuids:
+            return []
+        nicknames = _nickname_cache.get_many(user_uuids)
+        missing = [user_uuid for user_uuid in user_uuids if user_uuid not in nicknames]
+        fetched = []
+        if missing:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_uuid in missing:
+                pipe.hget(KvProc._user_key(user_uuid), "nickname")
+            fetched = await pipe.execute()
+        return KvProc._hydrate_ranking(entries, nicknames, missing, fetched, game_name, level)
+
+    @timed(STORE_SECONDS, "redis", "get_rank_around")
+    async def get_rank_around(self, game_name: str, level: str, user_uuid: str, neighbors: int) -> tuple[int, int, list[tuple[int, GameRecord]]]:
+        keys = [KvProc._ranking_key(game_name, level), KvProc._entry_key(game_name, level)]
+        reply = await self._rank_around_user(keys=keys, args=[user_uuid, neighbors], client=self.redis)
+        rank, total = int(reply[0]), int(reply[1])
+        if rank < 0:
+            return 0, total, []
+        user_uuids, entries = reply[3::2], reply[4::2]
+        nicknames = _nickname_cache.get_many(user_uuids)
+        missing = [member for member in user_uuids if member not in nicknames]
+        fetched = []
+        if missing:
+            pipe = self.redis.pipeline(transaction=False)
+            for member in missing:
+                pipe.hget(KvProc._user_key(member), "nickname")
+            fetched = await pipe.execute()
+        return rank + 1, total, KvProc._hydrate_around(int(reply[2]), entries, nicknames, missing, fetched, game_name, level)
+
+    @timed(STORE_SECONDS, "redis", "update_nickname")
+    async def update_nickname(self, user_uuid: str, nickname: str) -> list[tuple[str, str]]:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(KvProc._user_key(user_uuid), "nickname", nickname)
+        pipe.smembers(KvProc._user_boards_key(user_uuid))
+        _, boards = await pipe.execute()
+        _nickname_cache.set(user_uuid, nickname)
+        return KvProc._parse_boards(boards)
+
+    async def is_ranking_filled(self, game_name: str, level: str) -> bool:
+        return bool(await self.redis.exists(KvProc._filled_key(game_name, level)))
+
+    async def mark_ranking_filled(self, game_name: str, level: str) -> None:
+        await self.redis.set(KvProc._filled_key(game_name, level), "1", ex=RANKING_FILLED_TTL)
+
+    async def acquire_fill_lock(self, game_name: str, level: str, token: str, ttl: int) -> bool:
+        return bool(await self.redis.set(KvProc._fill_lock_key(game_name, level), token, nx=True, ex=ttl))
+
+    async def release_fill_lock(self, game_name: str, level: str, token: str) -> None:
+        await self._release_lock(keys=[KvProc._fill_lock_key(game_name, level)], args=[token], client=self.redis)
+
+    async def is_fill_locked(self, game_name: str, level: str) -> bool:
+        return bool(await self.redis.exists(KvProc._fill_lock_key(game_name, level)))
+
+    async def bump_ranking_versions(self, boards: list[tuple[str, str]]) -> None:
+        if not boards:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for game_name, level in boards:
+            pipe.incr(KvProc._ranking_version_key(game_name, level))
+        await pipe.execute()
+
+    @timed(STORE_SECONDS, "redis", "get_ranking_cache")
+    async def get_ranking_cache(self, game_name: str, level: str, limit: int) -> tuple[int, tuple[str, str] | None]:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(KvProc._ranking_version_key(game_name, level))
+        pipe.get(KvProc._ranking_cache_key(game_name, level, limit))
+        version, cached = await pipe.execute()
+        return KvProc._parse_ranking_cache(version, cached)
+
+    @timed(STORE_SECONDS, "redis", "set_ranking_cache")
+    async def set_ranking_cache(self, game_name: str, level: str, limit: int, version: int, cached: tuple[str, str], ttl: int) -> None:
+        body, etag = cached
+        await self.redis.set(KvProc._ranking_cache_key(game_name, level, limit), f"{version}\n{etag}\n{body}", ex=ttl)
+
+    @timed(STORE_SECONDS, "redis", "merge_board_sketch")
+    async def merge_board_sketch(self, game_name: str, level: str, pending: QuantileSketch) -> QuantileSketch:
+        key = KvProc._sketch_key(game_name, level)
+        async with self.redis.pipeline() as pipe:
+            for _ in range(SKETCH_MERGE_ATTEMPTS):
+                try:
+                    await pipe.watch(key)
+                    merged = KvProc._decode_sketch(await pipe.get(key))
+                    if not pending.count:
+                        return merged
+                    merged.merge(pending)
+                    pipe.multi()
+                    pipe.set(key, merged.encode())
+                    await pipe.execute()
+                    return merged
+                except redis.WatchError:
+                    continue
+        raise redis.WatchError(f"{key} kept changing while merging")
+
+    @timed(STORE_SECONDS, "redis", "take_rate_tokens")
+    async def take_rate_tokens(self, buckets: list[tuple[str, int, int]], now_ms: int) -> list[int]:
+        keys, args = KvProc._rate_limit_params(buckets, now_ms)
+        return [int(wait) for wait in await self._take_rate_tokens(keys=keys, args=args, client=self.redis)]
+
+    @timed(STORE_SECONDS, "redis", "enqueue_submission")
+    async def enqueue_submission(self, ticket: str, record: GameRecord, payload: dict, now: int, max_backlog: int,
+                                 status_ttl: int) -> str | int:
+        keys, args = KvProc._enqueue_submission_params(ticket, record, payload, now, max_backlog, status_ttl)
+        return await self._enqueue_submission(keys=keys, args=args, client=self.redis)
+
+    async def sample_rejection(self, record: GameRecord, payload: dict, result, maxlen: int) -> None:
+        fields = KvProc._rejection_fields(record, payload, result)
+        await self.redis.xadd(REJECTION_STREAM, fields, maxlen=maxlen, approximate=True)
+
+    @timed(STORE_SECONDS, "redis", "get_ingest_status")
+    async def get_ingest_status(self, ticket: str) -> dict | None:
+        return await self.redis.hgetall(KvProc._ingest_status_key(ticket)) or None
+
+    @timed(STORE_SECONDS, "redis", "insert_game_session")
+    async def insert_game_session(self, game_name: str, level: str, user_uuid: str) -> None:
+        key = KvProc._session_key(game_name, level, user_uuid)
+        await self.redis.set(key, f"{int(time.time())}", ex=SESSION_TTL)  # 세션 유효기간 1시간
+
+    async def check_game_session(self, game_name: str, level: str, user_uuid: str) -> bool:
+        key = KvProc._session_key(game_name, level, user_uuid)
+        return bool(await self.redis.exists(key))
+
+    async def get_game_session_start(self, game_name: str, level: str, user_uuid: str) -> int | None:
+        value = await self.redis.get(KvProc._session_key(game_name, level, user_uuid))
+        if not value:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    async def renew_game_session(self, game_name: str, level: str, user_uuid: str) -> None:
+        await self.redis.expire(KvProc._session_key(game_name, level, user_uuid), SESSION_TTL)
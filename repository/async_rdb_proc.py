@@ -0,0 +1,140 @@
+# game_record table logic (asyncio / aiomysql)
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from env import Env
+from model.game_record import GameRecord
+from repository.rdb_proc import (
+    AUTOINC_SETTINGS_QUERY,
+    HISTORY_BEFORE_QUERY,
+    HISTORY_QUERY,
+    INSERT_GAME_RECORD_QUERY,
+    UPDATE_NICKNAME_QUERY,
+    VERIFIED_RECORDS_CHUNK_QUERY,
+    _build_db_url,
+    _record_checkout,
+    batch_record_ids,
+    batch_record_params,
+    check_batch_record_ids,
+    get_pool_status,
+    insert_game_records_query,
+    ranking_query,
+    record_params,
+)
+from utils.metrics import STORE_SECONDS, timed
+
+# Process-wide async engine, created in the FastAPI lifespan when ASYNC_IO is enabled.
+_async_engine: AsyncEngine | None = None
+
+
+def init_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        config = Env()
+        _async_engine = create_async_engine(
+            _build_db_url(config, driver="aiomysql"),
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+        )
+    return _async_engine
+
+
+def get_async_engine() -> AsyncEngine:
+    if _async_engine is None:
+        return init_async_engine()
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        engine, _async_engine = _async_engine, None
+        await engine.dispose()
+
+
+def get_async_pool_status() -> dict:
+    engine = _async_engine
+    if engine is None:
+        return {"initialized": False}
+    return get_pool_status(engine.sync_engine)
+
+
+class AsyncRDBProc:
+    def __init__(self, engine: AsyncEngine | None = None):
+        self.engine = engine or get_async_engine()
+
+    async def __aenter__(self) -> "AsyncRDBProc":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        # Connections go back to the shared pool after every statement block.
+        return None
+
+    async def _execute(self, statement, params: dict | None = None):
+        started = time.perf_counter()
+        async with self.engine.connect() as conn:
+            _record_checkout((time.perf_counter() - started) * 1000)
+            async with conn.begin():
+                return await conn.execute(statement, params or {})
+
+    async def ping(self) -> bool:
+        result = await self._execute(text("SELECT 1"))
+        return result.scalar() == 1
+
+    @timed(STORE_SECONDS, "rdb", "insert_game_record")
+    async def insert_game_record(self, record: GameRecord) -> int:
+        result = await self._execute(INSERT_GAME_RECORD_QUERY, record_params(record))
+        record_id = result.lastrowid
+        return int(record_id) if record_id is not None else 0
+
+    @timed(STORE_SECONDS, "rdb", "insert_game_records")
+    async def insert_game_records(self, records: list[GameRecord]) -> list[int]:
+        if not records:
+            return []
+        result = await self._execute(insert_game_records_query(len(records)), batch_record_params(records))
+        return batch_record_ids(result.lastrowid, len(records))
+
+    async def check_batch_inserts(self) -> None:
+        result = await self._execute(AUTOINC_SETTINGS_QUERY)
+        check_batch_record_ids(*result.one())
+
+    @timed(STORE_SECONDS, "rdb", "get_ranking")
+    async def get_ranking(self, game_name: str, level: str, limit: int = 10) -> list[GameRecord]:
+        params = {"game_name": game_name, "level": level, "limit": limit}
+        return [GameRecord(**row) for row in await self.select_query(ranking_query(game_name), params)]
+
+    @timed(STORE_SECONDS, "rdb", "get_history_by_user_uuid")
+    async def get_history_by_user_uuid(self, game_name: str, level: str, user_uuid: str, limit: int = 10,
+                                       before_id: int | None = None) -> list[GameRecord]:
+        params = {"game_name": game_name, "level": level, "user_uuid": user_uuid, "limit": limit}
+        query = HISTORY_QUERY
+        if before_id is not None:
+            params["before_id"] = before_id
+            query = HISTORY_BEFORE_QUERY
+        return [GameRecord(**row) for row in await self.select_query(query, params)]
+
+    async def iter_verified_records(self, game_name: str, level: str, chunk_size: int = 5000):
+        after_id = 0
+        while True:
+            params = {"game_name": game_name, "level": level, "after_id": after_id, "limit": chunk_size}
+            rows = await self.select_query(VERIFIED_RECORDS_CHUNK_QUERY, params)
+            if not rows:
+                return
+            yield [GameRecord(**row) for row in rows]
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1]["id"]
+
+    @timed(STORE_SECONDS, "rdb", "update_nickname")
+    async def update_nickname(self, user_uuid: str, nickname: str) -> None:
+        await self._execute(UPDATE_NICKNAME_QUERY, {"nickname": nickname, "user_uuid": user_uuid})
+
+    async def select_query(self, query, params: dict | None = None) -> list[dict]:
+        statement = query if hasattr(query, "compile") else text(query)
+        result = await self._execute(statement, params)
+        return [dict(row._mapping) for row in result]
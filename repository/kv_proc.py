@@ -1,21 +1,140 @@
 # game_record redis proc
 import json
+import threading
 import time
+from datetime import date, datetime, timedelta, timezone
 
 import redis
+from redis.commands.core import Script
 
 from env import Env
-from model.game_record import GameRecord
+from model.game_record import MAX_SCORE, SCORE_BASED_GAMES, GameRecord
+from repository.lua_scripts import (
+    CONSUME_SESSION,
+    ENQUEUE_SUBMISSION,
+    RANK_AROUND_USER,
+    RELEASE_LOCK,
+    TAKE_RATE_TOKENS,
+    UPDATE_PERSONAL_BEST,
+    WINDOW_RANKING,
+)
+from utils.metrics import STORE_SECONDS, timed
+from utils.quantile_sketch import QuantileSketch
+from utils.ttl_cache import TTLCache
+
+# Composite ranking score layout. Every ranking key is read ascending with ZRANGE,
+# so the encoded score must sort exactly like the ranking tuple:
+#   time-based games:  clear_time * 10^4 + mistake_count * 10^2 + hint_count
+#   score-based games: -score * 10^5 + clear_time   (score DESC, clear_time ASC)
+# Sub-fields are clamped to their slot so they can never carry into the next one.
+# The largest values stay well inside the 2^53 range a sorted-set double holds exactly.
+COUNT_SLOT = 100
+CLEAR_TIME_SLOT = COUNT_SLOT * COUNT_SLOT
+SCORE_SLOT = 100000
+
+# Deepest rank served by GET /record/ranking (the controller's MAX_LIMIT). Only
+# writes landing within it bump the board's ranking version.
+RANKING_CACHE_DEPTH = 50
+
+# How long an empty board rebuilt from MySQL is trusted to really be empty
+RANKING_FILLED_TTL = 3600
+
+# Windowed leaderboards served besides the all-time board. Each is built from daily
+# boards (ranking:{game}:{level}:d:{yyyymmdd}) kept for a little over the longest window.
+RANKING_WINDOWS = ("daily", "weekly", "monthly")
+RANKING_WINDOW_DAY_TTL = 35 * 86400
+
+# Optimistic (WATCH/MULTI) attempts at folding local counts into a shared board sketch
+SKETCH_MERGE_ATTEMPTS = 5
+
+# Game session lifetime (seconds)
+SESSION_TTL = 3600
+
+# Results of the session-consuming scripts (consume_game_session, enqueue_submission)
+SESSION_INVALID = -1
+INGEST_BACKLOG_FULL = 0
+
+# POST /record ingestion stream (RECORD_INGEST_STREAM) and the consumer group reading it
+INGEST_STREAM = "records:ingest"
+INGEST_GROUP = "record-workers"
+# Sampled verification rejections (VERIFY_REJECT_SAMPLE_RATE), for replaying them offline
+REJECTION_STREAM = "verify:rejections"
+SUBMISSION_FIELDS = (
+    "game_name", "level", "user_uuid", "nickname", "clear_time", "score", "mistake_count", "hint_count", "user_ip",
+)
+
+# Process-wide connection pool shared by every KvProc. Created once (at app
+# startup via init_pool, or lazily on first use) and disconnected at shutdown.
+_pool: redis.ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+# Hot nicknames for ranking hydration, shared by KvProc and AsyncKvProc.
+# "" marks a user without a user hash so they are not looked up again until expiry.
+_nickname_cache = TTLCache(Env.NICKNAME_CACHE_SIZE, Env.NICKNAME_CACHE_TTL)
+
+
+def init_pool() -> redis.ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = Env()
+            _pool = redis.ConnectionPool(
+                host=config.REDIS_HOST,
+                port=config.REDIS_PORT,
+                db=0,
+                decode_responses=True,  # 문자열로 자동 변환
+                max_connections=config.REDIS_MAX_CONNECTIONS,
+                socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=config.REDIS_SOCKET_CONNECT_TIMEOUT,
+                health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL,
+            )
+        return _pool
+
+
+def get_pool() -> redis.ConnectionPool:
+    if _pool is None:
+        return init_pool()
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.disconnect()
+            _pool = None
+
+
+def get_pool_status() -> dict:
+    pool = _pool
+    if pool is None:
+        return {"initialized": False}
+    return {
+        "initialized": True,
+        "max_connections": pool.max_connections,
+        "created": pool._created_connections,
+        "available": len(pool._available_connections),
+        "in_use": len(pool._in_use_connections),
+    }
+
+
+# Lua scripts are hashed once per process instead of per KvProc, and every call passes the
+# proc's client or pipeline. This client only supplies the encoder for the hash; it never connects.
+_SCRIPT_HASHER = redis.Redis(decode_responses=True)
+
 
 class KvProc:
-    def __init__(self) -> None:
-        self.config = Env()
-        self.redis = redis.Redis(
-            host=self.config.REDIS_HOST,
-            port=self.config.REDIS_PORT,
-            db=0,
-            decode_responses=True,  # 문자열로 자동 변환
-        )
+    _update_personal_best = Script(_SCRIPT_HASHER, UPDATE_PERSONAL_BEST)
+    _release_lock = Script(_SCRIPT_HASHER, RELEASE_LOCK)
+    _enqueue_submission = Script(_SCRIPT_HASHER, ENQUEUE_SUBMISSION)
+    _consume_session = Script(_SCRIPT_HASHER, CONSUME_SESSION)
+    _window_ranking = Script(_SCRIPT_HASHER, WINDOW_RANKING)
+    _rank_around_user = Script(_SCRIPT_HASHER, RANK_AROUND_USER)
+    _take_rate_tokens = Script(_SCRIPT_HASHER, TAKE_RATE_TOKENS)
+
+    def __init__(self, pool: redis.ConnectionPool | None = None) -> None:
+        # Borrow the shared pool; sockets stay warm between requests
+        self.redis = redis.Redis(connection_pool=pool or get_pool())
         self._disposed = False
 
     def __enter__(self) -> "KvProc":
@@ -25,54 +144,335 @@ class KvProc:
         self.close()
 
     def close(self) -> None:
-        if not self._disposed:
-            self.redis.close()
-            self._disposed = True
+        # The pool is process-wide (see close_pool), so only mark this proc as closed.
+        self._disposed = True
 
     def ping(self) -> bool:
         return bool(self.redis.ping())
 
-    # game record save for top ranking
-    def insert_game_record(self, record: GameRecord) -> None:
+    @staticmethod
+    def _ranking_key(game_name: str, level: str) -> str:
+        return f"ranking:{game_name}:{level}"
+
+    @staticmethod
+    def _entry_key(game_name: str, level: str) -> str:
+        # Side hash user_uuid -> encoded record shown for that user's best on the board
+        return f"ranking_entry:{game_name}:{level}"
+
+    @staticmethod
+    def _window_day(now: int) -> date:
+        # Calendar day a submission at `now` (unix seconds) counts towards
+        return datetime.fromtimestamp(now + Env.RANKING_WINDOW_UTC_OFFSET * 60, timezone.utc).date()
+
+    @staticmethod
+    def _daily_keys(game_name: str, level: str, day: date) -> tuple[str, str]:
+        # Daily window board and its entry hash, laid out like the all-time pair
+        suffix = day.strftime("%Y%m%d")
+        return f"ranking:{game_name}:{level}:d:{suffix}", f"ranking_entry:{game_name}:{level}:d:{suffix}"
+
+    @classmethod
+    def _window_ranking_keys(cls, game_name: str, level: str, window: str, now: int) -> list[str]:
+        # [window board, daily board, daily entries, ...] for the days of the window up to today, oldest first.
+        # Weeks start on Monday (ISO weeks); the current week or month only covers the days so far.
+        today = cls._window_day(now)
+        if window == "weekly":
+            start = today - timedelta(days=today.weekday())
+            year, week, _ = today.isocalendar()
+            board = f"ranking:{game_name}:{level}:w:{year}W{week:02d}"
+        elif window == "monthly":
+            start = today.replace(day=1)
+            board = f"ranking:{game_name}:{level}:m:{today:%Y%m}"
+        else:
+            start = today
+            board = cls._daily_keys(game_name, level, today)[0]
+        keys = [board]
+        for offset in range((today - start).days + 1):
+            keys.extend(cls._daily_keys(game_name, level, start + timedelta(days=offset)))
+        return keys
+
+    @staticmethod
+    def _ranking_version_key(game_name: str, level: str) -> str:
+        # Bumped whenever the top RANKING_CACHE_DEPTH of the board may have changed
+        return f"ranking_version:{game_name}:{level}"
+
+    @staticmethod
+    def _ranking_cache_key(game_name: str, level: str, limit: int) -> str:
+        return f"ranking_cache:{game_name}:{level}:{limit}"
+
+    @staticmethod
+    def _fill_lock_key(game_name: str, level: str) -> str:
+        return f"ranking_fill_lock:{game_name}:{level}"
+
+    @staticmethod
+    def _filled_key(game_name: str, level: str) -> str:
+        # Set once a board was rebuilt from MySQL, so a genuinely empty board is not refilled on every read
+        return f"ranking_filled:{game_name}:{level}"
+
+    @staticmethod
+    def _user_key(user_uuid: str) -> str:
+        # Per-user profile hash; the nickname lives here, not in ranking entries
+        return f"user:{user_uuid}"
+
+    @staticmethod
+    def _user_boards_key(user_uuid: str) -> str:
+        # Set of "{game_name}:{level}" boards the user has an entry on
+        return f"user:{user_uuid}:boards"
+
+    @staticmethod
+    def _sketch_key(game_name: str, level: str) -> str:
+        # Encoded QuantileSketch of every verified submission's ranking score on the board
+        return f"sketch:{game_name}:{level}"
+
+    @staticmethod
+    def _rate_limit_key(rule: str, identity: str) -> str:
+        # Token bucket of one client (user_uuid or IP) under a rate limit rule
+        return f"rate:{rule}:{identity}"
+
+    @staticmethod
+    def _rate_limit_params(buckets: list[tuple[str, int, int]], now_ms: int) -> tuple[list, list]:
+        args = [now_ms]
+        for _, capacity, period_ms in buckets:
+            args.extend((capacity, period_ms))
+        return [key for key, _, _ in buckets], args
+
+    @staticmethod
+    def _session_key(game_name: str, level: str, user_uuid: str) -> str:
+        return f"session:{game_name}:{level}:{user_uuid}"
+
+    @staticmethod
+    def _ingest_status_key(ticket: str) -> str:
+        # Hash with status (pending / success / rejected) and, once stored, record_id
+        return f"ingest_status:{ticket}"
+
+    @staticmethod
+    def _ranking_score(record: GameRecord) -> int:
+        if record.game_name in SCORE_BASED_GAMES:
+            # |score * SCORE_SLOT| stays below 2^53, so the double sorted-set score keeps the clear_time tie-break
+            score = min(max(record.score, 0), MAX_SCORE)
+            clear_time = min(max(record.clear_time, 0), SCORE_SLOT - 1)
+            return -score * SCORE_SLOT + clear_time
+        mistake_count = min(max(record.mistake_count, 0), COUNT_SLOT - 1)
+        hint_count = min(max(record.hint_count, 0), COUNT_SLOT - 1)
+        return max(record.clear_time, 0) * CLEAR_TIME_SLOT + mistake_count * COUNT_SLOT + hint_count
+
+    # game record save for top ranking (one member per user, kept only if it improves their best)
+    @timed(STORE_SECONDS, "redis", "insert_game_record")
+    def insert_game_record(self, record: GameRecord, now: int | None = None) -> int:
+        # Returns the user's new 1-based rank when their best improved, 0 otherwise.
+        # With `now` the record also counts towards that day's window boards.
         if not record.is_verified:
-            return
-        key = f"ranking:{record.game_name}:{record.level}"
-        member = self._encode_member(record)
-        score = record.clear_time
-        self.redis.zadd(key, {member: score})
+            return 0
+        keys, args = self._personal_best_params(record, now)
+        return int(self._update_personal_best(keys=keys, args=args, client=self.redis))
 
-    def insert_game_records(self, records: list[GameRecord]) -> None:
+    @timed(STORE_SECONDS, "redis", "consume_game_session")
+    def consume_game_session(self, record: GameRecord, now: int) -> tuple[str, int] | None:
+        # Deletes the record's game session when it started at least clear_time seconds ago.
+        # Returns (start, remaining ttl ms) for restore_game_session, or None when the session is not ready.
+        key = self._session_key(record.game_name, record.level, record.user_uuid)
+        reply = self._consume_session(keys=[key], args=[now, record.clear_time], client=self.redis)
+        return (reply[0], int(reply[1])) if reply else None
+
+    def restore_game_session(self, record: GameRecord, session: tuple[str, int]) -> None:
+        # Hands a consumed session back (a record that could not be stored); a newer session wins
+        start, ttl_ms = session
+        key = self._session_key(record.game_name, record.level, record.user_uuid)
+        self.redis.set(key, start, px=ttl_ms if ttl_ms > 0 else SESSION_TTL * 1000, nx=True)
+
+    @timed(STORE_SECONDS, "redis", "insert_game_records")
+    def insert_game_records(self, records: list[GameRecord], now: int | None = None) -> None:
+        # With `now`, the records are live submissions and also count towards that day's window
+        # boards; without it (rebuilds from MySQL, migrations) only the all-time boards change.
         if not records:
             return
-        pipeline = self.redis.pipeline()
+        pipeline = self.redis.pipeline(transaction=False)
         for record in records:
             if not record.is_verified:
                 continue
-            key = f"ranking:{record.game_name}:{record.level}"
-            member = self._encode_member(record)
-            score = record.clear_time
-            pipeline.zadd(key, {member: score})
+            keys, args = self._personal_best_params(record, now)
+            self._update_personal_best(keys=keys, args=args, client=pipeline)
         pipeline.execute()
 
+    @classmethod
+    def _window_params(cls, record: GameRecord, now: int) -> tuple[list[str], list]:
+        return list(cls._daily_keys(record.game_name, record.level, cls._window_day(now))), [
+            Env.RANKING_WINDOW_SIZE,
+            RANKING_WINDOW_DAY_TTL,
+        ]
+
+    @classmethod
+    def _personal_best_params(cls, record: GameRecord, now: int | None = None) -> tuple[list[str], list]:
+        keys = [
+            cls._ranking_key(record.game_name, record.level),
+            cls._entry_key(record.game_name, record.level),
+            cls._user_key(record.user_uuid),
+            cls._user_boards_key(record.user_uuid),
+            cls._ranking_version_key(record.game_name, record.level),
+        ]
+        args = [
+            record.user_uuid,
+            cls._ranking_score(record),
+            cls._encode_member(record),
+            f"{record.game_name}:{record.level}",
+            record.nickname or "",
+            RANKING_CACHE_DEPTH,
+        ]
+        if now is not None and Env.RANKING_WINDOWS:
+            window_keys, window_args = cls._window_params(record, now)
+            keys, args = keys + window_keys, args + window_args
+        return keys, args
+
     # get ranking by game name and level
+    @timed(STORE_SECONDS, "redis", "get_ranking")
     def get_ranking(self, game_name: str, level: str, limit: int = 10) -> list[GameRecord]:
-        key = f"ranking:{game_name}:{level}"
-        raw_rankings = self.redis.zrange(key, 0, -1, withscores=False)
+        # The composite score already orders the set, so only the top 'limit' users are read.
+        # Round trip 1: ZRANGE. Round trip 2: entries plus any nicknames missing from the local cache.
+        user_uuids = self.redis.zrange(self._ranking_key(game_name, level), 0, limit - 1)
+        if not user_uuids:
+            return []
+        nicknames = _nickname_cache.get_many(user_uuids)
+        missing = [user_uuid for user_uuid in user_uuids if user_uuid not in nicknames]
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hmget(self._entry_key(game_name, level), user_uuids)
+        for user_uuid in missing:
+            pipe.hget(self._user_key(user_uuid), "nickname")
+        entries, *fetched = pipe.execute()
+        return self._hydrate_ranking(entries, nicknames, missing, fetched, game_name, level)
+
+    @timed(STORE_SECONDS, "redis", "get_window_ranking")
+    def get_window_ranking(self, game_name: str, level: str, window: str, limit: int, now: int) -> list[GameRecord]:
+        # Round trip 1: the WINDOW_RANKING script (aggregating the window's daily boards when its
+        # board expired) returns the top users with their entries. Round trip 2, only for
+        # nicknames missing from the local cache.
+        keys = self._window_ranking_keys(game_name, level, window, now)
+        reply = self._window_ranking(
+            keys=keys, args=[limit, Env.RANKING_WINDOW_SIZE, Env.RANKING_WINDOW_AGGREGATE_TTL], client=self.redis
+        )
+        user_uuids, entries = reply[0::2], reply[1::2]
+        if not user_uuids:
+            return []
+        nicknames = _nickname_cache.get_many(user_uuids)
+        missing = [user_uuid for user_uuid in user_uuids if user_uuid not in nicknames]
+        fetched = []
+        if missing:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_uuid in missing:
+                pipe.hget(self._user_key(user_uuid), "nickname")
+            fetched = pipe.execute()
+        return self._hydrate_ranking(entries, nicknames, missing, fetched, game_name, level)
+
+    @timed(STORE_SECONDS, "redis", "get_rank_around")
+    def get_rank_around(self, game_name: str, level: str, user_uuid: str, neighbors: int) -> tuple[int, int, list[tuple[int, GameRecord]]]:
+        # Returns (1-based rank or 0 when the user is not ranked, board size, [(rank, record)] for the
+        # user and up to `neighbors` users on each side). One script call, plus one pipeline for
+        # nicknames missing from the local cache.
+        keys = [self._ranking_key(game_name, level), self._entry_key(game_name, level)]
+        reply = self._rank_around_user(keys=keys, args=[user_uuid, neighbors], client=self.redis)
+        rank, total = int(reply[0]), int(reply[1])
+        if rank < 0:
+            return 0, total, []
+        user_uuids, entries = reply[3::2], reply[4::2]
+        nicknames = _nickname_cache.get_many(user_uuids)
+        missing = [member for member in user_uuids if member not in nicknames]
+        fetched = []
+        if missing:
+            pipe = self.redis.pipeline(transaction=False)
+            for member in missing:
+                pipe.hget(self._user_key(member), "nickname")
+            fetched = pipe.execute()
+        return rank + 1, total, self._hydrate_around(int(reply[2]), entries, nicknames, missing, fetched, game_name, level)
+
+    @classmethod
+    def _hydrate_around(cls, first: int, entries: list[str | None], nicknames: dict, missing: list[str],
+                        fetched: list[str | None], game_name: str, level: str) -> list[tuple[int, GameRecord]]:
+        # Like _hydrate_ranking, but keeps each user's absolute rank; users without a readable entry are skipped
+        ranked = []
+        for rank, raw in enumerate(entries, start=first + 1):
+            record = cls._decode_member(raw, game_name, level) if raw is not None else None
+            if record is not None and record.is_verified:
+                ranked.append((rank, record))
+        cls._apply_nicknames([record for _, record in ranked], nicknames, missing, fetched)
+        return ranked
+
+    @classmethod
+    def _hydrate_ranking(cls, entries: list[str | None], nicknames: dict, missing: list[str], fetched: list[str | None],
+                         game_name: str, level: str) -> list[GameRecord]:
+        records = cls._rank_entries(entries, game_name, level)
+        cls._apply_nicknames(records, nicknames, missing, fetched)
+        return records
+
+    @staticmethod
+    def _apply_nicknames(records: list[GameRecord], nicknames: dict, missing: list[str], fetched: list[str | None]) -> None:
+        looked_up = {user_uuid: nickname or "" for user_uuid, nickname in zip(missing, fetched)}
+        _nickname_cache.set_many(looked_up)
+        nicknames.update(looked_up)
+        # Entries keep the nickname they were written with; the user hash overrides it when set
+        for record in records:
+            nickname = nicknames.get(record.user_uuid)
+            if nickname:
+                record.nickname = nickname
 
+    @classmethod
+    def _rank_entries(cls, entries: list[str | None], game_name: str, level: str) -> list[GameRecord]:
         result = []
-        for raw in raw_rankings:
-            record = self._decode_member(raw, game_name, level)
+        for raw in entries:
+            if raw is None:
+                continue
+            record = cls._decode_member(raw, game_name, level)
             if not record or not record.is_verified:
                 continue
             result.append(record)
-            result.append(record)
-        
-        if game_name in ['woodoku', '2048']:
-            result.sort(key=lambda item: item.score, reverse=True)
-        else:
-            result.sort(key=lambda item: (item.clear_time, item.mistake_count, item.hint_count))
-            
-        return result[:limit]
+        return result
+
+    def rescore_ranking(self, game_name: str, level: str) -> int:
+        # Recompute every user's score from their stored entry with _ranking_score
+        key = self._ranking_key(game_name, level)
+        updated = 0
+        for user_uuid, raw in self.redis.hscan_iter(self._entry_key(game_name, level), count=500):
+            record = self._decode_member(raw, game_name, level)
+            if record is None:
+                continue
+            if self.redis.zadd(key, {user_uuid: self._ranking_score(record)}, xx=True, ch=True):
+                updated += 1
+        return updated
+
+    def migrate_to_personal_best(self, game_name: str, level: str) -> int:
+        # Fold members written one-per-submission into one member per user (best wins).
+        # Runs through the same script as live writes, so it is safe while the API is serving.
+        # A member is legacy only if it decodes to a record naming another user and has no entry of its
+        # own: user_uuid is free-form, so a live member may well start with "{" or contain ":".
+        key = self._ranking_key(game_name, level)
+        entry_key = self._entry_key(game_name, level)
+        migrated = 0
+        for raw, _ in self.redis.zscan_iter(key, count=500):
+            if not (raw.startswith("{") or ":" in raw):
+                continue  # already a user_uuid member
+            record = self._decode_member(raw, game_name, level)
+            if record is None or not record.user_uuid or record.user_uuid == raw:
+                continue
+            if self.redis.hexists(entry_key, raw):
+                continue
+            pipe = self.redis.pipeline(transaction=False)
+            keys, args = self._personal_best_params(record)
+            self._update_personal_best(keys=keys, args=args, client=pipe)
+            pipe.zrem(key, raw)
+            pipe.execute()
+            migrated += 1
+        return migrated
+
+    def index_users(self, game_name: str, level: str) -> int:
+        # Build user hashes and board indexes for entries written before they existed
+        board = f"{game_name}:{level}"
+        indexed = 0
+        for user_uuid, raw in self.redis.hscan_iter(self._entry_key(game_name, level), count=500):
+            record = self._decode_member(raw, game_name, level)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.sadd(self._user_boards_key(user_uuid), board)
+            if record is not None and record.nickname:
+                pipe.hsetnx(self._user_key(user_uuid), "nickname", record.nickname)
+            pipe.execute()
+            indexed += 1
+        return indexed
 
     @staticmethod
     def _encode_member(record: GameRecord) -> str:
@@ -147,47 +547,212 @@ class KvProc:
         except (TypeError, ValueError):
             return None
 
-    def update_nickname(self, user_uuid: str, nickname: str) -> None:
-        cursor = 0
-        while True:
-            cursor, keys = self.redis.scan(cursor=cursor, match="ranking:*", count=100)
-            for key in keys:
-                parts = key.split(":", 2)
-                if len(parts) != 3:
-                    continue
-                game_name, level = parts[1], parts[2]
-                entries = self.redis.zrange(key, 0, -1, withscores=True)
-                if not entries:
-                    continue
-                pipe = self.redis.pipeline()
-                updated = False
-                for raw, score in entries:
-                    record = self._decode_member(raw, game_name, level)
-                    if not record or record.user_uuid != user_uuid:
-                        continue
-                    record.nickname = nickname
-                    member = self._encode_member(record)
-                    pipe.zadd(key, {member: score})
-                    pipe.zrem(key, raw)
-                    updated = True
-                if updated:
+    @timed(STORE_SECONDS, "redis", "update_nickname")
+    def update_nickname(self, user_uuid: str, nickname: str) -> list[tuple[str, str]]:
+        # One hash write, whatever the number of boards; returns the (game_name, level) boards the user is on
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(self._user_key(user_uuid), "nickname", nickname)
+        pipe.smembers(self._user_boards_key(user_uuid))
+        _, boards = pipe.execute()
+        _nickname_cache.set(user_uuid, nickname)
+        return self._parse_boards(boards)
+
+    def is_ranking_filled(self, game_name: str, level: str) -> bool:
+        return bool(self.redis.exists(self._filled_key(game_name, level)))
+
+    def mark_ranking_filled(self, game_name: str, level: str) -> None:
+        self.redis.set(self._filled_key(game_name, level), "1", ex=RANKING_FILLED_TTL)
+
+    def acquire_fill_lock(self, game_name: str, level: str, token: str, ttl: int) -> bool:
+        return bool(self.redis.set(self._fill_lock_key(game_name, level), token, nx=True, ex=ttl))
+
+    def release_fill_lock(self, game_name: str, level: str, token: str) -> None:
+        self._release_lock(keys=[self._fill_lock_key(game_name, level)], args=[token], client=self.redis)
+
+    def is_fill_locked(self, game_name: str, level: str) -> bool:
+        return bool(self.redis.exists(self._fill_lock_key(game_name, level)))
+
+    def bump_ranking_versions(self, boards: list[tuple[str, str]]) -> None:
+        if not boards:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for game_name, level in boards:
+            pipe.incr(self._ranking_version_key(game_name, level))
+        pipe.execute()
+
+    @timed(STORE_SECONDS, "redis", "get_ranking_cache")
+    def get_ranking_cache(self, game_name: str, level: str, limit: int) -> tuple[int, tuple[str, str] | None]:
+        # Returns the board's current version and the cached (body, etag) if it was built at that version
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self._ranking_version_key(game_name, level))
+        pipe.get(self._ranking_cache_key(game_name, level, limit))
+        version, cached = pipe.execute()
+        return self._parse_ranking_cache(version, cached)
+
+    @classmethod
+    def _parse_ranking_cache(cls, version: str | None, cached: str | None) -> tuple[int, tuple[str, str] | None]:
+        current = cls._safe_int(version) or 0
+        if not cached:
+            return current, None
+        cached_version, etag, body = cached.split("\n", 2)
+        if cls._safe_int(cached_version) != current:
+            return current, None
+        return current, (body, etag)
+
+    @timed(STORE_SECONDS, "redis", "set_ranking_cache")
+    def set_ranking_cache(self, game_name: str, level: str, limit: int, version: int, cached: tuple[str, str], ttl: int) -> None:
+        body, etag = cached
+        self.redis.set(self._ranking_cache_key(game_name, level, limit), f"{version}\n{etag}\n{body}", ex=ttl)
+
+    @staticmethod
+    def _parse_boards(boards) -> list[tuple[str, str]]:
+        result = []
+        for board in boards:
+            game_name, _, level = board.partition(":")
+            if game_name and level:
+                result.append((game_name, level))
+        return result
+
+    @timed(STORE_SECONDS, "redis", "merge_board_sketch")
+    def merge_board_sketch(self, game_name: str, level: str, pending: QuantileSketch) -> QuantileSketch:
+        # Fold a process's pending counts into the shared sketch and return the merged sketch.
+        # Other instances merge into the same key, so the read-modify-write is a WATCH/MULTI
+        # transaction retried on conflict; redis.WatchError when it keeps conflicting.
+        key = self._sketch_key(game_name, level)
+        with self.redis.pipeline() as pipe:
+            for _ in range(SKETCH_MERGE_ATTEMPTS):
+                try:
+                    pipe.watch(key)
+                    merged = self._decode_sketch(pipe.get(key))
+                    if not pending.count:
+                        return merged
+                    merged.merge(pending)
+                    pipe.multi()
+                    pipe.set(key, merged.encode())
                     pipe.execute()
-            if cursor == 0:
-                break
+                    return merged
+                except redis.WatchError:
+                    continue
+        raise redis.WatchError(f"{key} kept changing while merging")
+
+    def set_board_sketch(self, game_name: str, level: str, sketch: QuantileSketch) -> None:
+        self.redis.set(self._sketch_key(game_name, level), sketch.encode())
+
+    @staticmethod
+    def _decode_sketch(encoded: str | None) -> QuantileSketch:
+        if not encoded:
+            return QuantileSketch()
+        try:
+            return QuantileSketch.decode(encoded)
+        except (ValueError, IndexError):
+            return QuantileSketch()  # unreadable copy: start over rather than failing every flush
+
+    @timed(STORE_SECONDS, "redis", "take_rate_tokens")
+    def take_rate_tokens(self, buckets: list[tuple[str, int, int]], now_ms: int) -> list[int]:
+        # buckets are (key, capacity, period ms); returns the ms each one needs before it has a
+        # token again, all 0 when a token was taken from every bucket
+        keys, args = self._rate_limit_params(buckets, now_ms)
+        return [int(wait) for wait in self._take_rate_tokens(keys=keys, args=args, client=self.redis)]
+
+    # ingestion stream: API side
+    @timed(STORE_SECONDS, "redis", "enqueue_submission")
+    def enqueue_submission(self, ticket: str, record: GameRecord, payload: dict, now: int, max_backlog: int,
+                           status_ttl: int) -> str | int:
+        # Consumes the game session and queues the submission. Returns the stream entry id,
+        # SESSION_INVALID, or INGEST_BACKLOG_FULL (the session is then left in place).
+        keys, args = self._enqueue_submission_params(ticket, record, payload, now, max_backlog, status_ttl)
+        return self._enqueue_submission(keys=keys, args=args, client=self.redis)
+
+    @classmethod
+    def _enqueue_submission_params(cls, ticket: str, record: GameRecord, payload: dict, now: int, max_backlog: int,
+                                   status_ttl: int) -> tuple[list[str], list]:
+        keys = [cls._session_key(record.game_name, record.level, record.user_uuid), INGEST_STREAM, cls._ingest_status_key(ticket)]
+        args = [now, record.clear_time, max_backlog, status_ttl, ticket, *cls._encode_submission(record, payload)]
+        return keys, args
+
+    @staticmethod
+    def _encode_submission(record: GameRecord, payload: dict) -> tuple[str, str]:
+        data = {field: getattr(record, field) for field in SUBMISSION_FIELDS}
+        return (
+            json.dumps(data, separators=(",", ":"), ensure_ascii=True),
+            json.dumps(payload, separators=(",", ":"), ensure_ascii=True),
+        )
+
+    @staticmethod
+    def _decode_submission(fields: dict) -> tuple[str, GameRecord, dict]:
+        data = json.loads(fields["record"])
+        record = GameRecord(**{field: data[field] for field in SUBMISSION_FIELDS if field in data})
+        return fields["ticket"], record, json.loads(fields["payload"])
+
+    def sample_rejection(self, record: GameRecord, payload: dict, result, maxlen: int) -> None:
+        self.redis.xadd(REJECTION_STREAM, self._rejection_fields(record, payload, result), maxlen=maxlen, approximate=True)
+
+    @classmethod
+    def _rejection_fields(cls, record: GameRecord, payload: dict, result) -> dict:
+        encoded_record, encoded_payload = cls._encode_submission(record, payload)
+        return {
+            "stage": result.stage,
+            "reason": result.reason,
+            "record": encoded_record,
+            "payload": encoded_payload,
+            "ts": int(time.time() * 1000),
+        }
+
+    @timed(STORE_SECONDS, "redis", "get_ingest_status")
+    def get_ingest_status(self, ticket: str) -> dict | None:
+        return self.redis.hgetall(self._ingest_status_key(ticket)) or None
+
+    # ingestion stream: worker side
+    def ensure_ingest_group(self) -> None:
+        try:
+            self.redis.xgroup_create(INGEST_STREAM, INGEST_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def read_submissions(self, consumer: str, count: int, block_ms: int) -> list[tuple[str, dict]]:
+        response = self.redis.xreadgroup(INGEST_GROUP, consumer, {INGEST_STREAM: ">"}, count=count, block=block_ms)
+        if not response:
+            return []
+        return response[0][1]
+
+    def claim_stale_submissions(self, consumer: str, min_idle_ms: int, count: int) -> list[tuple[str, dict]]:
+        # Take over entries a crashed consumer read but never acknowledged
+        response = self.redis.xautoclaim(INGEST_STREAM, INGEST_GROUP, consumer, min_idle_ms, start_id="0-0", count=count)
+        return [(entry_id, fields) for entry_id, fields in response[1] if fields]
+
+    def get_ingest_statuses(self, tickets: list[str]) -> list[str | None]:
+        pipe = self.redis.pipeline(transaction=False)
+        for ticket in tickets:
+            pipe.hget(self._ingest_status_key(ticket), "status")
+        return pipe.execute()
+
+    def complete_submissions(self, entry_ids: list[str], results: dict[str, dict], status_ttl: int) -> None:
+        # Publish each ticket's outcome, then acknowledge and drop the entries so XLEN is the backlog
+        pipe = self.redis.pipeline(transaction=True)
+        for ticket, result in results.items():
+            key = self._ingest_status_key(ticket)
+            pipe.hset(key, mapping=result)
+            pipe.expire(key, status_ttl)
+        if entry_ids:
+            pipe.xack(INGEST_STREAM, INGEST_GROUP, *entry_ids)
+            pipe.xdel(INGEST_STREAM, *entry_ids)
+        pipe.execute()
 
+    @timed(STORE_SECONDS, "redis", "insert_game_session")
     def insert_game_session(self, game_name: str, level: str, user_uuid: str) -> None:
-        key = f"session:{game_name}:{level}:{user_uuid}"
+        key = self._session_key(game_name, level, user_uuid)
         start_time = f"{int(time.time())}"
-        self.redis.set(key, start_time, ex=3600)  # 세션 유효기간 1시간
+        self.redis.set(key, start_time, ex=SESSION_TTL)  # 세션 유효기간 1시간
 
     def check_game_session(self, game_name: str, level: str, user_uuid: str) -> bool:
-        key = f"session:{game_name}:{level}:{user_uuid}"
+        key = self._session_key(game_name, level, user_uuid)
         if self.redis.exists(key):
             return True
         return False
 
     def get_game_session_start(self, game_name: str, level: str, user_uuid: str) -> int | None:
-        key = f"session:{game_name}:{level}:{user_uuid}"
+        key = self._session_key(game_name, level, user_uuid)
         value = self.redis.get(key)
         if not value:
             return None
@@ -197,5 +762,5 @@ class KvProc:
             return None
 
     def renew_game_session(self, game_name: str, level: str, user_uuid: str) -> None:
-        key = f"session:{game_name}:{level}:{user_uuid}"
-        self.redis.expire(key, 3600)  # 세션 유효기간 1시간 연장
+        key = self._session_key(game_name, level, user_uuid)
+        self.redis.expire(key, SESSION_TTL)  # 세션 유효기간 1시간 연장
@@ -0,0 +1,224 @@
+# Redis Lua scripts shared by KvProc and AsyncKvProc.
+# Wrapped once per process in redis-py Script objects (see KvProc), which invoke them by EVALSHA.
+
+# Keep only a user's personal best on a ranking board.
+# Composite scores are "lower is better" for every game, so this is ZADD LT plus
+# a side-hash write that only happens when the sorted set actually improved.
+# On improvement the board is also added to the user's board index, and the
+# submitted nickname seeds the user hash if the user has none yet (a rename via
+# PATCH /record/user always wins over nicknames sent with records).
+# When the new best lands within the cached depth, the board's ranking version is
+# bumped so cached ranking responses are recomputed.
+# keys: ranking sorted set, entry hash, user hash, user board index, ranking version
+# argv: user_uuid, composite score, encoded entry, board id, nickname, cached depth
+# Returns the user's new 1-based rank when their best improved (or was first set), 0 otherwise.
+_PERSONAL_BEST_FUNCTION = """
+local function update_personal_best(keys, argv)
+    local current = redis.call('ZSCORE', keys[1], argv[1])
+    if current and tonumber(current) <= tonumber(argv[2]) then
+        return 0
+    end
+    redis.call('ZADD', keys[1], argv[2], argv[1])
+    redis.call('HSET', keys[2], argv[1], argv[3])
+    redis.call('SADD', keys[4], argv[4])
+    if argv[5] ~= '' then
+        redis.call('HSETNX', keys[3], 'nickname', argv[5])
+    end
+    local rank = redis.call('ZRANK', keys[1], argv[1])
+    if rank < tonumber(argv[6]) then
+        redis.call('INCR', keys[5])
+    end
+    return rank + 1
+end
+"""
+
+# Keep a user's best of the day on a daily window board (ranking:{game}:{level}:d:{yyyymmdd}).
+# Same "lower is better" rule as update_personal_best, applied even when the
+# all-time best did not improve. The board is trimmed to the window size after
+# every insert, so its memory is bounded however many users play that day; the
+# dropped users' entries go with them. Both keys expire once no window can
+# aggregate the day any more.
+_WINDOW_BEST_FUNCTION = """
+local function update_window_best(board_key, entry_key, user_uuid, score, entry, size, ttl)
+    local current = redis.call('ZSCORE', board_key, user_uuid)
+    if current and tonumber(current) <= tonumber(score) then
+        return
+    end
+    redis.call('ZADD', board_key, score, user_uuid)
+    redis.call('HSET', entry_key, user_uuid, entry)
+    local overflow = redis.call('ZCARD', board_key) - tonumber(size)
+    if overflow > 0 then
+        local dropped = redis.call('ZRANGE', board_key, -overflow, -1)
+        redis.call('ZREMRANGEBYRANK', board_key, -overflow, -1)
+        redis.call('HDEL', entry_key, unpack(dropped))
+    end
+    redis.call('EXPIRE', board_key, ttl)
+    redis.call('EXPIRE', entry_key, ttl)
+end
+"""
+
+# True when the game session exists and started at least clear_time seconds ago.
+_SESSION_READY_FUNCTION = """
+local function session_ready(key, now, clear_time)
+    local start = tonumber(redis.call('GET', key))
+    return start ~= nil and tonumber(now) - start >= tonumber(clear_time)
+end
+"""
+
+# KEYS/ARGV as in update_personal_best above, optionally followed by
+# KEYS[6] daily window board, KEYS[7] its entry hash, ARGV[7] window size, ARGV[8] window ttl
+# for records that also count towards the windowed leaderboards.
+UPDATE_PERSONAL_BEST = _PERSONAL_BEST_FUNCTION + _WINDOW_BEST_FUNCTION + """
+if KEYS[6] then
+    update_window_best(KEYS[6], KEYS[7], ARGV[1], ARGV[2], ARGV[3], ARGV[7], ARGV[8])
+end
+return update_personal_best(KEYS, ARGV)
+"""
+
+# Consume the game session of a verified POST /record (closing the replay window)
+# before the record is stored; the ranking is only updated once the row exists.
+# KEYS[1] session
+# ARGV[1] now (unix seconds), ARGV[2] clear_time
+# Returns nil when the session is missing or too recent, otherwise {start, remaining ttl in ms}
+# so a failed insert can hand the session back.
+CONSUME_SESSION = _SESSION_READY_FUNCTION + """
+if not session_ready(KEYS[1], ARGV[1], ARGV[2]) then
+    return false
+end
+local start = redis.call('GET', KEYS[1])
+local ttl = redis.call('PTTL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return {start, ttl}
+"""
+
+# Release a lock only if it is still held by the caller's token.
+# KEYS[1] lock key, ARGV[1] token. Returns 1 when released.
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Queue a POST /record submission on the ingest stream, consuming its game session.
+# The ticket's status hash is created in the same step, so a ticket handed to a
+# client is always visible to GET /record/status. A full backlog leaves the
+# session in place so the client can retry.
+# KEYS[1] session, KEYS[2] ingest stream, KEYS[3] ticket status hash
+# ARGV[1] now (unix seconds), ARGV[2] clear_time, ARGV[3] max backlog, ARGV[4] status ttl, ARGV[5] ticket,
+# ARGV[6] encoded record, ARGV[7] encoded payload
+# Returns the stream entry id, -1 when the session is missing or too recent, 0 when the backlog is full.
+ENQUEUE_SUBMISSION = _SESSION_READY_FUNCTION + """
+if not session_ready(KEYS[1], ARGV[1], ARGV[2]) then
+    return -1
+end
+if redis.call('XLEN', KEYS[2]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[3], 'status', 'pending')
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return redis.call('XADD', KEYS[2], '*', 'ticket', ARGV[5], 'record', ARGV[6], 'payload', ARGV[7])
+"""
+
+# Read the top of a windowed leaderboard with each user's entry, in one round trip.
+# A multi-day window (week, month) is the ZUNIONSTORE ... AGGREGATE MIN of its
+# daily boards, materialized at KEYS[1] for ARGV[3] seconds and trimmed to the
+# window size; a one-day window reads its daily board directly. Each user's entry
+# comes from the most recent day holding their window best.
+# KEYS[1] window board, KEYS[2..] daily board and daily entry hash pairs, oldest day first
+# ARGV[1] limit, ARGV[2] window size, ARGV[3] window board ttl
+# Returns a flat list of user_uuid, entry (nil when missing) pairs, best first.
+WINDOW_RANKING = """
+local days = (#KEYS - 1) / 2
+local board = KEYS[2]
+if days > 1 then
+    board = KEYS[1]
+    if redis.call('EXISTS', board) == 0 then
+        local command = {'ZUNIONSTORE', board, days}
+        for day = 1, days do
+            command[#command + 1] = KEYS[2 * day]
+        end
+        command[#command + 1] = 'AGGREGATE'
+        command[#command + 1] = 'MIN'
+        redis.call(unpack(command))
+        redis.call('ZREMRANGEBYRANK', board, tonumber(ARGV[2]), -1)
+        redis.call('EXPIRE', board, ARGV[3])
+    end
+end
+local top = redis.call('ZRANGE', board, 0, tonumber(ARGV[1]) - 1, 'WITHSCORES')
+local result = {}
+for i = 1, #top, 2 do
+    local entry = false
+    for day = days, 1, -1 do
+        local score = redis.call('ZSCORE', KEYS[2 * day], top[i])
+        if score and tonumber(score) == tonumber(top[i + 1]) then
+            entry = redis.call('HGET', KEYS[2 * day + 1], top[i])
+            break
+        end
+    end
+    result[#result + 1] = top[i]
+    result[#result + 1] = entry
+end
+return result
+"""
+
+# A user's position on a ranking board with the users around it, in one round trip.
+# Members are user_uuids, so ZRANK finds the user in O(log N) and the neighbours
+# are the ranks next to it.
+# KEYS[1] ranking sorted set, KEYS[2] entry hash
+# ARGV[1] user_uuid, ARGV[2] neighbours to return on each side
+# Returns {-1, board size} when the user is not on the board, otherwise
+# {0-based rank, board size, 0-based rank of the first user, user_uuid, entry, user_uuid, entry, ...}.
+RANK_AROUND_USER = """
+local total = redis.call('ZCARD', KEYS[1])
+local rank = redis.call('ZRANK', KEYS[1], ARGV[1])
+if not rank then
+    return {-1, total}
+end
+local first = math.max(rank - tonumber(ARGV[2]), 0)
+local users = redis.call('ZRANGE', KEYS[1], first, rank + tonumber(ARGV[2]))
+local entries = redis.call('HMGET', KEYS[2], unpack(users))
+local result = {rank, total, first}
+for i = 1, #users do
+    result[#result + 1] = users[i]
+    result[#result + 1] = entries[i]
+end
+return result
+"""
+
+# Token buckets for one request, checked and taken together: a token is taken
+# from every bucket or from none, so a request refused by one limit does not
+# drain the others. A bucket holds up to `capacity` tokens and refills
+# `capacity` per `period`; an idle bucket expires once it would be full again.
+# KEYS[i] bucket hash (tokens, ts)
+# ARGV[1] now (unix ms), ARGV[2i] capacity and ARGV[2i+1] period (ms) of KEYS[i]
+# Returns one wait per bucket: all 0 when the tokens were taken, otherwise the
+# ms until each empty bucket has a token again (0 for the buckets that had one).
+TAKE_RATE_TOKENS = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local waits = {}
+local refused = false
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local period = tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local elapsed = math.max(now - (tonumber(state[2]) or now), 0)
+    tokens = math.min(capacity, tokens + elapsed * capacity / period)
+    levels[i] = tokens
+    waits[i] = 0
+    if tokens < 1 then
+        waits[i] = math.ceil((1 - tokens) * period / capacity)
+        refused = true
+    end
+end
+if not refused then
+    for i, key in ipairs(KEYS) do
+        redis.call('HSET', key, 'tokens', tostring(levels[i] - 1), 'ts', now)
+        redis.call('PEXPIRE', key, tonumber(ARGV[2 * i + 1]))
+    end
+end
+return waits
+"""
@@ -1,14 +1,231 @@
 # game_record table logic
-from sqlalchemy import create_engine, text
-from model.game_record import GameRecord
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.engine import Engine
+from model.game_record import SCORE_BASED_GAMES, GameRecord
 from env import Env
+from utils.metrics import STORE_SECONDS, timed
+
+# Process-wide engine shared by every RDBProc. Created once (at app startup via
+# init_engine, or lazily on first use) and disposed at shutdown.
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+_pool_stats = {"checkouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+_pool_stats_lock = threading.Lock()
+
+
+# Statements shared by the sync RDBProc and the async AsyncRDBProc
+INSERT_COLUMNS = (
+    "game_name", "level", "user_uuid", "nickname", "clear_time", "score", "mistake_count", "hint_count",
+    "is_verified", "user_ip",
+)
+
+INSERT_GAME_RECORD_QUERY = text("""
+    INSERT INTO game_records
+    (game_name, level, user_uuid, nickname, clear_time, score, mistake_count, hint_count, is_verified, user_ip)
+    VALUES
+    (:game_name, :level, :user_uuid, :nickname, :clear_time, :score, :mistake_count, :hint_count, :is_verified, :user_ip)
+""")
+
+
+@lru_cache(maxsize=256)
+def insert_game_records_query(count: int):
+    # One multi-row INSERT for `count` records; parameters are suffixed with the row index
+    rows = ", ".join(
+        "(" + ", ".join(f":{column}_{index}" for column in INSERT_COLUMNS) + ")" for index in range(count)
+    )
+    return text(f"INSERT INTO game_records ({', '.join(INSERT_COLUMNS)}) VALUES {rows}")
+
+
+def batch_record_params(records: list[GameRecord]) -> dict:
+    params = {}
+    for index, record in enumerate(records):
+        for column, value in record_params(record).items():
+            params[f"{column}_{index}"] = value
+    return params
+
+
+def batch_record_ids(first_id: int | None, count: int) -> list[int]:
+    # A multi-row INSERT is a "simple insert" to InnoDB: with innodb_autoinc_lock_mode 0 or 1
+    # and auto_increment_increment 1 its ids are one consecutive block, and LAST_INSERT_ID()
+    # reports the first of them. check_batch_record_ids refuses any other setup.
+    if not first_id:
+        return [0] * count
+    return list(range(int(first_id), int(first_id) + count))
+
+
+# Interleaved lock mode (2) and multi-primary increments do not hand a statement consecutive ids
+AUTOINC_SETTINGS_QUERY = text("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")
+
+
+def check_batch_record_ids(increment, lock_mode) -> None:
+    if int(increment) != 1 or int(lock_mode) not in (0, 1):
+        raise RuntimeError(
+            "multi-row inserts need auto_increment_increment=1 and innodb_autoinc_lock_mode 0 or 1 "
+            f"to return record ids (got {increment} and {lock_mode})"
+        )
+
+
+# Ingest tickets are written in the same transaction as their records, so a submission
+# redelivered after a worker crash finds its record instead of inserting it again
+STORED_INGEST_TICKETS_QUERY = text("""
+    SELECT ticket, record_id FROM ingest_tickets WHERE ticket IN :tickets
+""").bindparams(bindparam("tickets", expanding=True))
+
+INSERT_INGEST_TICKET_QUERY = text("""
+    INSERT INTO ingest_tickets (ticket, record_id) VALUES (:ticket, :record_id)
+""")
+
+# Explicit column lists instead of SELECT *
+GAME_RECORD_COLUMNS = (
+    "id, game_name, level, user_uuid, nickname, clear_time, score, mistake_count, hint_count, "
+    "is_verified, user_ip, insert_ts"
+)
+HISTORY_COLUMNS = (
+    "r.id, r.game_name, r.level, r.user_uuid, r.nickname, r.clear_time, r.score, r.mistake_count, "
+    "r.hint_count, r.is_verified, r.insert_ts"
+)
+
+# History pages walk idx_history (user_uuid, game_name, level, insert_ts) newest first.
+# insert_ts has second resolution, so id (the implicit last column of every InnoDB
+# secondary index) breaks ties and the cursor is the last record_id of the previous page.
+HISTORY_QUERY = text(f"""
+    SELECT {HISTORY_COLUMNS} FROM game_records r
+    WHERE r.user_uuid = :user_uuid AND r.game_name = :game_name AND r.level = :level
+    ORDER BY r.insert_ts DESC, r.id DESC
+    LIMIT :limit
+""")
+
+HISTORY_BEFORE_QUERY = text(f"""
+    SELECT {HISTORY_COLUMNS} FROM game_records r
+    JOIN (SELECT insert_ts, id FROM game_records WHERE id = :before_id) c
+    WHERE r.user_uuid = :user_uuid AND r.game_name = :game_name AND r.level = :level
+      AND (r.insert_ts < c.insert_ts OR (r.insert_ts = c.insert_ts AND r.id < c.id))
+    ORDER BY r.insert_ts DESC, r.id DESC
+    LIMIT :limit
+""")
+
+VERIFIED_RECORDS_CHUNK_QUERY = text(f"""
+    SELECT {GAME_RECORD_COLUMNS}
+    FROM game_records
+    WHERE game_name = :game_name AND level = :level AND is_verified = TRUE AND id > :after_id
+    ORDER BY id
+    LIMIT :limit
+""")
+
+PUZZLE_SOLUTIONS_CHUNK_QUERY = text("""
+    SELECT id, game_name, puzzle_id, solution
+    FROM puzzle_catalog
+    WHERE id > :after_id
+    ORDER BY id
+    LIMIT :limit
+""")
+
+UPDATE_NICKNAME_QUERY = text("""
+    UPDATE game_records
+    SET nickname = :nickname
+    WHERE user_uuid = :user_uuid
+""")
+
+
+def ranking_query(game_name: str):
+    if game_name in SCORE_BASED_GAMES:
+        order_clause = "score DESC, clear_time ASC"
+    else:
+        order_clause = "clear_time ASC, mistake_count ASC, hint_count ASC"
+    return text(f"""
+        SELECT {GAME_RECORD_COLUMNS} FROM game_records
+        WHERE game_name = :game_name AND level = :level AND is_verified = TRUE
+        ORDER BY {order_clause}
+        LIMIT :limit
+    """)
+
+
+def record_params(record: GameRecord) -> dict:
+    return {
+        "game_name": record.game_name,
+        "level": record.level,
+        "user_uuid": record.user_uuid,
+        "nickname": record.nickname,
+        "clear_time": record.clear_time,
+        "score": record.score,
+        "mistake_count": record.mistake_count,
+        "hint_count": record.hint_count,
+        "is_verified": record.is_verified,
+        "user_ip": record.user_ip,
+    }
+
+
+def _build_db_url(config: Env, driver: str = "pymysql") -> str:
+    return f"mysql+{driver}://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
+
+
+def init_engine() -> Engine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            config = Env()
+            _engine = create_engine(
+                _build_db_url(config),
+                pool_size=config.DB_POOL_SIZE,
+                max_overflow=config.DB_MAX_OVERFLOW,
+                pool_timeout=config.DB_POOL_TIMEOUT,
+                pool_recycle=config.DB_POOL_RECYCLE,
+                pool_pre_ping=config.DB_POOL_PRE_PING,
+            )
+        return _engine
+
+
+def get_engine() -> Engine:
+    if _engine is None:
+        return init_engine()
+    return _engine
+
+
+def dispose_engine() -> None:
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+def _record_checkout(wait_ms: float) -> None:
+    STORE_SECONDS.observe(wait_ms / 1000, "rdb", "checkout")
+    with _pool_stats_lock:
+        _pool_stats["checkouts"] += 1
+        _pool_stats["wait_ms_total"] += wait_ms
+        if wait_ms > _pool_stats["wait_ms_max"]:
+            _pool_stats["wait_ms_max"] = wait_ms
+
+
+def get_pool_status(engine: Engine | None = None) -> dict:
+    with _pool_stats_lock:
+        stats = dict(_pool_stats)
+    checkouts = stats["checkouts"]
+    stats["wait_ms_avg"] = stats["wait_ms_total"] / checkouts if checkouts else 0.0
+    engine = engine or _engine
+    if engine is None:
+        return {"initialized": False, **stats}
+    pool = engine.pool
+    return {
+        "initialized": True,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **stats,
+    }
+
 
 class RDBProc:
-    def __init__(self):
-        # Initialize database connection here
-        self.config = Env()
-        self.DB_URL = f"mysql+pymysql://{self.config.DB_USER}:{self.config.DB_PASSWORD}@{self.config.DB_HOST}:{self.config.DB_PORT}/{self.config.DB_NAME}"
-        self.engine = create_engine(self.DB_URL)
+    def __init__(self, engine: Engine | None = None):
+        # Borrow the shared pooled engine; connections return to the pool on exit
+        self.engine = engine or get_engine()
         self._disposed = False
 
     def __enter__(self):
@@ -18,55 +235,69 @@ class RDBProc:
         self.close_connection()
 
     def close_connection(self):
-        if not self._disposed:
-            self.engine.dispose()
-            self._disposed = True
+        # The engine is process-wide (see dispose_engine), so only mark this proc as closed.
+        self._disposed = True
+
+    @contextmanager
+    def _begin(self):
+        started = time.perf_counter()
+        with self.engine.connect() as conn:
+            _record_checkout((time.perf_counter() - started) * 1000)
+            with conn.begin():
+                yield conn
 
     def ping(self) -> bool:
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             result = conn.execute(text("SELECT 1"))
             return result.scalar() == 1
 
     # insert game record
+    @timed(STORE_SECONDS, "rdb", "insert_game_record")
     def insert_game_record(self, record: GameRecord) -> int:
-        insert_query = text("""
-            INSERT INTO game_records
-            (game_name, level, user_uuid, nickname, clear_time, score, mistake_count, hint_count, is_verified, user_ip)
-            VALUES
-            (:game_name, :level, :user_uuid, :nickname, :clear_time, :score, :mistake_count, :hint_count, :is_verified, :user_ip)
-        """)
-        params = {
-            "game_name": record.game_name,
-            "level": record.level,
-            "user_uuid": record.user_uuid,
-            "nickname": record.nickname,
-            "nickname": record.nickname,
-            "clear_time": record.clear_time,
-            "score": record.score,
-            "mistake_count": record.mistake_count,
-            "hint_count": record.hint_count,
-            "is_verified": record.is_verified,
-            "user_ip": record.user_ip,
-        }
-        with self.engine.begin() as conn:
-            result = conn.execute(insert_query, params)
+        with self._begin() as conn:
+            result = conn.execute(INSERT_GAME_RECORD_QUERY, record_params(record))
             record_id = result.lastrowid
         return int(record_id) if record_id is not None else 0
 
+    @timed(STORE_SECONDS, "rdb", "insert_game_records")
+    def insert_game_records(self, records: list[GameRecord]) -> list[int]:
+        # Insert several records in one statement and one commit; returns their ids in order
+        if not records:
+            return []
+        with self._begin() as conn:
+            result = conn.execute(insert_game_records_query(len(records)), batch_record_params(records))
+            first_id = result.lastrowid
+        return batch_record_ids(first_id, len(records))
+
+    @timed(STORE_SECONDS, "rdb", "insert_ingested_records")
+    def insert_ingested_records(self, tickets: list[str], records: list[GameRecord]) -> list[int]:
+        # insert_game_records keyed on the ingest ticket: a ticket stored before returns its record id
+        # and adds no row. A worker racing on the same ticket fails on the primary key and rolls back.
+        if not records:
+            return []
+        with self._begin() as conn:
+            stored = dict(conn.execute(STORED_INGEST_TICKETS_QUERY, {"tickets": tickets}).all())
+            fresh = [index for index, ticket in enumerate(tickets) if ticket not in stored]
+            if fresh:
+                result = conn.execute(
+                    insert_game_records_query(len(fresh)), batch_record_params([records[index] for index in fresh])
+                )
+                record_ids = batch_record_ids(result.lastrowid, len(fresh))
+                conn.execute(INSERT_INGEST_TICKET_QUERY, [
+                    {"ticket": tickets[index], "record_id": record_id} for index, record_id in zip(fresh, record_ids)
+                ])
+                stored.update((tickets[index], record_id) for index, record_id in zip(fresh, record_ids))
+        return [int(stored[ticket]) for ticket in tickets]
+
+    def check_batch_inserts(self) -> None:
+        # Raises RuntimeError unless insert_game_records can report the ids it was given
+        with self._begin() as conn:
+            check_batch_record_ids(*conn.execute(AUTOINC_SETTINGS_QUERY).one())
+
     # get ranking by game name and level
+    @timed(STORE_SECONDS, "rdb", "get_ranking")
     def get_ranking(self, game_name: str, level: str, limit: int = 10) -> list[GameRecord]:
         # Retrieve the top 'limit' rankings for the specified game and level
-        if game_name in ['woodoku', '2048']:
-            order_clause = "score DESC, clear_time ASC"
-        else:
-            order_clause = "clear_time ASC, mistake_count ASC, hint_count ASC"
-        
-        select_query = text(f"""
-            SELECT * FROM game_records
-            WHERE game_name = :game_name AND level = :level AND is_verified = TRUE
-            ORDER BY {order_clause}
-            LIMIT :limit
-        """)
         params = {
             "game_name": game_name,
             "level": level,
@@ -74,44 +305,64 @@ class RDBProc:
         }
 
         result = []
-        for row_data in self.select_query(select_query, params):
+        for row_data in self.select_query(ranking_query(game_name), params):
             result.append(GameRecord(**row_data))
         return result
 
-    # get history by nickname
-    def get_history_by_user_uuid(self, game_name: str, level: str, user_uuid: str, limit: int = 10) -> list[GameRecord]:
-        # Retrieve recent records for a user and game/level
-        select_query = text(f"""
-            SELECT * FROM game_records
-            WHERE game_name = :game_name AND level = :level AND user_uuid = :user_uuid
-            ORDER BY insert_ts DESC
-            LIMIT :limit
-        """)
+    # get history by user uuid
+    @timed(STORE_SECONDS, "rdb", "get_history_by_user_uuid")
+    def get_history_by_user_uuid(self, game_name: str, level: str, user_uuid: str, limit: int = 10,
+                                 before_id: int | None = None) -> list[GameRecord]:
+        # Retrieve recent records for a user and game/level, older than before_id when paging
         params = {
             "game_name": game_name,
             "level": level,
             "user_uuid": user_uuid,
             "limit": limit
         }
+        query = HISTORY_QUERY
+        if before_id is not None:
+            params["before_id"] = before_id
+            query = HISTORY_BEFORE_QUERY
 
         result = []
-        for row_data in self.select_query(select_query, params):
+        for row_data in self.select_query(query, params):
             result.append(GameRecord(**row_data))
         return result
 
+    def iter_verified_records(self, game_name: str, level: str, chunk_size: int = 5000):
+        # Stream every verified record of a board in id order, one keyset-paginated chunk at a time
+        after_id = 0
+        while True:
+            params = {"game_name": game_name, "level": level, "after_id": after_id, "limit": chunk_size}
+            rows = self.select_query(VERIFIED_RECORDS_CHUNK_QUERY, params)
+            if not rows:
+                return
+            yield [GameRecord(**row_data) for row_data in rows]
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1]["id"]
+
+    def iter_puzzle_solutions(self, chunk_size: int = 5000):
+        # Stream puzzle_catalog rows as (game_name, puzzle_id, solution JSON) in id order
+        after_id = 0
+        while True:
+            rows = self.select_query(PUZZLE_SOLUTIONS_CHUNK_QUERY, {"after_id": after_id, "limit": chunk_size})
+            for row in rows:
+                yield row["game_name"], row["puzzle_id"], row["solution"]
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1]["id"]
+
+    @timed(STORE_SECONDS, "rdb", "update_nickname")
     def update_nickname(self, user_uuid: str, nickname: str) -> None:
-        update_query = text("""
-            UPDATE game_records
-            SET nickname = :nickname
-            WHERE user_uuid = :user_uuid
-        """)
-        with self.engine.begin() as conn:
-            conn.execute(update_query, {"nickname": nickname, "user_uuid": user_uuid})
+        with self._begin() as conn:
+            conn.execute(UPDATE_NICKNAME_QUERY, {"nickname": nickname, "user_uuid": user_uuid})
 
     def select_query(self, query, params: dict | None = None) -> list[dict]:
         if params is None:
             params = {}
-        with self.engine.begin() as conn:
+        with self._begin() as conn:
             statement = query if hasattr(query, "compile") else text(query)
             result = conn.execute(statement, params)
             return [dict(row._mapping) for row in result]
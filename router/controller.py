@@ -1,23 +1,95 @@
+import inspect
+import json
+import math
 import os
+from contextlib import asynccontextmanager
 from typing import Any, List, Optional
 
-from fastapi import Depends, FastAPI, Header, HTTPException, Request
-from pydantic import BaseModel, Field
-
-from model.game_record import GameRecord
-from service.logic import GameService, ConnService
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from env import Env
+from model.game_record import MAX_LIST_LEN, MAX_SCORE, GameRecord
+from repository.async_kv_proc import close_async_pool, init_async_pool
+from repository.async_rdb_proc import dispose_async_engine, init_async_engine
+from repository.kv_proc import close_pool, init_pool
+from repository.rdb_proc import dispose_engine, init_engine
+from service.async_logic import AsyncConnService, AsyncGameService
+from service.logic import SESSION_REJECTED, GameService, ConnService
+from service.record_writer import WriteQueueFull, async_record_writer, record_writer
+from utils.body_limit import BodySizeLimitMiddleware
 from utils.generate_uuid import GenerateUUID
-
-app = FastAPI()
-service = GameService()
+from utils.metrics import GaugeCallback, MetricsMiddleware, render as render_metrics
+from utils.verifier.pool import init_verify_pool, shutdown_verify_pool, warm_verifiers
+
+ASYNC_IO = Env.ASYNC_IO
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if ASYNC_IO:
+        init_async_engine()
+        init_async_pool()
+    else:
+        init_engine()
+        init_pool()
+    init_verify_pool()
+    # Inline verification (and games the pool does not take) uses this process's tables
+    await run_in_threadpool(warm_verifiers)
+    if Env.RECORD_WRITE_BEHIND:
+        if ASYNC_IO:
+            await async_record_writer.start()
+        else:
+            await run_in_threadpool(record_writer.start)
+    try:
+        yield
+    finally:
+        # Drain queued records before the pools they are written through go away
+        if Env.RECORD_WRITE_BEHIND:
+            if ASYNC_IO:
+                await async_record_writer.stop()
+            else:
+                await run_in_threadpool(record_writer.stop)
+        await run_in_threadpool(shutdown_verify_pool)
+        if ASYNC_IO:
+            await close_async_pool()
+            await dispose_async_engine()
+        else:
+            close_pool()
+            dispose_engine()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=Env.MAX_BODY_BYTES)
+app.add_middleware(MetricsMiddleware)
+service = AsyncGameService() if ASYNC_IO else GameService()
+conn_service = AsyncConnService() if ASYNC_IO else ConnService()
 RECORD_API_KEY = os.getenv("RECORD_API_KEY", "")
 ALLOWED_ORIGINS = {"https://urrrm.com", "https://www.urrrm.com"}
-MAX_LIST_LEN = 1000
 MAX_LIMIT = 50
+MAX_NEIGHBORS = 25
 MAX_NICKNAME_LEN = 20
 MAX_GAME_NAME_LEN = 32
 MAX_LEVEL_LEN = 20
 MAX_USER_UUID_LEN = 64
+TICKET_LEN = 32
+# POST /record list fields and the error reported when one is longer than MAX_LIST_LEN
+RECORD_LIST_FIELDS = {
+    "answers": "Answers list too large",
+    "wrong_answers": "Wrong answers list too large",
+    "hint_events": "Hint events list too large",
+    "action_log": "Action log too large",
+}
+
+
+async def _run(func, *args):
+    # Await coroutine services directly; run sync services in the threadpool
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    return await run_in_threadpool(func, *args)
 
 
 def _is_safe_slug(value: str, max_len: int) -> bool:
@@ -29,7 +101,26 @@ def _is_safe_slug(value: str, max_len: int) -> bool:
     return True
 
 
-def verify_request(request: Request, x_record_key: Optional[str] = Header(default=None, alias="X-Record-Key")):
+def _client_ip(request: Request) -> str:
+    # Detect real user IP behind Cloudflare/Nginx
+    x_forwarded_for = request.headers.get("X-Forwarded-For")
+    return (
+        request.headers.get("CF-Connecting-IP") or 
+        request.headers.get("X-Real-IP") or 
+        (x_forwarded_for.split(",")[0].strip() if x_forwarded_for else None) or
+        (request.client.host if request.client else "")
+    )
+
+
+async def _check_rate_limit(endpoint: str, game_name: str, user_uuid: str, user_ip: str) -> None:
+    retry_after = await _run(service.check_rate_limit, endpoint, game_name, user_uuid, user_ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=429, detail="Too many requests", headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+
+async def verify_request(request: Request, x_record_key: Optional[str] = Header(default=None, alias="X-Record-Key")):
     if RECORD_API_KEY:
         if not x_record_key or x_record_key != RECORD_API_KEY:
             raise HTTPException(status_code=403, detail="Unauthorized")
@@ -50,7 +141,8 @@ class RecordCreateRequest(BaseModel):
     user_uuid: str
     nickname: Optional[str] = None
     clear_time: int = Field(..., gt=0)
-    score: int = 0
+    puzzle_id: Optional[str] = Field(None, max_length=64)
+    score: int = Field(0, ge=0, le=MAX_SCORE)
     mistake_count: int = Field(0, ge=0)
     hint_count: int = Field(0, ge=0)
     answers: List[dict[str, Any]] = Field(default_factory=list)
@@ -86,17 +178,36 @@ def record_to_dict(record: GameRecord) -> dict:
 
 
 @app.get("/record/health")
-def health_check(key: Optional[str] = None):
+async def health_check(key: Optional[str] = None):
     if key != "health_8f3c9b2a":
         raise HTTPException(status_code=403, detail="Forbidden")
     #check database connection
-    conn_service = ConnService()
-    ping = conn_service.ping()
-    return {"status": "ok", "ping" : ping}
+    ping = await _run(conn_service.ping)
+    return {"status": "ok", "ping" : ping, "pool": conn_service.pool_status()}
+
+
+def _pool_gauges() -> dict[tuple[str, str], float]:
+    # Every numeric field of the health pool status, as (pool, field) -> value
+    gauges = {}
+    for pool, status in conn_service.pool_status().items():
+        for field, value in status.items():
+            if isinstance(value, (int, float)):
+                gauges[(pool, field)] = float(value)
+    return gauges
+
+
+GaugeCallback("record_pool_status", "Connection and verification pool status", ("pool", "field"), _pool_gauges)
+
+
+@app.get("/record/metrics")
+async def get_metrics(key: Optional[str] = None):
+    if Env.METRICS_KEY and key != Env.METRICS_KEY:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/record/user")
-def get_user(_: None = Depends(verify_request)):
+async def get_user(_: None = Depends(verify_request)):
     generate_uuid = GenerateUUID()
     uuid = generate_uuid.get()
     nickname = uuid[0:8]
@@ -104,54 +215,96 @@ def get_user(_: None = Depends(verify_request)):
 
 
 @app.post("/record/session")
-def create_session(payload: SessionCreateRequest, _: None = Depends(verify_request)):
+async def create_session(payload: SessionCreateRequest, request: Request, _: None = Depends(verify_request)):
     if not _is_safe_slug(payload.game_name, MAX_GAME_NAME_LEN):
         raise HTTPException(status_code=400, detail="Invalid game name")
     if not _is_safe_slug(payload.level, MAX_LEVEL_LEN):
         raise HTTPException(status_code=400, detail="Invalid level")
     if not payload.user_uuid or len(payload.user_uuid) > MAX_USER_UUID_LEN:
         raise HTTPException(status_code=400, detail="Invalid user UUID")
-    service.start_session(payload.game_name, payload.level, payload.user_uuid)
+    await _check_rate_limit("session", payload.game_name, payload.user_uuid, _client_ip(request))
+    await _run(service.start_session, payload.game_name, payload.level, payload.user_uuid)
     return {"status": "ok"}
 
 
 @app.patch("/record/user/{user_uuid}")
-def update_nickname(user_uuid: str, payload: NicknameUpdateRequest, _: None = Depends(verify_request)):
+async def update_nickname(user_uuid: str, payload: NicknameUpdateRequest, _: None = Depends(verify_request)):
     if not payload.nickname or len(payload.nickname) > MAX_NICKNAME_LEN:
         raise HTTPException(status_code=400, detail="Invalid nickname")
     try:
-        service.update_nickname(user_uuid, payload.nickname)
+        await _run(service.update_nickname, user_uuid, payload.nickname)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     return {"user_uuid": user_uuid, "nickname": payload.nickname}
 
 
-@app.post("/record")
-def insert_game_record(payload: RecordCreateRequest, request: Request, _: None = Depends(verify_request)):
-    if not _is_safe_slug(payload.game_name, MAX_GAME_NAME_LEN):
+def _prescan_record(body: bytes) -> dict:
+    # Checks that only need the decoded JSON, before pydantic builds thousands of list entries
+    try:
+        data = json.loads(body)
+    except ValueError as exc:
+        raise RequestValidationError(
+            [{"type": "json_invalid", "loc": ("body",), "msg": "JSON decode error", "input": {}}]
+        ) from exc
+    if not isinstance(data, dict):
+        return data  # model validation reports the type error
+    for field, detail in RECORD_LIST_FIELDS.items():
+        value = data.get(field)
+        if isinstance(value, list) and len(value) > MAX_LIST_LEN:
+            raise HTTPException(status_code=400, detail=detail)
+    # Fields of the wrong type are left to model validation
+    game_name, level, user_uuid, nickname = (data.get(field) for field in ("game_name", "level", "user_uuid", "nickname"))
+    if isinstance(game_name, str) and not _is_safe_slug(game_name, MAX_GAME_NAME_LEN):
         raise HTTPException(status_code=400, detail="Invalid game name")
-    if not _is_safe_slug(payload.level, MAX_LEVEL_LEN):
+    if isinstance(level, str) and not _is_safe_slug(level, MAX_LEVEL_LEN):
         raise HTTPException(status_code=400, detail="Invalid level")
-    if not payload.user_uuid or len(payload.user_uuid) > MAX_USER_UUID_LEN:
+    if isinstance(user_uuid, str) and (not user_uuid or len(user_uuid) > MAX_USER_UUID_LEN):
         raise HTTPException(status_code=400, detail="Invalid user UUID")
-    if payload.nickname and len(payload.nickname) > MAX_NICKNAME_LEN:
+    if isinstance(nickname, str) and len(nickname) > MAX_NICKNAME_LEN:
         raise HTTPException(status_code=400, detail="Invalid nickname")
-    if len(payload.answers) > MAX_LIST_LEN:
-        raise HTTPException(status_code=400, detail="Answers list too large")
-    if len(payload.wrong_answers) > MAX_LIST_LEN:
-        raise HTTPException(status_code=400, detail="Wrong answers list too large")
-    if len(payload.hint_events) > MAX_LIST_LEN:
-        raise HTTPException(status_code=400, detail="Hint events list too large")
-    if len(payload.action_log) > MAX_LIST_LEN:
-        raise HTTPException(status_code=400, detail="Action log too large")
-    # Detect real user IP behind Cloudflare/Nginx
-    x_forwarded_for = request.headers.get("X-Forwarded-For")
-    user_ip = (
-        request.headers.get("CF-Connecting-IP") or 
-        request.headers.get("X-Real-IP") or 
-        (x_forwarded_for.split(",")[0].strip() if x_forwarded_for else None) or
-        (request.client.host if request.client else "")
+    return data
+
+
+def _record_response(record_id: int, result, percentile: float | None = None) -> dict:
+    status = "success" if record_id else "rejected"
+    response = {"record_id": record_id, "status": status, "is_verified": bool(result)}
+    if percentile is not None:
+        response["percentile"] = percentile
+    if Env.VERIFY_DEBUG_REASONS and not result:
+        response["reason"] = result.code
+    return response
+
+
+@app.post("/record")
+async def insert_game_record(request: Request, _: None = Depends(verify_request)):
+    # The body is parsed by hand so the cheapest rejections come first:
+    # body size (middleware), raw JSON scan, rate limit, session, and only then the model
+    body = await request.body()
+    data = _prescan_record(body)
+    # Identity fields of the wrong type read as "" here and are reported by model validation below
+    fields = data if isinstance(data, dict) else {}
+    game_name, level, user_uuid = (
+        fields.get(name) if isinstance(fields.get(name), str) else "" for name in ("game_name", "level", "user_uuid")
     )
+    user_ip = _client_ip(request)
+    await _check_rate_limit("record", game_name, user_uuid, user_ip)
+    clear_time = fields.get("clear_time")
+    session_checked = False
+    if Env.RECORD_SESSION_PRECHECK and game_name and level and user_uuid and type(clear_time) is int and clear_time > 0:
+        try:
+            ready = await _run(service.is_session_ready, game_name, level, user_uuid, clear_time)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        if not ready:
+            return _record_response(0, SESSION_REJECTED)
+        session_checked = True
+    try:
+        payload = RecordCreateRequest.model_validate(data)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+        ) from exc
+
     nickname = payload.nickname or "Guest"
     record = GameRecord(
         game_name=payload.game_name,
@@ -166,6 +319,8 @@ def insert_game_record(payload: RecordCreateRequest, request: Request, _: None =
     )
 
     verification_payload = {
+        "puzzle_id": payload.puzzle_id,
+        "score": payload.score,
         "answers": payload.answers,
         "wrong_answers": payload.wrong_answers,
         "hint_events": payload.hint_events,
@@ -173,51 +328,99 @@ def insert_game_record(payload: RecordCreateRequest, request: Request, _: None =
     }
 
     try:
-        record_id, is_verified = service.add_game_record(record, verification_payload)
+        if Env.RECORD_INGEST_STREAM:
+            ticket = await _run(service.submit_game_record, record, verification_payload)
+            if ticket is not None:
+                return JSONResponse(status_code=202, content={"ticket": ticket, "status": "pending"})
+            record_id, result, percentile = 0, SESSION_REJECTED, None
+        else:
+            record_id, result, percentile = await _run(
+                service.add_game_record, record, verification_payload, session_checked, len(body)
+            )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-
-    status = "success" if record_id else "rejected"
-    return {"record_id": record_id, "status": status, "is_verified": is_verified}
+    except WriteQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"}) from exc
+
+    return _record_response(record_id, result, percentile)
+
+
+@app.get("/record/status/{ticket}")
+async def get_record_status(ticket: str, _: None = Depends(verify_request)):
+    if len(ticket) != TICKET_LEN or not all(ch in "0123456789abcdef" for ch in ticket):
+        raise HTTPException(status_code=400, detail="Invalid ticket")
+    status = await _run(service.get_record_status, ticket)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired ticket")
+    response = {
+        "ticket": ticket,
+        "status": status.get("status", "pending"),
+        "record_id": int(status.get("record_id") or 0),
+        "is_verified": status.get("is_verified") == "1",
+    }
+    if status.get("percentile"):
+        response["percentile"] = float(status["percentile"])
+    if Env.VERIFY_DEBUG_REASONS and status.get("reason"):
+        response["reason"] = status["reason"]
+    return response
 
 
 @app.get("/record/history/{game_name}/{level}/{user_uuid}")
-def get_user_history(
+async def get_user_history(
     game_name: str,
     level: str,
     user_uuid: str,
     limit: int = 10,
+    before_id: Optional[int] = None,
     _: None = Depends(verify_request),
 ):
     if limit > MAX_LIMIT:
         limit = MAX_LIMIT
     try:
-        records = service.get_user_history(game_name, level, user_uuid, limit)
+        records = await _run(service.get_user_history, game_name, level, user_uuid, limit, before_id)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     return [record_to_dict(record) for record in records]
 
 
 @app.get("/record/ranking/{game_name}/{level}")
-def get_ranking(game_name: str, level: str, limit: int = 10, _: None = Depends(verify_request)):
+async def get_ranking(
+    game_name: str,
+    level: str,
+    limit: int = 10,
+    window: str = "all",
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+    _: None = Depends(verify_request),
+):
     if limit > MAX_LIMIT:
         limit = MAX_LIMIT
     try:
-        records = service.get_top_rankings(game_name, level, limit)
+        body, etag = await _run(service.get_ranking_response, game_name, level, limit, window)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    ranking = []
-    for index, record in enumerate(records, start=1):
-        ranking.append(
-            {
-                "rank": index,
-                "user_uuid": record.user_uuid,
-                "nickname": record.nickname,
-                "clear_time": record.clear_time,
-                "score": record.score,
-                "mistake_count": record.mistake_count,
-                "hint_count": record.hint_count,
-            }
-        )
-    return ranking
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/record/ranking/{game_name}/{level}/user/{user_uuid}")
+async def get_user_rank(
+    game_name: str,
+    level: str,
+    user_uuid: str,
+    neighbors: int = 5,
+    _: None = Depends(verify_request),
+):
+    if not user_uuid or len(user_uuid) > MAX_USER_UUID_LEN:
+        raise HTTPException(status_code=400, detail="Invalid user UUID")
+    if neighbors > MAX_NEIGHBORS:
+        neighbors = MAX_NEIGHBORS
+    try:
+        result = await _run(service.get_user_rank, game_name, level, user_uuid, neighbors)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if result is None:
+        raise HTTPException(status_code=404, detail="User is not ranked on this board")
+    return result
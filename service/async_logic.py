@@ -0,0 +1,290 @@
+# async service, used when ASYNC_IO is enabled
+import asyncio
+import logging
+import time
+import uuid
+
+import redis
+
+from env import Env
+from repository.async_kv_proc import AsyncKvProc, get_async_pool_status as get_kv_pool_status
+from repository.async_rdb_proc import AsyncRDBProc, get_async_pool_status
+from repository.kv_proc import RANKING_CACHE_DEPTH, RANKING_WINDOWS, KvProc
+from service.board_sketches import board_sketches
+from service.logic import SESSION_REJECTED, GameService
+from service.ranking_cache import ranking_cache, serialize_ranking
+from service.rate_limiter import rate_limiter
+from service.record_writer import async_record_writer
+from utils.metrics import RANKING_CACHE, RATE_LIMITED, STAGE_SECONDS, SUBMISSIONS
+from utils.verifier.pool import get_verify_pool_status, verify_async
+from utils.verifier.result import VerifyResult
+
+
+logger = logging.getLogger(__name__)
+
+# In-flight board fills, so concurrent readers of an empty board in this process await one task
+_fill_tasks: dict[tuple[str, str], asyncio.Task] = {}
+
+
+class AsyncConnService:
+    def __init__(self):
+        pass
+
+    async def ping(self) -> dict[str, bool]:
+        result = {"rdb": False, "kv": False}
+        try:
+            async with AsyncRDBProc() as rdb_proc:
+                result.update({"rdb": await rdb_proc.ping()})
+        except Exception:
+            result.update({"rdb": False})
+        try:
+            async with AsyncKvProc() as kv_proc:
+                result.update({"kv": await kv_proc.ping()})
+        except Exception:
+            result.update({"kv": False})
+        return result
+
+    def pool_status(self) -> dict[str, dict]:
+        return {"rdb": get_async_pool_status(), "kv": get_kv_pool_status(), "verify": get_verify_pool_status()}
+
+
+class AsyncGameService(GameService):
+    """GameService over AsyncRDBProc/AsyncKvProc.
+
+    Validation is CPU-only and inherited unchanged; every method that touches
+    MySQL or Redis, and verification (which may wait on the process pool), is
+    overridden with a coroutine.
+    """
+
+    async def add_game_record(self, record, verification_payload: dict, session_checked: bool = False,
+                              payload_size: int | None = None) -> tuple[int, VerifyResult, float | None]:
+        self._validate_record_fields(record)
+
+        board = (record.game_name, record.level)
+        async with AsyncKvProc() as kv_proc:
+            if not session_checked and not await self._session_ready(
+                kv_proc, *board, record.user_uuid, record.clear_time
+            ):
+                return 0, SESSION_REJECTED, None
+            with STAGE_SECONDS.time("verify", *board):
+                result = await self.verify_record(record, verification_payload, payload_size)
+            record.is_verified = bool(result)
+            if not result:
+                SUBMISSIONS.inc(*board, "rejected_verification")
+                return 0, result, None
+
+            now = int(time.time())
+            with STAGE_SECONDS.time("session_consume", *board):
+                session = await kv_proc.consume_game_session(record, now)
+            if session is None:
+                SUBMISSIONS.inc(*board, "rejected_session")
+                return 0, SESSION_REJECTED, None
+            try:
+                with STAGE_SECONDS.time("rdb_insert", *board):
+                    record_id = await self._store_record(record)
+            except Exception:
+                await self._restore_session(kv_proc, record, session)
+                raise
+            with STAGE_SECONDS.time("ranking", *board):
+                try:
+                    rank = await kv_proc.insert_game_record(record, now)
+                except redis.RedisError:
+                    logger.exception("record %s stored but not ranked", record_id)
+                    SUBMISSIONS.inc(*board, "stored_unranked")
+                    return record_id, result, None
+            SUBMISSIONS.inc(*board, "stored")
+            if 0 < rank <= RANKING_CACHE_DEPTH:
+                ranking_cache.invalidate([(record.game_name, record.level)])
+            return record_id, result, await self.record_percentile(kv_proc, record)
+
+    @staticmethod
+    async def _restore_session(kv_proc: AsyncKvProc, record, session: tuple[str, int]) -> None:
+        try:
+            await kv_proc.restore_game_session(record, session)
+        except redis.RedisError:
+            pass
+
+    @staticmethod
+    async def record_percentile(kv_proc: AsyncKvProc, record) -> float | None:
+        if not Env.BOARD_SKETCHES:
+            return None
+        board = (record.game_name, record.level)
+        pending = board_sketches.take_due(board)
+        if pending is not None:
+            try:
+                board_sketches.flushed(board, await kv_proc.merge_board_sketch(*board, pending))
+            except redis.RedisError:
+                board_sketches.restore(board, pending)
+        return board_sketches.observe(board, KvProc._ranking_score(record))
+
+    async def is_session_ready(self, game_name: str, level: str, user_uuid: str, clear_time: int) -> bool:
+        self._validate_board(game_name, level)
+        async with AsyncKvProc() as kv_proc:
+            return await self._session_ready(kv_proc, game_name, level, user_uuid, clear_time)
+
+    @staticmethod
+    async def _session_ready(kv_proc: AsyncKvProc, game_name: str, level: str, user_uuid: str, clear_time: int) -> bool:
+        with STAGE_SECONDS.time("session_precheck", game_name, level):
+            start = await kv_proc.get_game_session_start(game_name, level, user_uuid)
+        if start is not None and int(time.time()) - start >= clear_time:
+            return True
+        SUBMISSIONS.inc(game_name, level, "rejected_session")
+        return False
+
+    async def submit_game_record(self, record, verification_payload: dict) -> str | None:
+        self._validate_record_fields(record)
+        ticket = uuid.uuid4().hex
+        with STAGE_SECONDS.time("enqueue", record.game_name, record.level):
+            async with AsyncKvProc() as kv_proc:
+                result = await kv_proc.enqueue_submission(
+                    ticket, record, verification_payload, int(time.time()),
+                    Env.RECORD_INGEST_MAX_BACKLOG, Env.RECORD_INGEST_STATUS_TTL,
+                )
+        return self._ingest_ticket(record, ticket, result)
+
+    async def get_record_status(self, ticket: str) -> dict | None:
+        async with AsyncKvProc() as kv_proc:
+            return await kv_proc.get_ingest_status(ticket)
+
+    async def verify_record(self, record, payload: dict, payload_size: int | None = None) -> VerifyResult:
+        result = self._precheck_record(record, payload)
+        if result:
+            result = await verify_async(record.game_name, self._level_payload(record, payload), payload_size)
+        if self._count_verification(record, result):
+            await self._sample_rejection(record, payload, result)
+        return result
+
+    @staticmethod
+    async def _sample_rejection(record, payload: dict, result: VerifyResult) -> None:
+        try:
+            async with AsyncKvProc() as kv_proc:
+                await kv_proc.sample_rejection(record, payload, result, Env.VERIFY_REJECT_STREAM_MAXLEN)
+        except redis.RedisError:
+            pass  # sampling is best effort and never fails the submission
+
+    @staticmethod
+    async def _store_record(record) -> int:
+        if Env.RECORD_WRITE_BEHIND:
+            return await async_record_writer.submit(record)
+        async with AsyncRDBProc() as rdb_proc:
+            return await rdb_proc.insert_game_record(record)
+
+    async def check_rate_limit(self, endpoint: str, game_name: str, user_uuid: str, user_ip: str) -> float:
+        if not Env.RATE_LIMIT:
+            return 0.0
+        buckets = rate_limiter.buckets(endpoint, game_name, {"user": user_uuid, "ip": user_ip})
+        if not buckets:
+            return 0.0
+        wait = rate_limiter.local_wait(buckets)
+        if wait:
+            RATE_LIMITED.inc(endpoint, "local")
+            return wait
+        try:
+            async with AsyncKvProc() as kv_proc:
+                waits = await kv_proc.take_rate_tokens(buckets, int(time.time() * 1000))
+        except redis.RedisError:
+            return 0.0
+        if not any(waits):
+            return 0.0
+        RATE_LIMITED.inc(endpoint, "redis")
+        return rate_limiter.refused(buckets, waits)
+
+    async def start_session(self, game_name: str, level: str, user_uuid: str) -> None:
+        async with AsyncKvProc() as kv_proc:
+            await kv_proc.insert_game_session(game_name, level, user_uuid)
+
+    async def update_nickname(self, user_uuid: str, nickname: str) -> None:
+        if not nickname:
+            raise ValueError("Nickname is required")
+        async with AsyncRDBProc() as rdb_proc:
+            await rdb_proc.update_nickname(user_uuid, nickname)
+        async with AsyncKvProc() as kv_proc:
+            boards = await kv_proc.update_nickname(user_uuid, nickname)
+            await kv_proc.bump_ranking_versions(boards)
+        ranking_cache.invalidate(boards)
+
+    async def get_user_history(self, game_name: str, level: str, user_uuid: str, limit: int = 10,
+                               before_id: int | None = None):
+        if limit <= 0:
+            raise ValueError("Limit must be a positive integer")
+        if before_id is not None and before_id <= 0:
+            raise ValueError("before_id must be a positive integer")
+        async with AsyncRDBProc() as rdb_proc:
+            return await rdb_proc.get_history_by_user_uuid(game_name, level, user_uuid, limit, before_id)
+
+    async def get_top_rankings(self, game_name, level, limit=10):
+        if limit <= 0:
+            raise ValueError("Limit must be a positive integer")
+        async with AsyncKvProc() as kv_proc:
+            records = await kv_proc.get_ranking(game_name, level, limit)
+            if records or await kv_proc.is_ranking_filled(game_name, level):
+                return records
+            await self._fill_ranking(game_name, level)
+            return await kv_proc.get_ranking(game_name, level, limit)
+
+    async def get_user_rank(self, game_name, level, user_uuid, neighbors=5) -> dict | None:
+        if neighbors < 0:
+            raise ValueError("neighbors must not be negative")
+        async with AsyncKvProc() as kv_proc:
+            rank, total, around = await kv_proc.get_rank_around(game_name, level, user_uuid, neighbors)
+            if total == 0 and not await kv_proc.is_ranking_filled(game_name, level):
+                await self._fill_ranking(game_name, level)
+                rank, total, around = await kv_proc.get_rank_around(game_name, level, user_uuid, neighbors)
+        return self._rank_response(user_uuid, rank, total, around)
+
+    async def get_window_rankings(self, game_name, level, window, limit=10):
+        if limit <= 0:
+            raise ValueError("Limit must be a positive integer")
+        if window not in RANKING_WINDOWS:
+            raise ValueError(f"Invalid ranking window: {window}")
+        async with AsyncKvProc() as kv_proc:
+            return await kv_proc.get_window_ranking(game_name, level, window, limit, int(time.time()))
+
+    async def _fill_ranking(self, game_name: str, level: str) -> None:
+        board = (game_name, level)
+        task = _fill_tasks.get(board)
+        if task is None:
+            task = asyncio.ensure_future(self._run_fill(game_name, level))
+            _fill_tasks[board] = task
+            task.add_done_callback(lambda _: _fill_tasks.pop(board, None))
+        try:
+            await asyncio.wait_for(asyncio.shield(task), Env.RANKING_FILL_WAIT)
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    async def _run_fill(game_name: str, level: str) -> None:
+        deadline = asyncio.get_running_loop().time() + Env.RANKING_FILL_WAIT
+        async with AsyncKvProc() as kv_proc:
+            if await kv_proc.is_ranking_filled(game_name, level):
+                return
+            token = uuid.uuid4().hex
+            if not await kv_proc.acquire_fill_lock(game_name, level, token, Env.RANKING_FILL_LOCK_TTL):
+                while await kv_proc.is_fill_locked(game_name, level) and asyncio.get_running_loop().time() < deadline:
+                    await asyncio.sleep(0.05)
+                return
+            try:
+                async with AsyncRDBProc() as rdb_proc:
+                    async for chunk in rdb_proc.iter_verified_records(game_name, level, Env.RANKING_FILL_CHUNK):
+                        await kv_proc.insert_game_records(chunk)
+                await kv_proc.mark_ranking_filled(game_name, level)
+            finally:
+                await kv_proc.release_fill_lock(game_name, level, token)
+
+    async def get_ranking_response(self, game_name: str, level: str, limit: int = 10, window: str = "all") -> tuple[str, str]:
+        cached = ranking_cache.get(game_name, level, limit, window)
+        if cached is not None:
+            return cached
+        if window != "all":
+            cached = serialize_ranking(await self.get_window_rankings(game_name, level, window, limit))
+        elif not Env.RANKING_CACHE_REDIS:
+            cached = serialize_ranking(await self.get_top_rankings(game_name, level, limit))
+        else:
+            async with AsyncKvProc() as kv_proc:
+                version, cached = await kv_proc.get_ranking_cache(game_name, level, limit)
+                RANKING_CACHE.inc("redis", "miss" if cached is None else "hit")
+                if cached is None:
+                    cached = serialize_ranking(await self.get_top_rankings(game_name, level, limit))
+                    await kv_proc.set_ranking_cache(game_name, level, limit, version, cached, Env.RANKING_CACHE_REDIS_TTL)
+        ranking_cache.put(game_name, level, limit, cached, window)
+        return cached
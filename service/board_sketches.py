@@ -0,0 +1,81 @@
+# per-board quantile sketches of verified submissions ("you beat 87% of players")
+#
+# Every verified POST /record (stored by the API or by service.ingest_worker) is
+# counted in its board's sketch by ranking score (KvProc._ranking_score, lower is
+# better for every game), whether or not it improves the player's best. Each process counts into a local pending sketch
+# and, at most every BOARD_SKETCH_FLUSH_INTERVAL seconds per board, folds it into
+# the shared copy in Redis (sketch:{game_name}:{level}) and takes the merged
+# result back. Percentiles are read from that merged copy plus the local pending
+# counts, so answering one costs no Redis round trip.
+import threading
+import time
+
+from env import Env
+from utils.quantile_sketch import QuantileSketch
+
+
+class _Board:
+    __slots__ = ("merged", "pending", "next_flush")
+
+    def __init__(self):
+        self.merged = QuantileSketch()
+        self.pending = QuantileSketch()
+        self.next_flush = 0.0  # first use loads the shared copy
+
+
+class BoardSketches:
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._boards: dict[tuple[str, str], _Board] = {}
+        self._lock = threading.Lock()
+
+    def _board(self, board: tuple[str, str]) -> _Board:
+        state = self._boards.get(board)
+        if state is None:
+            state = self._boards.setdefault(board, _Board())
+        return state
+
+    def observe(self, board: tuple[str, str], value: int) -> float | None:
+        # Percentage of the board's earlier submissions `value` beats, then counts it; None for a new board
+        with self._lock:
+            state = self._board(board)
+            worse = None
+            total = state.merged.count + state.pending.count
+            if total:
+                merged_below, merged_same = state.merged.rank(value)
+                pending_below, pending_same = state.pending.rank(value)
+                same = merged_same + pending_same
+                worse = (total - merged_below - pending_below - same + same / 2) / total * 100
+            state.pending.add(value)
+        return None if worse is None else round(worse, 2)
+
+    def take_due(self, board: tuple[str, str]) -> QuantileSketch | None:
+        # The pending counts to fold into Redis when the board's flush is due, else None
+        with self._lock:
+            state = self._board(board)
+            now = time.monotonic()
+            if now < state.next_flush:
+                return None
+            state.next_flush = now + self.flush_interval
+            pending, state.pending = state.pending, QuantileSketch()
+            return pending
+
+    def take_all(self) -> list[tuple[tuple[str, str], QuantileSketch]]:
+        # Every board's pending counts, for a final flush when the process stops
+        with self._lock:
+            taken = [(board, state.pending) for board, state in self._boards.items() if state.pending.count]
+            for board, _ in taken:
+                self._boards[board].pending = QuantileSketch()
+            return taken
+
+    def flushed(self, board: tuple[str, str], merged: QuantileSketch) -> None:
+        with self._lock:
+            self._board(board).merged = merged
+
+    def restore(self, board: tuple[str, str], pending: QuantileSketch) -> None:
+        # A failed flush keeps its counts for the next one
+        with self._lock:
+            self._board(board).pending.merge(pending)
+
+
+board_sketches = BoardSketches(Env.BOARD_SKETCH_FLUSH_INTERVAL)
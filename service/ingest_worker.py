@@ -0,0 +1,149 @@
+# POST /record ingestion worker (RECORD_INGEST_STREAM)
+#
+# With RECORD_INGEST_STREAM=true the API only validates the envelope and the game
+# session, queues the submission on the records:ingest stream and answers 202 with
+# a ticket. Workers in the record-workers consumer group verify submissions in
+# batches, store the verified ones with one multi-row INSERT and one pipelined
+# ranking update per batch, and publish each ticket's outcome for
+# GET /record/status/{ticket}.
+#
+# Delivery is at-least-once: entries are acknowledged only after their results are
+# published, and entries left pending by a dead worker are reclaimed after
+# RECORD_INGEST_CLAIM_IDLE_MS. Tickets that already have a result are skipped, and
+# tickets are stored in ingest_tickets with their records, so one redelivered after a
+# crash between the INSERT and its result reuses the stored record id (the ranking
+# update is idempotent and simply runs again).
+#
+#   python -m service.ingest_worker --workers 4
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import redis
+
+from env import Env
+from model.game_record import GameRecord
+from repository.kv_proc import KvProc
+from repository.rdb_proc import RDBProc
+from service.board_sketches import board_sketches
+from service.logic import GameService
+
+logger = logging.getLogger("ingest_worker")
+
+
+class IngestWorker:
+    def __init__(self, consumer: str, service: GameService | None = None):
+        self.consumer = consumer
+        self.service = service or GameService()
+
+    def run(self, should_stop) -> None:
+        with RDBProc() as rdb_proc:
+            rdb_proc.check_batch_inserts()
+        with KvProc() as kv_proc:
+            kv_proc.ensure_ingest_group()
+            try:
+                self._consume(kv_proc, should_stop)
+            finally:
+                self._flush_sketches(kv_proc)
+
+    def _consume(self, kv_proc: KvProc, should_stop) -> None:
+        next_claim = 0.0
+        while not should_stop():
+            entries = []
+            if time.monotonic() >= next_claim:
+                entries = kv_proc.claim_stale_submissions(
+                    self.consumer, Env.RECORD_INGEST_CLAIM_IDLE_MS, Env.RECORD_INGEST_BATCH
+                )
+                next_claim = time.monotonic() + Env.RECORD_INGEST_CLAIM_IDLE_MS / 1000
+            if not entries:
+                entries = kv_proc.read_submissions(self.consumer, Env.RECORD_INGEST_BATCH, Env.RECORD_INGEST_BLOCK_MS)
+            if not entries:
+                continue
+            try:
+                self.process(kv_proc, entries)
+            except Exception:
+                # Left pending; this or another consumer reclaims them after the idle timeout
+                logger.exception("failed to process %d submission(s)", len(entries))
+                time.sleep(1)
+
+    def process(self, kv_proc: KvProc, entries: list[tuple[str, dict]]) -> None:
+        entry_ids = [entry_id for entry_id, _ in entries]
+        submissions = []
+        for entry_id, fields in entries:
+            try:
+                submissions.append(KvProc._decode_submission(fields))
+            except (KeyError, TypeError, ValueError):
+                logger.warning("dropping malformed submission %s", entry_id)
+
+        results: dict[str, dict] = {}
+        verified: list[tuple[str, GameRecord]] = []
+        statuses = kv_proc.get_ingest_statuses([ticket for ticket, _, _ in submissions])
+        # Tickets that already have a result were processed before a crash; only acknowledge them
+        todo = [submission for submission, status in zip(submissions, statuses) if status in (None, "pending")]
+        outcomes = self.service.verify_records([record for _, record, _ in todo], [payload for _, _, payload in todo])
+        for (ticket, record, _), result in zip(todo, outcomes):
+            record.is_verified = bool(result)
+            if result:
+                verified.append((ticket, record))
+            else:
+                results[ticket] = {"status": "rejected", "record_id": 0, "is_verified": 0, "reason": result.code}
+
+        if verified:
+            records = [record for _, record in verified]
+            with RDBProc() as rdb_proc:
+                record_ids = rdb_proc.insert_ingested_records([ticket for ticket, _ in verified], records)
+            kv_proc.insert_game_records(records, int(time.time()))
+            for (ticket, record), record_id in zip(verified, record_ids):
+                results[ticket] = {"status": "success", "record_id": record_id, "is_verified": 1}
+                percentile = self.service.record_percentile(kv_proc, record)
+                if percentile is not None:
+                    results[ticket]["percentile"] = percentile
+
+        kv_proc.complete_submissions(entry_ids, results, Env.RECORD_INGEST_STATUS_TTL)
+
+    @staticmethod
+    def _flush_sketches(kv_proc: KvProc) -> None:
+        # Counts observed since the last per-board flush would otherwise leave with the process
+        for board, pending in board_sketches.take_all():
+            try:
+                board_sketches.flushed(board, kv_proc.merge_board_sketch(*board, pending))
+            except redis.RedisError:
+                logger.warning("could not flush the board sketch of %s/%s", *board)
+
+
+def _run_consumer(consumer: str) -> None:
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    # Finishes the batch in hand; the next read returns within RECORD_INGEST_BLOCK_MS
+    IngestWorker(consumer).run(lambda: bool(stopping))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify and store queued POST /record submissions")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        _run_consumer(f"{args.name}-0")
+        return
+    processes = [
+        multiprocessing.Process(target=_run_consumer, args=(f"{args.name}-{index}",), name=f"ingest-{index}")
+        for index in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in processes if p.is_alive()])
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # children receive Ctrl-C from the terminal themselves
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
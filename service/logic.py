@@ -1,9 +1,34 @@
 # service to handle business logic
+import logging
+import random
+import threading
 import time
+import uuid
 
-from repository.rdb_proc import RDBProc
-from repository.kv_proc import KvProc
-from utils.verifier.registry import get_verifier
+import redis
+
+from env import Env
+from model.game_record import MAX_SCORE
+from repository.rdb_proc import RDBProc, get_pool_status
+from repository.kv_proc import (
+    INGEST_BACKLOG_FULL,
+    RANKING_CACHE_DEPTH,
+    RANKING_WINDOWS,
+    SESSION_INVALID,
+    KvProc,
+    get_pool_status as get_kv_pool_status,
+)
+from service.board_sketches import board_sketches
+from service.ranking_cache import ranking_cache, ranking_entry, serialize_ranking
+from service.rate_limiter import rate_limiter
+from service.record_writer import WriteQueueFull, record_writer
+from utils.metrics import RANKING_CACHE, RATE_LIMITED, STAGE_SECONDS, SUBMISSIONS, VERIFICATIONS
+from utils.verifier.pool import get_verify_pool_status, verify as verify_payload, verify_many as verify_payloads
+from utils.verifier.result import ACCEPTED, PRECHECK, SESSION, VerifyResult, reject
+
+SESSION_REJECTED = reject(SESSION, "invalid_session")
+
+logger = logging.getLogger(__name__)
 
 class ConnService:
     def __init__(self):
@@ -25,6 +50,9 @@ class ConnService:
             result.update({"kv": False})
         return result
 
+    def pool_status(self) -> dict[str, dict]:
+        return {"rdb": get_pool_status(), "kv": get_kv_pool_status(), "verify": get_verify_pool_status()}
+
 GAME_WHITELIST = {
     "sudoku": {"easy", "medium", "hard", "expert"},
     "killer-sudoku": {"easy", "medium", "hard", "expert"},
@@ -39,60 +67,201 @@ GAME_WHITELIST = {
     "woodoku": {"classic"}
 }
 
+# One in-process lock per board so concurrent readers of an empty board share a single fill
+_fill_locks: dict[tuple[str, str], threading.Lock] = {}
+_fill_locks_guard = threading.Lock()
+
+
+def _board_fill_lock(game_name: str, level: str) -> threading.Lock:
+    with _fill_locks_guard:
+        return _fill_locks.setdefault((game_name, level), threading.Lock())
+
+
 class GameService:
     def __init__(self):
         pass
 
-    def add_game_record(self, record, verification_payload: dict) -> tuple[int, bool]:
+    def add_game_record(self, record, verification_payload: dict, session_checked: bool = False,
+                        payload_size: int | None = None) -> tuple[int, VerifyResult, float | None]:
+        # Returns the record id (0 when rejected), the verification result (truthy when accepted) and,
+        # for stored records, the percentage of the board's earlier submissions the record beats.
+        # session_checked: the caller already ran is_session_ready for this record.
+        # payload_size: the request body length, checked against the game's payload budget.
+        self._validate_record_fields(record)
+
+        # Cheap session check (a GET, skipped when the caller ran it), then verification, then the
+        # session is consumed atomically (one script). The ranking is only updated once the MySQL
+        # row exists (a second script), so a failed insert leaves no entry behind and hands the
+        # session back for a retry.
+        board = (record.game_name, record.level)
+        # One KvProc for every Redis call of the submission
+        with KvProc() as kv_proc:
+            if not session_checked and not self._session_ready(kv_proc, *board, record.user_uuid, record.clear_time):
+                return 0, SESSION_REJECTED, None
+            with STAGE_SECONDS.time("verify", *board):
+                result = self.verify_record(record, verification_payload, payload_size)
+            record.is_verified = bool(result)
+            if not result:
+                SUBMISSIONS.inc(*board, "rejected_verification")
+                return 0, result, None
+
+            now = int(time.time())
+            with STAGE_SECONDS.time("session_consume", *board):
+                session = kv_proc.consume_game_session(record, now)
+            if session is None:
+                SUBMISSIONS.inc(*board, "rejected_session")
+                return 0, SESSION_REJECTED, None
+            try:
+                with STAGE_SECONDS.time("rdb_insert", *board):
+                    record_id = self._store_record(record)
+            except Exception:
+                self._restore_session(kv_proc, record, session)
+                raise
+            with STAGE_SECONDS.time("ranking", *board):
+                try:
+                    rank = kv_proc.insert_game_record(record, now)
+                except redis.RedisError:
+                    # The row exists and the session is spent: report the stored record, count the gap
+                    logger.exception("record %s stored but not ranked", record_id)
+                    SUBMISSIONS.inc(*board, "stored_unranked")
+                    return record_id, result, None
+            SUBMISSIONS.inc(*board, "stored")
+            if 0 < rank <= RANKING_CACHE_DEPTH:
+                ranking_cache.invalidate([(record.game_name, record.level)])
+            return record_id, result, self.record_percentile(kv_proc, record)
+
+    @staticmethod
+    def _restore_session(kv_proc: KvProc, record, session: tuple[str, int]) -> None:
+        try:
+            kv_proc.restore_game_session(record, session)
+        except redis.RedisError:
+            pass  # the insert error is the one to report
+
+    @staticmethod
+    def record_percentile(kv_proc: KvProc, record) -> float | None:
+        # Counts the record in its board sketch; the shared copy is merged at most once per flush interval.
+        # Public so the ingest worker reports the same percentile as the synchronous path
+        if not Env.BOARD_SKETCHES:
+            return None
+        board = (record.game_name, record.level)
+        pending = board_sketches.take_due(board)
+        if pending is not None:
+            try:
+                board_sketches.flushed(board, kv_proc.merge_board_sketch(*board, pending))
+            except redis.RedisError:
+                board_sketches.restore(board, pending)
+        return board_sketches.observe(board, KvProc._ranking_score(record))
+
+    def submit_game_record(self, record, verification_payload: dict) -> str | None:
+        # Ingestion mode: check the envelope and session here, leave verification and storage
+        # to service.ingest_worker. Returns the ticket, or None when rejected up front.
+        self._validate_record_fields(record)
+        ticket = uuid.uuid4().hex
+        with STAGE_SECONDS.time("enqueue", record.game_name, record.level), KvProc() as kv_proc:
+            result = kv_proc.enqueue_submission(
+                ticket, record, verification_payload, int(time.time()),
+                Env.RECORD_INGEST_MAX_BACKLOG, Env.RECORD_INGEST_STATUS_TTL,
+            )
+        return self._ingest_ticket(record, ticket, result)
+
+    @staticmethod
+    def _ingest_ticket(record, ticket: str, result: str | int) -> str | None:
+        if result == SESSION_INVALID:
+            SUBMISSIONS.inc(record.game_name, record.level, "rejected_session")
+            return None
+        if result == INGEST_BACKLOG_FULL:
+            SUBMISSIONS.inc(record.game_name, record.level, "backlog_full")
+            raise WriteQueueFull("Record ingest backlog is full")
+        SUBMISSIONS.inc(record.game_name, record.level, "queued")
+        return ticket
+
+    def get_record_status(self, ticket: str) -> dict | None:
+        with KvProc() as kv_proc:
+            return kv_proc.get_ingest_status(ticket)
+
+    @staticmethod
+    def _store_record(record) -> int:
+        if Env.RECORD_WRITE_BEHIND:
+            return record_writer.submit(record)
+        with RDBProc() as rdb_proc:
+            return rdb_proc.insert_game_record(record)
+
+    @staticmethod
+    def _validate_record_fields(record) -> None:
         # Business logic before inserting a game record
         if record.clear_time <= 0:
             raise ValueError("Clear time cannot be negative")
         if record.mistake_count < 0 or record.hint_count < 0:
             raise ValueError("Counts must be non-negative")
+        if not 0 <= record.score <= MAX_SCORE:
+            raise ValueError("Score out of range")
+        GameService._validate_board(record.game_name, record.level)
 
-        valid_levels = GAME_WHITELIST.get(record.game_name)
-        if valid_levels is None or record.level not in valid_levels:
-            raise ValueError(f"Invalid game_name or level: {record.game_name} / {record.level}")
+    @staticmethod
+    def _validate_board(game_name: str, level: str) -> None:
+        valid_levels = GAME_WHITELIST.get(game_name)
+        if valid_levels is None or level not in valid_levels:
+            raise ValueError(f"Invalid game_name or level: {game_name} / {level}")
 
-        if not self._is_session_valid(record.game_name, record.level, record.user_uuid, record.clear_time):
-            return 0, False
+    def is_session_ready(self, game_name: str, level: str, user_uuid: str, clear_time: int) -> bool:
+        # Cheap GET ahead of verification; consume_game_session still checks and consumes the
+        # session atomically, this only turns away submissions that would fail there anyway
+        self._validate_board(game_name, level)
+        with KvProc() as kv_proc:
+            return self._session_ready(kv_proc, game_name, level, user_uuid, clear_time)
 
-        is_verified = self.verify_record(record, verification_payload)
-        record.is_verified = is_verified
-        if not is_verified:
-            return 0, False
+    @staticmethod
+    def _session_ready(kv_proc: KvProc, game_name: str, level: str, user_uuid: str, clear_time: int) -> bool:
+        with STAGE_SECONDS.time("session_precheck", game_name, level):
+            start = kv_proc.get_game_session_start(game_name, level, user_uuid)
+        if start is not None and int(time.time()) - start >= clear_time:
+            return True
+        SUBMISSIONS.inc(game_name, level, "rejected_session")
+        return False
 
-        with RDBProc() as rdb_proc:
-            record_id = rdb_proc.insert_game_record(record)
-        with KvProc() as kv_proc:
-            kv_proc.insert_game_record(record)
-        return record_id, is_verified
+    def check_rate_limit(self, endpoint: str, game_name: str, user_uuid: str, user_ip: str) -> float:
+        # Seconds the client has to wait, 0 when the request may go ahead. Fails open when Redis is down.
+        if not Env.RATE_LIMIT:
+            return 0.0
+        buckets = rate_limiter.buckets(endpoint, game_name, {"user": user_uuid, "ip": user_ip})
+        if not buckets:
+            return 0.0
+        wait = rate_limiter.local_wait(buckets)
+        if wait:
+            RATE_LIMITED.inc(endpoint, "local")
+            return wait
+        try:
+            with KvProc() as kv_proc:
+                waits = kv_proc.take_rate_tokens(buckets, int(time.time() * 1000))
+        except redis.RedisError:
+            return 0.0
+        if not any(waits):
+            return 0.0
+        RATE_LIMITED.inc(endpoint, "redis")
+        return rate_limiter.refused(buckets, waits)
 
     def start_session(self, game_name: str, level: str, user_uuid: str) -> None:
         with KvProc() as kv_proc:
             kv_proc.insert_game_session(game_name, level, user_uuid)
 
-    def _is_session_valid(self, game_name: str, level: str, user_uuid: str, clear_time: int) -> bool:
-        with KvProc() as kv_proc:
-            start_time = kv_proc.get_game_session_start(game_name, level, user_uuid)
-        if start_time is None:
-            return False
-        elapsed_seconds = int(time.time()) - start_time
-        return elapsed_seconds >= clear_time
-
     def update_nickname(self, user_uuid: str, nickname: str) -> None:
         if not nickname:
             raise ValueError("Nickname is required")
         with RDBProc() as rdb_proc:
             rdb_proc.update_nickname(user_uuid, nickname)
         with KvProc() as kv_proc:
-            kv_proc.update_nickname(user_uuid, nickname)
+            boards = kv_proc.update_nickname(user_uuid, nickname)
+            kv_proc.bump_ranking_versions(boards)
+        ranking_cache.invalidate(boards)
 
-    def get_user_history(self, game_name: str, level: str, user_uuid: str, limit: int = 10):
+    def get_user_history(self, game_name: str, level: str, user_uuid: str, limit: int = 10,
+                         before_id: int | None = None):
         if limit <= 0:
             raise ValueError("Limit must be a positive integer")
+        if before_id is not None and before_id <= 0:
+            raise ValueError("before_id must be a positive integer")
         with RDBProc() as rdb_proc:
-            return rdb_proc.get_history_by_user_uuid(game_name, level, user_uuid, limit)
+            return rdb_proc.get_history_by_user_uuid(game_name, level, user_uuid, limit, before_id)
 
     def get_top_rankings(self, game_name, level, limit=10):
         # Business logic before retrieving rankings
@@ -100,50 +269,175 @@ class GameService:
             raise ValueError("Limit must be a positive integer")
         with KvProc() as kv_proc:
             records = kv_proc.get_ranking(game_name, level, limit)
-        if records:
-            return records
-        with RDBProc() as rdb_proc:
-            records = rdb_proc.get_ranking(game_name, level, limit)
-        if records:
+            if records or kv_proc.is_ranking_filled(game_name, level):
+                return records
+            self._fill_ranking(kv_proc, game_name, level)
+            return kv_proc.get_ranking(game_name, level, limit)
+
+    def get_user_rank(self, game_name, level, user_uuid, neighbors=5) -> dict | None:
+        # The user's position on the all-time board with `neighbors` users on each side; None when unranked
+        if neighbors < 0:
+            raise ValueError("neighbors must not be negative")
+        with KvProc() as kv_proc:
+            rank, total, around = kv_proc.get_rank_around(game_name, level, user_uuid, neighbors)
+            if total == 0 and not kv_proc.is_ranking_filled(game_name, level):
+                self._fill_ranking(kv_proc, game_name, level)
+                rank, total, around = kv_proc.get_rank_around(game_name, level, user_uuid, neighbors)
+        return self._rank_response(user_uuid, rank, total, around)
+
+    @staticmethod
+    def _rank_response(user_uuid: str, rank: int, total: int, around: list) -> dict | None:
+        if not rank:
+            return None
+        return {
+            "user_uuid": user_uuid,
+            "rank": rank,
+            "total": total,
+            # Share of ranked players placed at or below the user: 100 for first place
+            "percentile": round((total - rank + 1) / total * 100, 2),
+            "entry": next((ranking_entry(position, record) for position, record in around if position == rank), None),
+            "above": [ranking_entry(position, record) for position, record in around if position < rank],
+            "below": [ranking_entry(position, record) for position, record in around if position > rank],
+        }
+
+    def get_window_rankings(self, game_name, level, window, limit=10):
+        # Daily/weekly/monthly boards live only in Redis (fed by live submissions), so there is no MySQL fill
+        if limit <= 0:
+            raise ValueError("Limit must be a positive integer")
+        if window not in RANKING_WINDOWS:
+            raise ValueError(f"Invalid ranking window: {window}")
+        with KvProc() as kv_proc:
+            return kv_proc.get_window_ranking(game_name, level, window, limit, int(time.time()))
+
+    @staticmethod
+    def _fill_ranking(kv_proc: KvProc, game_name: str, level: str) -> None:
+        # Rebuild an empty board from MySQL, single-flight per process (thread lock) and across
+        # instances (Redis lock). Readers that lose either race wait up to RANKING_FILL_WAIT and
+        # then serve whatever is on the board, partial or not, instead of querying MySQL themselves.
+        deadline = time.monotonic() + Env.RANKING_FILL_WAIT
+        board_lock = _board_fill_lock(game_name, level)
+        if not board_lock.acquire(timeout=Env.RANKING_FILL_WAIT):
+            return
+        try:
+            if kv_proc.is_ranking_filled(game_name, level):
+                return
+            token = uuid.uuid4().hex
+            if not kv_proc.acquire_fill_lock(game_name, level, token, Env.RANKING_FILL_LOCK_TTL):
+                while kv_proc.is_fill_locked(game_name, level) and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                return
+            try:
+                with RDBProc() as rdb_proc:
+                    for chunk in rdb_proc.iter_verified_records(game_name, level, Env.RANKING_FILL_CHUNK):
+                        kv_proc.insert_game_records(chunk)
+                kv_proc.mark_ranking_filled(game_name, level)
+            finally:
+                kv_proc.release_fill_lock(game_name, level, token)
+        finally:
+            board_lock.release()
+
+    def get_ranking_response(self, game_name: str, level: str, limit: int = 10, window: str = "all") -> tuple[str, str]:
+        # Serialized ranking body and its ETag, served from the in-process cache, then Redis (if enabled)
+        cached = ranking_cache.get(game_name, level, limit, window)
+        if cached is not None:
+            return cached
+        if window != "all":
+            # A windowed board is itself a short-lived aggregate in Redis; only the local cache fronts it
+            cached = serialize_ranking(self.get_window_rankings(game_name, level, window, limit))
+        elif not Env.RANKING_CACHE_REDIS:
+            cached = serialize_ranking(self.get_top_rankings(game_name, level, limit))
+        else:
             with KvProc() as kv_proc:
-                kv_proc.insert_game_records(records)
-        return records
+                version, cached = kv_proc.get_ranking_cache(game_name, level, limit)
+                RANKING_CACHE.inc("redis", "miss" if cached is None else "hit")
+                if cached is None:
+                    cached = serialize_ranking(self.get_top_rankings(game_name, level, limit))
+                    kv_proc.set_ranking_cache(game_name, level, limit, version, cached, Env.RANKING_CACHE_REDIS_TTL)
+        ranking_cache.put(game_name, level, limit, cached, window)
+        return cached
 
-    def verify_record(self, record, payload: dict) -> bool:
-        action_log = payload.get("action_log", [])
-        if not self._validate_action_log(action_log, record.clear_time):
+    def verify_record(self, record, payload: dict, payload_size: int | None = None) -> VerifyResult:
+        result = self._precheck_record(record, payload)
+        if result:
+            # Game-specific check, in the verification process pool for heavy games when enabled
+            result = verify_payload(record.game_name, self._level_payload(record, payload), payload_size)
+        if self._count_verification(record, result):
+            self._sample_rejection(record, payload, result)
+        return result
+
+    def verify_records(self, records: list, payloads: list[dict]) -> list[VerifyResult]:
+        # Batch form of verify_record: one verify_many call per game over the records passing the prechecks
+        results = [self._precheck_record(record, payload) for record, payload in zip(records, payloads)]
+        by_game: dict[str, list[int]] = {}
+        for index, record in enumerate(records):
+            if results[index]:
+                by_game.setdefault(record.game_name, []).append(index)
+        for game_name, indices in by_game.items():
+            level_payloads = [self._level_payload(records[i], payloads[i]) for i in indices]
+            for index, result in zip(indices, verify_payloads(game_name, level_payloads)):
+                results[index] = result
+        for record, result, payload in zip(records, results, payloads):
+            if self._count_verification(record, result):
+                self._sample_rejection(record, payload, result)
+        return results
+
+    @staticmethod
+    def _count_verification(record, result: VerifyResult) -> bool:
+        # Counts the outcome; True when this rejection is to be sampled to the rejection stream
+        if result:
+            VERIFICATIONS.inc(record.game_name, record.level, "accepted", "", "")
             return False
+        VERIFICATIONS.inc(record.game_name, record.level, "rejected", result.stage, result.reason)
+        return Env.VERIFY_REJECT_SAMPLE_RATE > 0 and random.random() < Env.VERIFY_REJECT_SAMPLE_RATE
+
+    @staticmethod
+    def _level_payload(record, payload: dict) -> dict:
+        # Verifiers see the record's level (2048 checks the board size against it), not a client-sent one
+        return {**payload, "level": record.level}
+
+    @staticmethod
+    def _sample_rejection(record, payload: dict, result: VerifyResult) -> None:
+        try:
+            with KvProc() as kv_proc:
+                kv_proc.sample_rejection(record, payload, result, Env.VERIFY_REJECT_STREAM_MAXLEN)
+        except redis.RedisError:
+            pass  # sampling is best effort and never fails the submission
+
+    @classmethod
+    def _precheck_record(cls, record, payload: dict) -> VerifyResult:
+        action_log = payload.get("action_log", [])
+        result = cls._validate_action_log(action_log, record.clear_time)
+        if not result:
+            return result
 
         wrong_answers = payload.get("wrong_answers", [])
         hint_events = payload.get("hint_events", [])
         if len(wrong_answers) != record.mistake_count:
-            return False
+            return reject(PRECHECK, "mistake_count_mismatch")
         if len(hint_events) != record.hint_count:
-            return False
-
-        verifier = get_verifier(record.game_name)
-        return verifier.verify(payload)
+            return reject(PRECHECK, "hint_count_mismatch")
+        return ACCEPTED
 
     @staticmethod
-    def _validate_action_log(action_log: list[dict], clear_time: int) -> bool:
+    def _validate_action_log(action_log: list[dict], clear_time: int) -> VerifyResult:
         if not action_log:
-            return False
+            return reject(PRECHECK, "missing_action_log")
         if len(action_log) < 2:
-            return False
+            return reject(PRECHECK, "action_log_too_short")
         
         previous_ts = None
         for entry in action_log:
             ts = entry.get("ts")
             if ts is None:
-                return False
+                return reject(PRECHECK, "missing_ts")
             if previous_ts is not None and ts < previous_ts:
-                return False
+                return reject(PRECHECK, "ts_out_of_order")
             previous_ts = ts
             
         duration_ms = action_log[-1]["ts"] - action_log[0]["ts"]
-        if duration_ms < 0:
-            return False
         if duration_ms < 1000: # Minimum 1 second
-            return False
-            
-        return duration_ms <= (clear_time + 5) * 1000 # Allow 5s buffer
+            return reject(PRECHECK, "too_fast")
+        if duration_ms > (clear_time + 5) * 1000: # Allow 5s buffer
+            # The log spans more than the reported clear time: client clock skew or a tampered clear_time
+            return reject(PRECHECK, "duration_exceeds_clear_time")
+        return ACCEPTED
@@ -0,0 +1,59 @@
+# pre-serialized ranking responses
+import hashlib
+import json
+
+from env import Env
+from model.game_record import GameRecord
+from utils.metrics import RANKING_CACHE
+from utils.ttl_cache import TTLCache
+
+
+def ranking_entry(rank: int, record: GameRecord) -> dict:
+    return {
+        "rank": rank,
+        "user_uuid": record.user_uuid,
+        "nickname": record.nickname,
+        "clear_time": record.clear_time,
+        "score": record.score,
+        "mistake_count": record.mistake_count,
+        "hint_count": record.hint_count,
+    }
+
+
+def serialize_ranking(records: list[GameRecord]) -> tuple[str, str]:
+    # Returns the JSON body of GET /record/ranking and its ETag (a digest of the body)
+    ranking = [ranking_entry(index, record) for index, record in enumerate(records, start=1)]
+    body = json.dumps(ranking, separators=(",", ":"), ensure_ascii=True)
+    etag = '"' + hashlib.blake2b(body.encode(), digest_size=8).hexdigest() + '"'
+    return body, etag
+
+
+class RankingCache:
+    """In-process cache of serialized rankings keyed by (game_name, level, limit, window).
+
+    Entries live for RANKING_CACHE_TTL seconds. Writes handled by this process
+    drop the board's entries immediately; writes on other instances are picked
+    up when the entry expires (and, with RANKING_CACHE_REDIS, through the
+    board's ranking version in Redis). Windowed entries are dropped with their
+    board too, but only when the write reached the all-time top; otherwise
+    they simply expire.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self._local = TTLCache(max_size, ttl)
+
+    def get(self, game_name: str, level: str, limit: int, window: str = "all") -> tuple[str, str] | None:
+        cached = self._local.get((game_name, level, limit, window))
+        RANKING_CACHE.inc("local", "miss" if cached is None else "hit")
+        return cached
+
+    def put(self, game_name: str, level: str, limit: int, cached: tuple[str, str], window: str = "all") -> None:
+        self._local.set((game_name, level, limit, window), cached)
+
+    def invalidate(self, boards: list[tuple[str, str]]) -> None:
+        if boards:
+            targets = set(boards)
+            self._local.delete_matching(lambda key: key[:2] in targets)
+
+
+ranking_cache = RankingCache(Env.RANKING_CACHE_TTL)
@@ -0,0 +1,75 @@
+# per-client token-bucket limits for POST /record and POST /record/session
+#
+# RATE_LIMIT_RULES is a comma separated list of "{endpoint}.{scope}[.{game_name}]={count}/{seconds}":
+# endpoint is record or session, scope is user (user_uuid) or ip (client IP), and
+# each client gets a bucket of `count` tokens refilled at `count` per `seconds`.
+# A game-specific rule replaces the endpoint's rule for that game, with buckets
+# of its own. All buckets of a request are checked and taken in one Lua call
+# (KvProc.take_rate_tokens). A refused bucket is remembered in-process until it
+# would have a token again, so a client retrying past its limit is turned away
+# without a Redis round trip.
+import time
+
+from env import Env
+from repository.kv_proc import KvProc
+from utils.ttl_cache import TTLCache
+
+ENDPOINTS = ("record", "session")
+SCOPES = ("user", "ip")
+
+
+def parse_rules(spec: str) -> dict[tuple[str, str, str], tuple[int, int]]:
+    # (endpoint, scope, game_name or "") -> (capacity, refill period in ms)
+    rules = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, limit = item.partition("=")
+        endpoint, _, rest = name.strip().partition(".")
+        scope, _, game_name = rest.partition(".")
+        count, _, seconds = limit.strip().partition("/")
+        if endpoint not in ENDPOINTS or scope not in SCOPES or not count.isdigit() or not seconds.isdigit():
+            raise ValueError(f"Invalid rate limit rule: {item}")
+        if int(count) <= 0 or int(seconds) <= 0:
+            raise ValueError(f"Invalid rate limit rule: {item}")
+        rules[(endpoint, scope, game_name)] = (int(count), int(seconds) * 1000)
+    return rules
+
+
+class RateLimiter:
+    def __init__(self, rules: dict[tuple[str, str, str], tuple[int, int]], local_size: int):
+        self.rules = rules
+        longest = max((period_ms for _, period_ms in rules.values()), default=1000)
+        # bucket key -> monotonic time it has a token again
+        self._refused = TTLCache(local_size, longest / 1000)
+
+    def buckets(self, endpoint: str, game_name: str, identities: dict[str, str]) -> list[tuple[str, int, int]]:
+        # (key, capacity, period ms) of every rule that applies to the request
+        buckets = []
+        for scope, identity in identities.items():
+            if not identity:
+                continue
+            rule = (endpoint, scope, game_name)
+            if rule not in self.rules:
+                rule = (endpoint, scope, "")
+                if rule not in self.rules:
+                    continue
+            capacity, period_ms = self.rules[rule]
+            name = ".".join(part for part in rule if part)
+            buckets.append((KvProc._rate_limit_key(name, identity), capacity, period_ms))
+        return buckets
+
+    def local_wait(self, buckets: list[tuple[str, int, int]]) -> float:
+        # Seconds until the buckets refused earlier have a token again; 0 when none is known to be empty
+        until = max((self._refused.get(key, 0.0) for key, _, _ in buckets), default=0.0)
+        return max(until - time.monotonic(), 0.0)
+
+    def refused(self, buckets: list[tuple[str, int, int]], waits: list[int]) -> float:
+        # Remembers the empty buckets from a Redis answer; returns the seconds to wait
+        now = time.monotonic()
+        self._refused.set_many({key: now + wait / 1000 for (key, _, _), wait in zip(buckets, waits) if wait > 0})
+        return max(waits) / 1000
+
+
+rate_limiter = RateLimiter(parse_rules(Env.RATE_LIMIT_RULES), Env.RATE_LIMIT_LOCAL_SIZE)
@@ -0,0 +1,232 @@
+# write-behind batching of game_records inserts (RECORD_WRITE_BEHIND)
+#
+# POST /record hands its verified record to a bounded in-process queue and waits
+# for its id. A background flusher drains the queue into multi-row INSERTs,
+# one statement and one commit per batch, every RECORD_WRITE_FLUSH_MS or
+# RECORD_WRITE_BATCH_SIZE records, whichever comes first. Callers still get the
+# real auto-increment id of a committed row; the cost is up to one flush
+# interval of extra latency, against one fsync per batch instead of per record.
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from env import Env
+from model.game_record import GameRecord
+from repository.async_rdb_proc import AsyncRDBProc
+from repository.rdb_proc import RDBProc
+
+
+class WriteQueueFull(Exception):
+    """Raised when the write-behind queue stays full past RECORD_WRITE_ENQUEUE_TIMEOUT."""
+
+
+class WriterStopped(WriteQueueFull):
+    """Raised when a record is submitted while the writer is stopped or shutting down."""
+
+
+WRITER_STOPPED = "Record writer is not running"
+WRITE_TIMED_OUT = "Record write timed out"
+
+
+class RecordWriter:
+    """Thread-backed write-behind queue used by the sync GameService."""
+
+    def __init__(self, batch_size: int = Env.RECORD_WRITE_BATCH_SIZE, flush_ms: float = Env.RECORD_WRITE_FLUSH_MS,
+                 queue_size: int = Env.RECORD_WRITE_QUEUE_SIZE, enqueue_timeout: float = Env.RECORD_WRITE_ENQUEUE_TIMEOUT,
+                 result_timeout: float = Env.RECORD_WRITE_RESULT_TIMEOUT):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.enqueue_timeout = enqueue_timeout
+        self.result_timeout = result_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        # Refuses to start (RuntimeError) on a server where batch inserts cannot report their ids
+        if self.running:
+            return
+        with RDBProc() as rdb_proc:
+            rdb_proc.check_batch_inserts()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="record-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        # Stop accepting records, flush everything already queued, then join the flusher
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        # Whatever the flusher left behind (join timed out, or a submit raced the shutdown) is failed
+        self._fail_queued()
+
+    def submit(self, record: GameRecord) -> int:
+        if self._stopping.is_set() or not self.running:
+            raise WriterStopped(WRITER_STOPPED)
+        future: Future = Future()
+        try:
+            self._queue.put((record, future), timeout=self.enqueue_timeout)
+        except queue.Full:
+            raise WriteQueueFull("Record write queue is full") from None
+        # stop() may have drained the queue between the check above and the put
+        if self._stopping.is_set() and not self.running:
+            self._fail_queued()
+        try:
+            return future.result(timeout=self.result_timeout)
+        except FutureTimeoutError:
+            raise WriteQueueFull(WRITE_TIMED_OUT) from None
+
+    def _fail_queued(self) -> None:
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if not future.done():
+                future.set_exception(WriterStopped(WRITER_STOPPED))
+
+    def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self) -> list[tuple[GameRecord, Future]]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _flush(batch: list[tuple[GameRecord, Future]]) -> None:
+        try:
+            with RDBProc() as rdb_proc:
+                record_ids = rdb_proc.insert_game_records([record for record, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), record_id in zip(batch, record_ids):
+            future.set_result(record_id)
+
+
+class AsyncRecordWriter:
+    """asyncio counterpart of RecordWriter, used by AsyncGameService."""
+
+    def __init__(self, batch_size: int = Env.RECORD_WRITE_BATCH_SIZE, flush_ms: float = Env.RECORD_WRITE_FLUSH_MS,
+                 queue_size: int = Env.RECORD_WRITE_QUEUE_SIZE, enqueue_timeout: float = Env.RECORD_WRITE_ENQUEUE_TIMEOUT,
+                 result_timeout: float = Env.RECORD_WRITE_RESULT_TIMEOUT):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.enqueue_timeout = enqueue_timeout
+        self.result_timeout = result_timeout
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        # Must be called from the event loop that will submit records (the FastAPI lifespan)
+        if self.running:
+            return
+        async with AsyncRDBProc() as rdb_proc:
+            await rdb_proc.check_batch_inserts()
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+        self._fail_queued()
+
+    async def submit(self, record: GameRecord) -> int:
+        if self._stopping or not self.running:
+            raise WriterStopped(WRITER_STOPPED)
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((record, future)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise WriteQueueFull("Record write queue is full") from None
+        # The flusher may have finished while the put waited for room
+        if self._stopping and not self.running:
+            self._fail_queued()
+        try:
+            return await asyncio.wait_for(future, self.result_timeout)
+        except asyncio.TimeoutError:
+            raise WriteQueueFull(WRITE_TIMED_OUT) from None
+
+    def _fail_queued(self) -> None:
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(WriterStopped(WRITER_STOPPED))
+
+    async def _run(self) -> None:
+        while not (self._stopping and self._queue.empty()):
+            batch = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+    async def _collect(self) -> list[tuple[GameRecord, asyncio.Future]]:
+        try:
+            batch = [await asyncio.wait_for(self._queue.get(), self.flush_interval)]
+        except asyncio.TimeoutError:
+            return []
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    async def _flush(batch: list[tuple[GameRecord, asyncio.Future]]) -> None:
+        try:
+            async with AsyncRDBProc() as rdb_proc:
+                record_ids = await rdb_proc.insert_game_records([record for record, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), record_id in zip(batch, record_ids):
+            # A caller cancelled mid-flush (client went away) still has its row committed
+            if not future.done():
+                future.set_result(record_id)
+
+
+record_writer = RecordWriter()
+async_record_writer = AsyncRecordWriter()
@@ -0,0 +1,50 @@
+# request body size limit, applied before routing so oversized bodies are never buffered
+#
+# A Content-Length above the limit is answered with 413 straight away. Bodies
+# without one (chunked uploads) are counted as the endpoint reads them, and the
+# read fails with the same 413 once the limit is crossed.
+import json
+
+from fastapi import HTTPException
+
+TOO_LARGE = json.dumps({"detail": "Request body too large"}, separators=(",", ":")).encode()
+
+
+class BodySizeLimitMiddleware:
+    # Plain ASGI middleware, like MetricsMiddleware; 0 disables the limit
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if not value.isdigit() or int(value) > self.max_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+    @staticmethod
+    async def _reject(send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(TOO_LARGE)).encode())],
+        })
+        await send({"type": "http.response.body", "body": TOO_LARGE})
@@ -0,0 +1,140 @@
+# Mergeable streaming quantile sketch (DDSketch-style log buckets)
+#
+# A value v is counted in bucket ceil(log_gamma(|v|)), gamma = (1 + a) / (1 - a),
+# so any quantile read back is within relative accuracy `a` of a real value,
+# whatever the distribution. Buckets are plain counters: two sketches merge by
+# adding counts, which is what lets every API instance fold its local counts
+# into one shared copy. Negative values (score-based ranking scores) mirror the
+# positive buckets below zero, so bucket keys sort exactly like the values.
+#
+# The encoded form is base64 text (the Redis pools decode responses):
+#   varint version, varint accuracy in 1/10000, varint bucket count,
+#   then (zigzag key delta, count) varint pairs in key order
+import base64
+import math
+
+VERSION = 1
+DEFAULT_ACCURACY = 0.01
+DEFAULT_MAX_BUCKETS = 4096
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class QuantileSketch:
+    def __init__(self, accuracy: float = DEFAULT_ACCURACY, max_buckets: int = DEFAULT_MAX_BUCKETS):
+        self.accuracy = accuracy
+        self.max_buckets = max_buckets
+        self._log_gamma = math.log((1 + accuracy) / (1 - accuracy))
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        # 0 holds |value| < 1; 1, 2, ... hold values >= 1 and -1, -2, ... their negatives
+        magnitude = abs(value)
+        if magnitude < 1:
+            return 0
+        key = math.ceil(math.log(magnitude) / self._log_gamma) + 1
+        return key if value > 0 else -key
+
+    def add(self, value: float, count: int = 1) -> None:
+        key = self._key(value)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.accuracy != self.accuracy:
+            raise ValueError("cannot merge sketches of different accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += other.count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        # Fold the highest buckets into the highest one kept; only the extreme tail loses accuracy
+        keys = sorted(self.buckets)
+        kept = keys[self.max_buckets - 1]
+        for key in keys[self.max_buckets:]:
+            self.buckets[kept] += self.buckets.pop(key)
+
+    def rank(self, value: float) -> tuple[int, int]:
+        # (values in lower buckets, values in the same bucket)
+        key = self._key(value)
+        below = sum(count for bucket, count in self.buckets.items() if bucket < key)
+        return below, self.buckets.get(key, 0)
+
+    def fraction_above(self, value: float) -> float | None:
+        # Share of counted values greater than `value`, ties in its bucket counted as half; None when empty
+        if not self.count:
+            return None
+        below, same = self.rank(value)
+        return (self.count - below - same + same / 2) / self.count
+
+    def quantile(self, q: float) -> float | None:
+        # Value at quantile q (0..1), within the sketch's relative accuracy
+        if not self.count:
+            return None
+        target = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > target:
+                return self._value(key)
+        return self._value(max(self.buckets))
+
+    def _value(self, key: int) -> float:
+        if key == 0:
+            return 0.0
+        gamma = math.exp(self._log_gamma)
+        # Key k holds (gamma^(k-2), gamma^(k-1)]; this point is within `accuracy` of both ends
+        magnitude = 2 * gamma ** (abs(key) - 1) / (1 + gamma)
+        return magnitude if key > 0 else -magnitude
+
+    def encode(self) -> str:
+        out = bytearray()
+        _write_varint(out, VERSION)
+        _write_varint(out, round(self.accuracy * 10000))
+        _write_varint(out, len(self.buckets))
+        previous = 0
+        for key in sorted(self.buckets):
+            delta = key - previous
+            _write_varint(out, (delta << 1) ^ (delta >> 63))  # zigzag: small negative deltas stay small
+            _write_varint(out, self.buckets[key])
+            previous = key
+        return base64.b64encode(bytes(out)).decode("ascii")
+
+    @classmethod
+    def decode(cls, encoded: str, max_buckets: int = DEFAULT_MAX_BUCKETS) -> "QuantileSketch":
+        data = base64.b64decode(encoded)
+        version, offset = _read_varint(data, 0)
+        if version != VERSION:
+            raise ValueError(f"unsupported sketch version {version}")
+        accuracy, offset = _read_varint(data, offset)
+        size, offset = _read_varint(data, offset)
+        sketch = cls(accuracy / 10000, max_buckets)
+        key = 0
+        for _ in range(size):
+            zigzag, offset = _read_varint(data, offset)
+            count, offset = _read_varint(data, offset)
+            key += (zigzag >> 1) ^ -(zigzag & 1)
+            sketch.buckets[key] = count
+            sketch.count += count
+        return sketch
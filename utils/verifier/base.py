@@ -1,25 +1,30 @@
+from utils.verifier.result import ACCEPTED, ENVELOPE, VerifyResult, reject
 from utils.verifier.verifier_interface import VerifierInterface
 
 
 class BaseVerifier(VerifierInterface):
-    def verify(self, data) -> bool:
+    def verify(self, data) -> VerifyResult:
         return self.verify_payload(data)
 
-    def verify_payload(self, data) -> bool:
+    def verify_many(self, payloads: list) -> list[VerifyResult]:
+        # Batch entry point for the ingestion worker; verifiers with a cheaper batch path override it
+        return [self.verify(data) for data in payloads]
+
+    def verify_payload(self, data) -> VerifyResult:
         if not isinstance(data, dict):
-            return False
+            return reject(ENVELOPE, "payload_not_object")
 
         action_log = data.get("action_log", [])
         if not isinstance(action_log, list) or not action_log:
-            return False
+            return reject(ENVELOPE, "missing_action_log")
         if not self._has_action(action_log, "submit"):
-            return False
+            return reject(ENVELOPE, "missing_submit_action")
 
         for key in ("answers", "wrong_answers", "hint_events"):
             value = data.get(key, [])
             if not isinstance(value, list):
-                return False
-        return True
+                return reject(ENVELOPE, "entries_not_list")
+        return ACCEPTED
 
     @staticmethod
     def _has_action(action_log: list[dict], name: str) -> bool:
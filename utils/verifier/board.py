@@ -0,0 +1,157 @@
+# Constraint checks for sudoku-family boards (sudoku, killer-sudoku, jigsaw-sudoku)
+#
+# A board is a flat list of cell values 1..size. A BoardLayout lists the units
+# (rows, columns, boxes or jigsaw regions) that must each hold 1..size exactly
+# once; since each unit has `size` cells, a unit without a repeated value is
+# complete. check_board gathers each unit with a precomputed itemgetter and
+# compares its distinct count, which keeps the per-cell work in C (a per-cell
+# bitmask loop measured slower in CPython; see benchmark/verifier_bench.py).
+#
+# check_boards validates many boards against one layout. With NumPy installed it
+# ORs one-hot bitmasks over every unit of every board in a few array operations;
+# without it, it loops over check_board.
+from functools import lru_cache
+from math import isqrt
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:  # batch mode falls back to the per-board loop
+    np = None
+
+# Below this many boards the per-board loop beats NumPy's setup cost
+BATCH_MIN = 16
+
+# ASCII digits -> their values, so digit strings convert to ints without a Python-level loop
+_DIGIT_VALUES = bytes.maketrans(b"0123456789", bytes(range(10)))
+
+
+class BoardLayout:
+    def __init__(self, size: int, units: tuple[tuple[int, ...], ...]):
+        self.size = size
+        self.units = units
+        self.getters = tuple(itemgetter(*unit) for unit in units)
+        self.full_mask = (1 << (size + 1)) - 2
+        self._unit_array = None
+
+    @property
+    def unit_array(self):
+        if self._unit_array is None:
+            self._unit_array = np.array(self.units, dtype=np.intp)
+        return self._unit_array
+
+
+def _row_col_units(size: int) -> list[tuple[int, ...]]:
+    rows = [tuple(range(row * size, row * size + size)) for row in range(size)]
+    cols = [tuple(range(col, size * size, size)) for col in range(size)]
+    return rows + cols
+
+
+@lru_cache(maxsize=8)
+def sudoku_layout(size: int = 9) -> BoardLayout:
+    # Rows, columns and boxes; boxes are box_rows x box_cols with box_rows the largest divisor <= sqrt(size)
+    box_rows = next(rows for rows in range(isqrt(size), 0, -1) if size % rows == 0)
+    box_cols = size // box_rows
+    boxes = []
+    for top in range(0, size, box_rows):
+        for left in range(0, size, box_cols):
+            boxes.append(tuple((top + r) * size + left + c for r in range(box_rows) for c in range(box_cols)))
+    return BoardLayout(size, tuple(_row_col_units(size) + boxes))
+
+
+@lru_cache(maxsize=8)
+def latin_layout(size: int) -> BoardLayout:
+    # Rows and columns only, for boards whose region map is unknown
+    return BoardLayout(size, tuple(_row_col_units(size)))
+
+
+@lru_cache(maxsize=256)
+def jigsaw_layout(size: int, regions: tuple) -> BoardLayout | None:
+    # regions[cell] is the region id of each cell; every region must have exactly `size` cells
+    if len(regions) != size * size:
+        return None
+    members: dict = {}
+    for cell, region in enumerate(regions):
+        if not isinstance(region, int) or isinstance(region, bool):
+            return None
+        members.setdefault(region, []).append(cell)
+    if len(members) != size or any(len(cells) != size for cells in members.values()):
+        return None
+    return BoardLayout(size, tuple(_row_col_units(size) + [tuple(cells) for cells in members.values()]))
+
+
+def parse_board(board, size: int | None = None) -> list[int] | None:
+    # Accepts a digit string or a list of ints; size defaults to the square root of the cell count
+    if isinstance(board, str):
+        if not board.isascii() or not board.isdigit():
+            return None
+        values = list(board.encode().translate(_DIGIT_VALUES))
+    elif isinstance(board, list):
+        if not all(type(val) is int for val in board):
+            return None
+        values = board
+    else:
+        return None
+    if size is None:
+        size = isqrt(len(values))
+    if not values or len(values) != size * size or size > 9:
+        return None
+    if min(values) < 1 or max(values) > size:
+        return None
+    return values
+
+
+def check_board(values: list[int], layout: BoardLayout) -> bool:
+    size = layout.size
+    for getter in layout.getters:
+        if len(set(getter(values))) != size:
+            return False
+    return True
+
+
+def check_boards(boards: list[list[int]], layout: BoardLayout) -> list[bool]:
+    if np is None or len(boards) < BATCH_MIN:
+        return [check_board(values, layout) for values in boards]
+    bits = np.left_shift(1, np.asarray(boards, dtype=np.int64))
+    # (boards, units, size) -> OR over each unit's cells -> every unit must be full
+    unit_masks = np.bitwise_or.reduce(bits[:, layout.unit_array], axis=2)
+    return (unit_masks == layout.full_mask).all(axis=1).tolist()
+
+
+def check_cages(values: list[int], cages, size: int) -> bool:
+    # Killer cages: [{"cells": [...], "sum": int}, ...]; cells within a cage must not repeat a value
+    # and add up to the cage sum. Cells are flat indices or {"row", "col"} dicts; cages may not overlap.
+    if not isinstance(cages, list):
+        return False
+    covered = 0
+    for cage in cages:
+        if not isinstance(cage, dict):
+            return False
+        cells, target = cage.get("cells"), cage.get("sum")
+        if not isinstance(cells, list) or not cells or type(target) is not int:
+            return False
+        seen = 0
+        total = 0
+        for cell in cells:
+            index = _cell_index(cell, size)
+            if index is None or covered >> index & 1:
+                return False
+            covered |= 1 << index
+            bit = 1 << values[index]
+            if seen & bit:
+                return False
+            seen |= bit
+            total += values[index]
+        if total != target:
+            return False
+    return True
+
+
+def _cell_index(cell, size: int) -> int | None:
+    if type(cell) is int:
+        return cell if 0 <= cell < size * size else None
+    if isinstance(cell, dict):
+        row, col = cell.get("row"), cell.get("col")
+        if type(row) is int and type(col) is int and 0 <= row < size and 0 <= col < size:
+            return row * size + col
+    return None
@@ -0,0 +1,139 @@
+# Puzzle catalog: the known solution of each puzzle, stored as a digest
+#
+# Verifiers alone can only check that a submission is well formed. When the
+# client sends the puzzle_id it played and the catalog knows that puzzle, the
+# submitted answers are reduced to the verifier's canonical solution key
+# (solution_key), hashed, and compared with the catalogued digest.
+#
+# The catalog is one file built by migrations/build_puzzle_catalog.py:
+#   header  MAGIC + u64 record count
+#   record  u64 puzzle key + 16-byte solution digest, sorted by puzzle key
+# The puzzle key is the first 8 bytes of blake2b("{game}\0{puzzle_id}"), and the
+# digest is the 16-byte blake2b of "{game}\0{solution key}". The file is
+# memory-mapped on the first lookup and searched in place, so opening even a
+# large catalog is free and verification pool workers share its pages through
+# the page cache. A rebuilt catalog is picked up on restart.
+import logging
+import mmap
+import os
+import struct
+import threading
+from hashlib import blake2b
+
+from env import Env
+from utils.verifier.result import ACCEPTED, CATALOG, VerifyResult, reject
+
+logger = logging.getLogger("puzzle_catalog")
+
+MAGIC = b"PZCAT1\0\0"
+_HEADER = struct.Struct("<8sQ")
+_RECORD = struct.Struct("<Q16s")
+_KEY = struct.Struct("<Q")
+
+
+def puzzle_key(game_name: str, puzzle_id: str) -> int:
+    digest = blake2b(f"{game_name}\0{puzzle_id}".encode(), digest_size=8).digest()
+    return _KEY.unpack(digest)[0]
+
+
+def solution_digest(game_name: str, solution_key: str) -> bytes:
+    return blake2b(f"{game_name}\0{solution_key}".encode(), digest_size=16).digest()
+
+
+class PuzzleCatalog:
+    def __init__(self, path: str):
+        self.path = path
+        self._map: mmap.mmap | None = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> mmap.mmap:
+        with self._lock:
+            if self._map is None:
+                with open(self.path, "rb") as file:
+                    mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, count = _HEADER.unpack_from(mapped, 0)
+                if magic != MAGIC or len(mapped) != _HEADER.size + count * _RECORD.size:
+                    mapped.close()
+                    raise ValueError(f"{self.path} is not a puzzle catalog")
+                self._count = count
+                self._map = mapped
+        return self._map
+
+    def __len__(self) -> int:
+        self._open()
+        return self._count
+
+    def lookup(self, game_name: str, puzzle_id: str) -> bytes | None:
+        # Binary search over the mapped records; returns the solution digest or None
+        mapped = self._open()
+        key = puzzle_key(game_name, puzzle_id)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if _KEY.unpack_from(mapped, _HEADER.size + middle * _RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self._count:
+            return None
+        found, digest = _RECORD.unpack_from(mapped, _HEADER.size + low * _RECORD.size)
+        return digest if found == key else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+
+def build_catalog(path: str, solutions) -> int:
+    """Write a catalog from (game_name, puzzle_id, solution_key) tuples; later duplicates win."""
+    records = {}
+    for game_name, puzzle_id, solution_key in solutions:
+        records[puzzle_key(game_name, puzzle_id)] = solution_digest(game_name, solution_key)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, len(records)))
+        for key in sorted(records):
+            file.write(_RECORD.pack(key, records[key]))
+    # Readers that already mapped the old file keep it; new processes map the new one
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+_catalog: PuzzleCatalog | None = None
+_catalog_failed = False
+
+
+def get_catalog() -> PuzzleCatalog | None:
+    # Lazily opened per process; None when no catalog is configured or the file cannot be read
+    global _catalog, _catalog_failed
+    if _catalog is None and not _catalog_failed and Env.PUZZLE_CATALOG_PATH:
+        catalog = PuzzleCatalog(Env.PUZZLE_CATALOG_PATH)
+        try:
+            catalog._open()
+        except (OSError, ValueError, struct.error):
+            logger.exception("puzzle catalog disabled")
+            _catalog_failed = True
+            return None
+        _catalog = catalog
+    return _catalog
+
+
+def matches_catalog(game_name: str, verifier, data: dict) -> VerifyResult:
+    """Compare the submitted solution with the catalogued one, when the puzzle is known."""
+    key_of = getattr(verifier, "solution_key", None)
+    if key_of is None:
+        return ACCEPTED  # game without a canonical solution form
+    catalog = get_catalog()
+    if catalog is None:
+        return ACCEPTED
+    puzzle_id = data.get("puzzle_id")
+    expected = catalog.lookup(game_name, puzzle_id) if isinstance(puzzle_id, str) and puzzle_id else None
+    if expected is None:
+        return reject(CATALOG, "unknown_puzzle") if Env.PUZZLE_CATALOG_REQUIRED else ACCEPTED
+    submitted = key_of(data.get("answers", []))
+    if submitted is None or solution_digest(game_name, submitted) != expected:
+        return reject(CATALOG, "solution_mismatch")
+    return ACCEPTED
@@ -1,27 +1,96 @@
+from math import isqrt
+
+from env import Env
+from model.game_record import MAX_LIST_LEN
 from utils.verifier.base import BaseVerifier
+from utils.verifier.replay_2048 import replay, to_exponents
+from utils.verifier.result import ACCEPTED, GAME, VerifyResult, reject
+
+SIZE_MISMATCH = reject(GAME, "size_mismatch")
+
+
+def _level_size(level) -> int | None:
+    # "size-4" -> 4; None when the payload carries no level (direct verifier calls)
+    if not isinstance(level, str) or not level.startswith("size-") or not level[5:].isdigit():
+        return None
+    return int(level[5:])
 
 
 class Game2048Verifier(BaseVerifier):
-    def verify_payload(self, data) -> bool:
-        if not super().verify_payload(data):
-            return False
+    def verify_payload(self, data) -> VerifyResult:
+        result = super().verify_payload(data)
+        if not result:
+            return result
 
         action_log = data.get("action_log", [])
+        if len(action_log) > MAX_LIST_LEN:
+            return reject(GAME, "too_many_actions")
         if not self._has_action(action_log, "move"):
-            return False
+            return reject(GAME, "missing_move_action")
 
         answers = data.get("answers", [])
         if not answers:
-            return False
+            return reject(GAME, "missing_answers")
 
         if not self._validate_answers(answers):
-            return False
+            return reject(GAME, "invalid_answers")
+        # The record's level names the board size it ranks on; every submitted board must match it
+        size = _level_size(data.get("level"))
+        if data.get("level") is not None and size is None:
+            return SIZE_MISMATCH
+        if size is not None and any(
+            len(to_exponents(entry.get("board", entry.get("grid"))) or ()) != size * size
+            for entry in answers
+            if "board" in entry or "grid" in entry
+        ):
+            return SIZE_MISMATCH
         if data.get("wrong_answers") or data.get("hint_events"):
-            return False
+            return reject(GAME, "unexpected_entries")
         if not self._validate_move_actions(action_log):
-            return False
+            return reject(GAME, "invalid_move_action")
 
-        return True
+        replay_entry = next((entry for entry in answers if "replay" in entry), None)
+        if replay_entry is not None:
+            move_actions = sum(1 for entry in action_log if entry.get("action") == "move")
+            return self._verify_replay(replay_entry, data.get("score"), move_actions, size)
+        if Env.VERIFY_2048_REPLAY_REQUIRED:
+            return reject(GAME, "missing_replay")
+        return ACCEPTED
+
+    @staticmethod
+    def _verify_replay(entry: dict, claimed_score, move_actions: int, size: int | None) -> VerifyResult:
+        # Recompute score / max tile / final board from the replay and compare with what was submitted.
+        # entry["replay"] = {"initial": board, "moves": "LURD...", "spawns": [[cell, 2 or 4], ...]}
+        data = entry["replay"]
+        if not isinstance(data, dict):
+            return reject(GAME, "invalid_replay")
+        initial = to_exponents(data.get("initial"))
+        moves, spawns = data.get("moves"), data.get("spawns")
+        if initial is None or not isinstance(moves, str) or not isinstance(spawns, list):
+            return reject(GAME, "invalid_replay")
+        # Every replayed move was logged as a "move" action; this also bounds the replay's CPU cost,
+        # which matters when the check runs inline on the request path
+        if len(moves) > min(move_actions, MAX_LIST_LEN):
+            return reject(GAME, "too_many_moves")
+        # A new game starts with one or two 2/4 tiles
+        if not 1 <= sum(1 for value in initial if value) <= 2 or any(value > 2 for value in initial):
+            return reject(GAME, "invalid_initial_board")
+        if size is not None and len(initial) != size * size:
+            return SIZE_MISMATCH
+        result = replay(initial, moves, spawns, isqrt(len(initial)))
+        if result is None:
+            return reject(GAME, "illegal_replay")
+        score, max_tile, cells = result
+        if claimed_score is not None and claimed_score != score:
+            return reject(GAME, "score_mismatch")
+        if entry.get("score") is not None and entry["score"] != score:
+            return reject(GAME, "score_mismatch")
+        if entry.get("max_tile") is not None and entry["max_tile"] != max_tile:
+            return reject(GAME, "max_tile_mismatch")
+        board = entry.get("board", entry.get("grid"))
+        if board is not None and to_exponents(board) != cells:
+            return reject(GAME, "board_mismatch")
+        return ACCEPTED
 
     def _validate_answers(self, answers: list) -> bool:
         for entry in answers:
@@ -1,23 +1,37 @@
 from utils.verifier.base import BaseVerifier
+from utils.verifier.result import ACCEPTED, GAME, VerifyResult, reject
 
 
 class HidatoVerifier(BaseVerifier):
-    def verify_payload(self, data) -> bool:
-        if not super().verify_payload(data):
-            return False
+    def verify_payload(self, data) -> VerifyResult:
+        result = super().verify_payload(data)
+        if not result:
+            return result
 
         answers = data.get("answers", [])
         if not answers:
-            return False
+            return reject(GAME, "missing_answers")
 
         if not self._validate_entries(answers, require_value=True):
-            return False
+            return reject(GAME, "invalid_answers")
         if not self._validate_entries(data.get("wrong_answers", []), require_value=True):
-            return False
+            return reject(GAME, "invalid_wrong_answers")
         if not self._validate_entries(data.get("hint_events", []), require_value=True):
-            return False
+            return reject(GAME, "invalid_hint_events")
 
-        return True
+        return ACCEPTED
+
+    def solution_key(self, answers: list) -> str | None:
+        # Canonical solution for the puzzle catalog: the cells in path order
+        path = {}
+        for entry in answers:
+            if not isinstance(entry, dict):
+                return None
+            value = entry.get("value", entry.get("number"))
+            if not isinstance(value, int):
+                return None
+            path[value] = self._get_cell_key_from_entry(entry)
+        return ";".join(path[value] for value in sorted(path)) or None
 
     def _validate_entries(self, entries: list, require_value: bool) -> bool:
         if not isinstance(entries, list):
@@ -0,0 +1,59 @@
+from math import isqrt
+
+from utils.verifier.board import BoardLayout, jigsaw_layout, latin_layout, parse_board
+from utils.verifier.games.sudoku import SudokuVerifier
+from utils.verifier.result import GAME, VerifyResult, reject
+
+JIGSAW_SIZES = {5, 7, 9}
+INVALID_REGIONS = reject(GAME, "invalid_regions")
+
+
+def _flat_regions(regions, size: int) -> bool:
+    # jigsaw_layout is cached on the regions tuple, so anything unhashable must be turned away first
+    if not isinstance(regions, list) or len(regions) != size * size:
+        return False
+    return all(type(region) is int for region in regions)
+
+
+class JigsawSudokuVerifier(SudokuVerifier):
+    def _verify_structure(self, data, boards: list) -> VerifyResult:
+        # A bad region map is reported as such rather than as an invalid answer
+        if isinstance(data, dict):
+            for field in ("answers", "wrong_answers", "hint_events"):
+                entries = data.get(field)
+                if not isinstance(entries, list):
+                    continue
+                for entry in entries:
+                    if isinstance(entry, dict) and entry.get("regions") is not None:
+                        size = self._board_size(entry)
+                        if size is not None and self._regions_layout(entry.get("regions"), size) is None:
+                            return INVALID_REGIONS
+        return super()._verify_structure(data, boards)
+
+    @staticmethod
+    def _board_size(entry: dict) -> int | None:
+        values = parse_board(entry.get("board", entry.get("grid")))
+        if values is None or isqrt(len(values)) not in JIGSAW_SIZES:
+            return None
+        return isqrt(len(values))
+
+    @staticmethod
+    def _regions_layout(regions, size: int) -> BoardLayout | None:
+        if not _flat_regions(regions, size):
+            return None
+        return jigsaw_layout(size, tuple(regions))
+
+    def _parse_entry_board(self, entry: dict) -> tuple[list[int], BoardLayout] | None:
+        values = parse_board(entry.get("board", entry.get("grid")))
+        if values is None:
+            return None
+        size = isqrt(len(values))
+        if size not in JIGSAW_SIZES:
+            return None
+        # "regions" maps each cell to its region id; without it only rows and columns can be checked
+        if entry.get("regions") is None:
+            return values, latin_layout(size)
+        layout = self._regions_layout(entry.get("regions"), size)
+        if layout is None:
+            return None
+        return values, layout
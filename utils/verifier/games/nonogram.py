@@ -1,23 +1,34 @@
 from utils.verifier.base import BaseVerifier
+from utils.verifier.result import ACCEPTED, GAME, VerifyResult, reject
 
 
 class NonogramVerifier(BaseVerifier):
-    def verify_payload(self, data) -> bool:
-        if not super().verify_payload(data):
-            return False
+    def verify_payload(self, data) -> VerifyResult:
+        result = super().verify_payload(data)
+        if not result:
+            return result
 
         answers = data.get("answers", [])
         if not answers:
-            return False
+            return reject(GAME, "missing_answers")
 
         if not self._validate_entries(answers, require_state=True):
-            return False
+            return reject(GAME, "invalid_answers")
         if not self._validate_entries(data.get("wrong_answers", []), require_state=False):
-            return False
+            return reject(GAME, "invalid_wrong_answers")
         if not self._validate_entries(data.get("hint_events", []), require_state=False):
-            return False
+            return reject(GAME, "invalid_hint_events")
 
-        return True
+        return ACCEPTED
+
+    def solution_key(self, answers: list) -> str | None:
+        # Canonical solution for the puzzle catalog: the filled cells, sorted
+        filled = sorted(
+            self._get_cell_key_from_entry(entry)
+            for entry in answers
+            if isinstance(entry, dict) and (entry.get("filled") is True or entry.get("state") == "filled")
+        )
+        return ";".join(filled) or None
 
     def _validate_entries(self, entries: list, require_state: bool) -> bool:
         if not isinstance(entries, list):
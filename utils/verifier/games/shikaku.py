@@ -1,34 +1,49 @@
 from utils.verifier.base import BaseVerifier
+from utils.verifier.result import ACCEPTED, GAME, VerifyResult, reject
 
 
 class ShikakuVerifier(BaseVerifier):
-    def verify_payload(self, data) -> bool:
-        if not super().verify_payload(data):
-            return False
+    def verify_payload(self, data) -> VerifyResult:
+        result = super().verify_payload(data)
+        if not result:
+            return result
 
         answers = data.get("answers", [])
         if not answers:
-            return False
+            return reject(GAME, "missing_answers")
 
         for entry in answers:
             if not isinstance(entry, dict):
-                return False
+                return reject(GAME, "invalid_answers")
             rect = entry.get("rect", entry)
             cells = entry.get("cells")
             if rect and any(key in rect for key in ("x", "y", "w", "h", "width", "height")):
-                if not isinstance(rect, dict):
-                    return False
-                if not self._validate_rect(rect):
-                    return False
+                if not isinstance(rect, dict) or not self._validate_rect(rect):
+                    return reject(GAME, "invalid_rect")
             elif cells:
-                if not isinstance(cells, list) or not cells:
-                    return False
-                if not self._validate_cells(cells):
-                    return False
+                if not isinstance(cells, list) or not self._validate_cells(cells):
+                    return reject(GAME, "invalid_cells")
             else:
-                return False
+                return reject(GAME, "invalid_answers")
 
-        return True
+        return ACCEPTED
+
+    def solution_key(self, answers: list) -> str | None:
+        # Canonical solution for the puzzle catalog: the sorted rectangles, each as x,y,w,h or its sorted cells
+        regions = []
+        for entry in answers:
+            if not isinstance(entry, dict):
+                return None
+            rect = entry.get("rect", entry)
+            if isinstance(rect, dict) and self._validate_rect(rect):
+                w = rect.get("w", rect.get("width"))
+                h = rect.get("h", rect.get("height"))
+                regions.append(f"{rect['x']},{rect['y']},{w},{h}")
+            elif isinstance(entry.get("cells"), list):
+                regions.append("|".join(sorted(self._get_cell_key_from_entry(cell) for cell in entry["cells"])))
+            else:
+                return None
+        return ";".join(sorted(regions)) or None
 
     @staticmethod
     def _validate_rect(rect: dict) -> bool:
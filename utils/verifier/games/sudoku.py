@@ -1,25 +1,59 @@
 from utils.verifier.base import BaseVerifier
+from utils.verifier.board import BoardLayout, check_board, check_boards, parse_board, sudoku_layout
+from utils.verifier.result import ACCEPTED, GAME, VerifyResult, reject
+
+BOARD_CONSTRAINT = reject(GAME, "board_constraint")
 
 
 class SudokuVerifier(BaseVerifier):
-    def verify_payload(self, data) -> bool:
-        if not super().verify_payload(data):
-            return False
+    # Largest value a single-cell entry may carry
+    max_value = 9
+
+    def verify_payload(self, data) -> VerifyResult:
+        boards: list[tuple[list[int], BoardLayout]] = []
+        result = self._verify_structure(data, boards)
+        if not result:
+            return result
+        if not all(check_board(values, layout) for values, layout in boards):
+            return BOARD_CONSTRAINT
+        return ACCEPTED
+
+    def verify_many(self, payloads: list) -> list[VerifyResult]:
+        # Structure checks per payload, then the boards of the whole batch validated per layout at once
+        results = []
+        pending: dict[BoardLayout, list[tuple[int, list[int]]]] = {}
+        for index, data in enumerate(payloads):
+            boards: list[tuple[list[int], BoardLayout]] = []
+            results.append(self._verify_structure(data, boards))
+            if results[-1]:
+                for values, layout in boards:
+                    pending.setdefault(layout, []).append((index, values))
+        for layout, items in pending.items():
+            for (index, _), valid in zip(items, check_boards([values for _, values in items], layout)):
+                if not valid and results[index]:
+                    results[index] = BOARD_CONSTRAINT
+        return results
+
+    def _verify_structure(self, data, boards: list) -> VerifyResult:
+        # Everything but the board constraints, which are appended to `boards` for the caller to check
+        result = super().verify_payload(data)
+        if not result:
+            return result
 
         answers = data.get("answers", [])
         if not answers:
-            return False
+            return reject(GAME, "missing_answers")
 
-        if not self._validate_entries(answers, require_value=True):
-            return False
-        if not self._validate_entries(data.get("wrong_answers", []), require_value=True):
-            return False
-        if not self._validate_entries(data.get("hint_events", []), require_value=True):
-            return False
+        if not self._validate_entries(answers, require_value=True, boards=boards):
+            return reject(GAME, "invalid_answers")
+        if not self._validate_entries(data.get("wrong_answers", []), require_value=True, boards=boards):
+            return reject(GAME, "invalid_wrong_answers")
+        if not self._validate_entries(data.get("hint_events", []), require_value=True, boards=boards):
+            return reject(GAME, "invalid_hint_events")
 
-        return True
+        return ACCEPTED
 
-    def _validate_entries(self, entries: list, require_value: bool) -> bool:
+    def _validate_entries(self, entries: list, require_value: bool, boards: list) -> bool:
         if not isinstance(entries, list):
             return False
         seen_cells = set()
@@ -27,15 +61,16 @@ class SudokuVerifier(BaseVerifier):
             if not isinstance(entry, dict):
                 return False
             if "board" in entry or "grid" in entry:
-                board = entry.get("board", entry.get("grid"))
-                if not self._validate_board(board):
+                board = self._parse_entry_board(entry)
+                if board is None:
                     return False
+                boards.append(board)
                 continue
             cell_key = self._get_cell_key_from_entry(entry)
             value = entry.get("value", entry.get("number"))
             if require_value and not isinstance(value, int):
                 return False
-            if isinstance(value, int) and (value < 1 or value > 9):
+            if isinstance(value, int) and (value < 1 or value > self.max_value):
                 return False
             if not cell_key:
                 return False
@@ -44,38 +79,20 @@ class SudokuVerifier(BaseVerifier):
             seen_cells.add(cell_key)
         return True
 
-    @staticmethod
-    def _validate_board(board) -> bool:
-        values = []
-        if isinstance(board, str):
-            if len(board) != 81:
-                return False
-            if not all(ch.isdigit() and ch != "0" for ch in board):
-                return False
-            values = [int(ch) for ch in board]
-        elif isinstance(board, list):
-            if len(board) != 81:
-                return False
-            if not all(isinstance(val, int) and 1 <= val <= 9 for val in board):
-                return False
-            values = board
-        else:
-            return False
+    def solution_key(self, answers: list) -> str | None:
+        # Canonical solution for the puzzle catalog: the board's digits, or the sorted cell=value entries
+        for entry in answers:
+            if isinstance(entry, dict) and ("board" in entry or "grid" in entry):
+                board = self._parse_entry_board(entry)
+                return None if board is None else "".join(map(str, board[0]))
+        cells = sorted(
+            f"{self._get_cell_key_from_entry(entry)}={entry.get('value', entry.get('number'))}"
+            for entry in answers if isinstance(entry, dict)
+        )
+        return ";".join(cells) or None
 
-        # Row/col/box must be a complete 1-9 set.
-        for row in range(9):
-            start = row * 9
-            if len(set(values[start:start + 9])) != 9:
-                return False
-        for col in range(9):
-            if len(set(values[col::9])) != 9:
-                return False
-        for box_row in range(0, 9, 3):
-            for box_col in range(0, 9, 3):
-                block = []
-                for r in range(3):
-                    offset = (box_row + r) * 9 + box_col
-                    block.extend(values[offset:offset + 3])
-                if len(set(block)) != 9:
-                    return False
-        return True
+    def _parse_entry_board(self, entry: dict) -> tuple[list[int], BoardLayout] | None:
+        values = parse_board(entry.get("board", entry.get("grid")), 9)
+        if values is None:
+            return None
+        return values, sudoku_layout(9)
@@ -0,0 +1,171 @@
+# Process pool for CPU-heavy verifiers
+#
+# Verification is pure CPU, so on the request thread (or event loop) it
+# serializes on the GIL. With VERIFY_POOL_WORKERS > 0, games whose policy says
+# "pool" (see registry.VERIFIER_POLICY) are verified in a ProcessPoolExecutor
+# that spans the container's cores; other games, and every game when the pool
+# is disabled, are verified inline.
+import asyncio
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from env import Env
+from utils.verifier.catalog import matches_catalog
+from utils.verifier.registry import get_verifier, get_verifier_policy
+from utils.verifier.replay_2048 import prebuild_tables
+from utils.verifier.result import BUDGET, POOL, VerifyResult, reject
+
+PAYLOAD_TOO_LARGE = reject(BUDGET, "payload_too_large")
+POOL_TIMEOUT = reject(POOL, "timeout")
+POOL_BROKEN = reject(POOL, "worker_lost")
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+# Checks submitted to the pool and not yet answered, for pool utilisation
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def warm_verifiers() -> None:
+    # Runs at startup in the serving process and as the initializer of every pool worker
+    prebuild_tables()
+
+
+def init_verify_pool(workers: int | None = None) -> ProcessPoolExecutor | None:
+    with _executor_lock:
+        return _start_pool(Env.VERIFY_POOL_WORKERS if workers is None else workers)
+
+
+def _start_pool(workers: int) -> ProcessPoolExecutor | None:
+    global _executor
+    if _executor is None and workers > 0:
+        # spawn: the parent runs an event loop and driver threads that must not be forked
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_verifiers,
+        )
+        # Start the workers now rather than on the first submits of a burst
+        for _ in range(workers):
+            _executor.submit(int)
+    return _executor
+
+
+def shutdown_verify_pool() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _replace_broken_pool(executor: ProcessPoolExecutor) -> None:
+    # A worker died (killed, out of memory): every pending and future submit to this executor fails,
+    # so the first caller to notice swaps in a fresh pool of the same size
+    global _executor
+    with _executor_lock:
+        if _executor is not executor:
+            return
+        _executor = None
+        _start_pool(executor._max_workers)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _verify(game_name: str, payload: dict) -> VerifyResult:
+    # Runs in a pool worker (or inline); verifiers are looked up by name so only plain data is pickled
+    verifier = get_verifier(game_name)
+    result = verifier.verify(payload)
+    if not result:
+        return result
+    return matches_catalog(game_name, verifier, payload)
+
+
+def payload_size(payload: dict) -> int:
+    return len(json.dumps(payload, separators=(",", ":"), ensure_ascii=False))
+
+
+def payload_within_budget(game_name: str, size: int) -> bool:
+    # size: the request body length when the caller has it, else payload_size(payload)
+    return size <= get_verifier_policy(game_name)["max_payload"]
+
+
+def _track(delta: int) -> None:
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+
+
+def verify(game_name: str, payload: dict, size: int | None = None) -> VerifyResult:
+    """Run the game's verifier; a pooled check that exceeds its timeout or loses its worker counts as a failure."""
+    policy = get_verifier_policy(game_name)
+    if not payload_within_budget(game_name, payload_size(payload) if size is None else size):
+        return PAYLOAD_TOO_LARGE
+    executor = _executor
+    if executor is None or not policy["pool"]:
+        return _verify(game_name, payload)
+    _track(1)
+    try:
+        future = executor.submit(_verify, game_name, payload)
+    except BrokenProcessPool:
+        _track(-1)
+        _replace_broken_pool(executor)
+        return POOL_BROKEN
+    future.add_done_callback(lambda _: _track(-1))
+    try:
+        return future.result(timeout=policy["timeout"])
+    except FutureTimeoutError:
+        # The worker finishes the check on its own; the caller does not wait for it
+        future.cancel()
+        return POOL_TIMEOUT
+    except BrokenProcessPool:
+        _replace_broken_pool(executor)
+        return POOL_BROKEN
+
+
+def verify_many(game_name: str, payloads: list[dict]) -> list[VerifyResult]:
+    # Inline batch verification for callers that are already off the request path (the ingestion worker)
+    verifier = get_verifier(game_name)
+    within_budget = [payload_within_budget(game_name, payload_size(payload)) for payload in payloads]
+    accepted = [payload for payload, ok in zip(payloads, within_budget) if ok]
+    checked = iter(
+        matches_catalog(game_name, verifier, payload) if result else result
+        for payload, result in zip(accepted, verifier.verify_many(accepted))
+    )
+    return [next(checked) if ok else PAYLOAD_TOO_LARGE for ok in within_budget]
+
+
+async def verify_async(game_name: str, payload: dict, size: int | None = None) -> VerifyResult:
+    policy = get_verifier_policy(game_name)
+    if not payload_within_budget(game_name, payload_size(payload) if size is None else size):
+        return PAYLOAD_TOO_LARGE
+    executor = _executor
+    if executor is None or not policy["pool"]:
+        return _verify(game_name, payload)
+    loop = asyncio.get_running_loop()
+    _track(1)
+    try:
+        future = loop.run_in_executor(executor, _verify, game_name, payload)
+    except BrokenProcessPool:
+        _track(-1)
+        await loop.run_in_executor(None, _replace_broken_pool, executor)
+        return POOL_BROKEN
+    future.add_done_callback(lambda _: _track(-1))
+    try:
+        return await asyncio.wait_for(future, policy["timeout"])
+    except asyncio.TimeoutError:
+        return POOL_TIMEOUT
+    except BrokenProcessPool:
+        # Starting the replacement workers blocks, so it stays off the event loop
+        await loop.run_in_executor(None, _replace_broken_pool, executor)
+        return POOL_BROKEN
+
+
+def get_verify_pool_status() -> dict:
+    executor = _executor
+    if executor is None:
+        return {"initialized": False}
+    return {"initialized": True, "workers": executor._max_workers, "in_flight": _in_flight}
@@ -1,6 +1,7 @@
 from utils.verifier.base import BaseVerifier
 from utils.verifier.games.game_2048 import Game2048Verifier
 from utils.verifier.games.hidato import HidatoVerifier
+from utils.verifier.games.jigsaw_sudoku import JigsawSudokuVerifier
 from utils.verifier.games.killer_sudoku import KillerSudokuVerifier
 from utils.verifier.games.nonogram import NonogramVerifier
 from utils.verifier.games.shikaku import ShikakuVerifier
@@ -15,10 +16,32 @@ VERIFIER_MAP = {
     "hidato": HidatoVerifier(),
     "killer-sudoku": KillerSudokuVerifier(),
     "shikaku": ShikakuVerifier(),
-    "jigsaw-sudoku": DEFAULT_VERIFIER,
+    "jigsaw-sudoku": JigsawSudokuVerifier(),
     "woodoku": DEFAULT_VERIFIER,
 }
 
 
 def get_verifier(game_name: str) -> BaseVerifier:
     return VERIFIER_MAP.get(game_name, DEFAULT_VERIFIER)
+
+
+# How each game's verifier runs. Games marked "pool" are dispatched to the
+# verification process pool when it is enabled (VERIFY_POOL_WORKERS > 0); all
+# others run inline, where a pool round trip would cost more than the check.
+# "timeout" bounds the wait for a pooled check (seconds); "max_payload" caps the
+# JSON size of the verification payload (bytes) and applies either way.
+DEFAULT_POLICY = {"pool": False, "timeout": 1.0, "max_payload": 64 * 1024}
+
+VERIFIER_POLICY = {
+    "sudoku": {"pool": True, "timeout": 1.0, "max_payload": 64 * 1024},
+    "killer-sudoku": {"pool": True, "timeout": 1.0, "max_payload": 64 * 1024},
+    "jigsaw-sudoku": {"pool": True, "timeout": 1.0, "max_payload": 64 * 1024},
+    "nonogram": {"pool": True, "timeout": 1.0, "max_payload": 64 * 1024},
+    "shikaku": {"pool": True, "timeout": 1.0, "max_payload": 64 * 1024},
+    "hidato": {"pool": True, "timeout": 1.0, "max_payload": 64 * 1024},
+    "2048": {"pool": True, "timeout": 2.0, "max_payload": 256 * 1024},
+}
+
+
+def get_verifier_policy(game_name: str) -> dict:
+    return VERIFIER_POLICY.get(game_name, DEFAULT_POLICY)
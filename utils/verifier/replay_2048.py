@@ -0,0 +1,150 @@
+# 2048 move simulator used to replay submitted games
+#
+# Boards are flat lists of exponents (0 = empty, k = tile 2^k), row-major.
+# A move slides every line of the board toward one side. Each line is read
+# with a precomputed itemgetter, and its result comes from a lookup table of
+# slid lines. For 3x3 and 4x4 the table covers every line up to
+# TABLE_MAX_EXPONENT and is built by prebuild_tables at startup (or on first
+# use). Larger boards have far too
+# many possible lines, so their table is filled lazily from the lines seen in
+# play and is capped at LAZY_TABLE_LIMIT entries.
+#
+# A replay is an initial board, a move string ("L", "R", "U", "D") and one
+# spawned tile (cell, 2 or 4) per move that changed the board. Moves that
+# change nothing are allowed and consume no spawn. The standard 2048 rules give
+# the score: each merge adds the value of the merged tile.
+from functools import lru_cache
+from itertools import product
+from operator import itemgetter
+
+BOARD_SIZES = (3, 4, 5, 6, 8)
+TABLE_MAX_EXPONENT = 17
+LAZY_TABLE_LIMIT = 200_000
+# 2^30 is far beyond any reachable tile; bounds garbage input
+MAX_EXPONENT = 30
+
+_tables: dict[int, dict[tuple, tuple[tuple, int]]] = {}
+
+
+def slide_line(line: tuple) -> tuple[tuple, int]:
+    # Slide toward index 0, merging equal neighbours once; returns the new line and the score gained
+    tiles = [value for value in line if value]
+    result = []
+    gained = 0
+    index = 0
+    while index < len(tiles):
+        if index + 1 < len(tiles) and tiles[index] == tiles[index + 1]:
+            merged = tiles[index] + 1
+            result.append(merged)
+            gained += 1 << merged
+            index += 2
+        else:
+            result.append(tiles[index])
+            index += 1
+    result.extend([0] * (len(line) - len(result)))
+    return tuple(result), gained
+
+
+def _table(size: int) -> dict[tuple, tuple[tuple, int]]:
+    table = _tables.get(size)
+    if table is None:
+        table = {}
+        if size <= 4:
+            for line in product(range(TABLE_MAX_EXPONENT + 1), repeat=size):
+                table[line] = slide_line(line)
+        _tables[size] = table
+    return table
+
+
+def prebuild_tables() -> None:
+    # The 4x4 table takes a noticeable fraction of a second; build it before the first request needs it
+    for size in BOARD_SIZES:
+        if size <= 4:
+            _table(size)
+
+
+@lru_cache(maxsize=None)
+def _move_lines(size: int) -> dict[str, tuple[tuple[tuple[int, ...], itemgetter], ...]]:
+    # For each direction, the board's lines ordered from the side tiles slide toward
+    rows = [tuple(range(row * size, row * size + size)) for row in range(size)]
+    cols = [tuple(range(col, size * size, size)) for col in range(size)]
+    lines = {
+        "L": rows,
+        "R": [row[::-1] for row in rows],
+        "U": cols,
+        "D": [col[::-1] for col in cols],
+    }
+    return {move: tuple((line, itemgetter(*line)) for line in move_lines) for move, move_lines in lines.items()}
+
+
+def apply_move(cells: list[int], move: str, size: int) -> tuple[bool, int] | None:
+    # Slides `cells` in place; returns (changed, score gained), or None for an unknown move
+    lines = _move_lines(size).get(move)
+    if lines is None:
+        return None
+    table = _table(size)
+    moved = False
+    gained = 0
+    for line, getter in lines:
+        current = getter(cells)
+        slid = table.get(current)
+        if slid is None:
+            slid = slide_line(current)
+            if len(table) < LAZY_TABLE_LIMIT:
+                table[current] = slid
+        result, score = slid
+        if result != current:
+            moved = True
+            gained += score
+            for cell, value in zip(line, result):
+                cells[cell] = value
+    return moved, gained
+
+
+def replay(initial: list[int], moves: str, spawns: list, size: int) -> tuple[int, int, list[int]] | None:
+    """Replay a game; returns (score, max tile, final exponents), or None if the replay is not legal."""
+    if size not in BOARD_SIZES or len(initial) != size * size:
+        return None
+    cells = list(initial)
+    spawn_index = 0
+    score = 0
+    for move in moves:
+        outcome = apply_move(cells, move, size)
+        if outcome is None:
+            return None
+        moved, gained = outcome
+        if not moved:
+            continue
+        score += gained
+        if spawn_index >= len(spawns):
+            return None
+        spawn = spawns[spawn_index]
+        spawn_index += 1
+        if not isinstance(spawn, list) or len(spawn) != 2:
+            return None
+        cell, value = spawn
+        if type(cell) is not int or not 0 <= cell < len(cells) or cells[cell] or type(value) is not int or value not in (2, 4):
+            return None
+        cells[cell] = value.bit_length() - 1
+    if spawn_index != len(spawns):
+        return None
+    return score, 1 << max(cells) if any(cells) else 0, cells
+
+
+def to_exponents(board) -> list[int] | None:
+    # Tile values (flat or nested rows) -> exponents; None unless every tile is 0 or a power of two
+    if not isinstance(board, list) or not board:
+        return None
+    if all(isinstance(row, list) for row in board):
+        if any(len(row) != len(board) for row in board):
+            return None
+        board = [value for row in board for value in row]
+    exponents = []
+    for value in board:
+        if type(value) is not int or value < 0 or value == 1 or value & (value - 1):
+            return None
+        exponent = value.bit_length() - 1 if value else 0
+        if exponent > MAX_EXPONENT:
+            return None
+        exponents.append(exponent)
+    return exponents
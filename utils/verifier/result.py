@@ -0,0 +1,50 @@
+# Verification outcome: accepted, or rejected at a stage with a reason code
+#
+# Results are interned. ACCEPTED is one shared instance and reject() returns one
+# cached instance per (stage, reason), so producing a result never allocates and
+# the accept path costs the same as returning True. A result is truthy exactly
+# when it is accepted, so `if not result:` keeps reading like the old bool.
+from functools import lru_cache
+
+# Stages, in the order a submission goes through them
+PRECHECK = "precheck"  # action_log timing and answer counts against the record (GameService)
+BUDGET = "budget"  # verification payload size (pool)
+ENVELOPE = "envelope"  # payload shape shared by every game (BaseVerifier)
+GAME = "game"  # game-specific verifier
+CATALOG = "catalog"  # puzzle catalog solution check
+POOL = "pool"  # verification process pool
+SESSION = "session"  # game session check when the record is stored
+
+
+class VerifyResult:
+    __slots__ = ("stage", "reason")
+
+    def __init__(self, stage: str = "", reason: str = ""):
+        self.stage = stage
+        self.reason = reason
+
+    def __bool__(self) -> bool:
+        return not self.reason
+
+    def __repr__(self) -> str:
+        return f"VerifyResult({self.stage!r}, {self.reason!r})" if self.reason else "ACCEPTED"
+
+    def __reduce__(self):
+        # Results coming back from pool workers resolve to the interned instances
+        return (reject, (self.stage, self.reason)) if self.reason else (_accepted, ())
+
+    @property
+    def code(self) -> str:
+        return f"{self.stage}:{self.reason}" if self.reason else ""
+
+
+ACCEPTED = VerifyResult()
+
+
+def _accepted() -> VerifyResult:
+    return ACCEPTED
+
+
+@lru_cache(maxsize=None)
+def reject(stage: str, reason: str) -> VerifyResult:
+    return VerifyResult(stage, reason)
@@ -7,6 +7,7 @@ class VerifierInterface:
             data: The data to be verified.
 
         Returns:
-            bool: True if verification is successful, False otherwise.
+            VerifyResult: truthy when verification is successful; otherwise it carries
+            the failing stage and a reason code (see utils/verifier/result.py).
         """
         raise NotImplementedError("Subclasses must implement this method.")
\ No newline at end of file